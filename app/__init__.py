@@ -5,7 +5,7 @@ from flask_env import MetaFlaskEnv
 # Local application imports
 from app.api import register_apis
 from app.config import Config
-from app.extensions import babel
+from app.startup import profiler
 from app.utils import get_config, print_config, print_routes
 
 
@@ -26,10 +26,14 @@ def configure_app(app: Flask, config: MetaFlaskEnv = None):
 
 def configure_db(app: Flask):
     # Local application imports
-    from app.extensions import db, migrate
+    from app.extensions import db
 
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    # Local application imports
+    from app.api.deadline import install_listener
+
+    install_listener()
 
 
 def handle_error(error):
@@ -38,16 +42,35 @@ def handle_error(error):
     from app.api.response import APIResponse
 
     assert isinstance(error, APIError)
-    return APIResponse().create_error_response(error)
+    response = APIResponse().create_error_response(error)
+    if error.headers:
+        result, code = response
+        return result, code, error.headers
+    return response
 
 
 def setup_error_handlers(app):
+    # Third party imports
+    from sqlalchemy.exc import OperationalError
+
     # Local application imports
-    from app.api.error import BadRequestError, NotFoundError, ValidationError
+    from app.api.deadline import handle_operational_error
+    from app.api.error import (
+        BadRequestError,
+        DeadlineExceededError,
+        NotFoundError,
+        PreconditionFailedError,
+        ServiceUnavailableError,
+        ValidationError,
+    )
 
     app.register_error_handler(BadRequestError, handle_error)
+    app.register_error_handler(DeadlineExceededError, handle_error)
     app.register_error_handler(NotFoundError, handle_error)
+    app.register_error_handler(PreconditionFailedError, handle_error)
+    app.register_error_handler(ServiceUnavailableError, handle_error)
     app.register_error_handler(ValidationError, handle_error)
+    app.register_error_handler(OperationalError, handle_operational_error)
 
 
 def create_app(config: MetaFlaskEnv = None):
@@ -56,20 +79,59 @@ def create_app(config: MetaFlaskEnv = None):
         assert issubclass(config, Config)
 
     app = Flask(__name__)
-    config = configure_app(app, config)
-    configure_db(app)
+    with profiler.phase("configure_app"):
+        config = configure_app(app, config)
+    with profiler.phase("configure_db"):
+        configure_db(app)
 
-    register_apis(app)
+    with profiler.phase("register_apis"):
+        register_apis(app)
 
     # Internationalization
-    babel.init_app(app)
+    with profiler.phase("babel"):
+        # Local application imports
+        from app.extensions import babel, catalog
+
+        babel.init_app(app)
+        catalog.init_app(app)
 
     # Error handling
     setup_error_handlers(app)
 
+    # Monitoring
+    with profiler.phase("metrics"):
+        # Local application imports
+        from app.extensions import metrics, query_counter
+
+        query_counter.init_app(app)
+        metrics.init_app(app)
+
+    # Liveness and readiness probes, plain routes without the API views
+    with profiler.phase("health"):
+        # Local application imports
+        from app.extensions import health
+
+        health.init_app(app)
+
+    # Load shedding, after the metrics so rejected requests are recorded
+    with profiler.phase("admission"):
+        # Local application imports
+        from app.extensions import admission
+
+        admission.init_app(app)
+
+    # Concurrency limits per cost class of the API views
+    with profiler.phase("bulkheads"):
+        # Local application imports
+        from app.extensions import bulkheads
+
+        bulkheads.init_app(app)
+
     # Print debug info
     if app.debug is True:
         print_config(app, config)
         print_routes(app)
 
+    profiler.print_report()
+
     return app
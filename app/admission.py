@@ -0,0 +1,227 @@
+# Standard library imports
+import math
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+# Third party imports
+from flask import Flask, current_app, g, request
+
+READ_PRIORITY = "read"
+WRITE_PRIORITY = "write"
+
+
+class GradientLimiter:
+    """Concurrency limit adapting to the observed latency (gradient2 style).
+
+    A fast moving average of the latency is compared to a slow one tracking the
+    latency without queueing. While they agree the limit grows by a queue
+    allowance of ``sqrt(limit)``, once requests start queueing the short term
+    latency rises and the gradient ``long / short`` (below 1) shrinks the limit
+    in proportion. Failed requests cut the limit multiplicatively (AIMD).
+    """
+
+    short_smoothing = 0.1
+    long_smoothing = 0.002
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 2,
+        max_limit: float = 200,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        backoff: float = 0.9,
+    ):
+        assert 0 < min_limit <= initial_limit <= max_limit
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.inflight = 0
+        self.short_latency: Optional[float] = None
+        self.long_latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def acquire(self, share: float = 1.0) -> bool:
+        """Take a slot unless ``share`` of the limit is already in flight."""
+        with self._lock:
+            if self.inflight >= max(1, int(self.limit * share)):
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self, latency: Optional[float] = None, failed: bool = False):
+        with self._lock:
+            inflight = self.inflight
+            self.inflight -= 1
+            if failed:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            elif latency is not None:
+                self._update(latency, inflight)
+
+    @staticmethod
+    def _average(average: Optional[float], value: float, smoothing: float) -> float:
+        if average is None:
+            return value
+        return average + smoothing * (value - average)
+
+    def _update(self, latency: float, inflight: int):
+        short = self._average(self.short_latency, latency, self.short_smoothing)
+        long = self._average(self.long_latency, latency, self.long_smoothing)
+        # Back to normal after an overload, catch up faster than the average
+        if long / short > 2:
+            long *= 0.95
+        self.short_latency, self.long_latency = short, long
+        # Below half of the limit the limit is not what bounds the latency
+        if inflight < self.limit / 2:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * long / short))
+        limit = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + limit * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+
+
+class AdmissionController:
+    """Sheds the requests over the adaptive concurrency limit of the process.
+
+    Rejected requests get a fast 503 with a ``Retry-After`` header. Writes may
+    use the whole limit while reads leave ``ADMISSION_WRITE_RESERVE`` of it to
+    the writes, metrics (``ADMISSION_EXEMPT_PATHS``) and the health probes
+    (``HEALTH_LIVENESS_PATH`` and ``HEALTH_READINESS_PATH``) are always
+    admitted and not counted. Without ``ADMISSION_ENABLED`` there is no
+    limiter and every request is admitted.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.limiter: Optional[GradientLimiter] = None
+        self.rejected: Counter = Counter()
+        self._metrics = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("ADMISSION_ENABLED", True)
+        app.config.setdefault("ADMISSION_INITIAL_LIMIT", 20)
+        app.config.setdefault("ADMISSION_MIN_LIMIT", 2)
+        app.config.setdefault("ADMISSION_MAX_LIMIT", 200)
+        app.config.setdefault("ADMISSION_WRITE_RESERVE", 0.2)
+        app.config.setdefault("ADMISSION_RETRY_AFTER", 1)
+        app.config.setdefault(
+            "ADMISSION_EXEMPT_PATHS", ["/metrics", "/healthz", "/readyz"]
+        )
+        if not app.config["ADMISSION_ENABLED"] or "admission" in app.extensions:
+            return
+        assert 0 <= app.config["ADMISSION_WRITE_RESERVE"] < 1
+
+        self.limiter = GradientLimiter(
+            initial_limit=app.config["ADMISSION_INITIAL_LIMIT"],
+            min_limit=app.config["ADMISSION_MIN_LIMIT"],
+            max_limit=app.config["ADMISSION_MAX_LIMIT"],
+        )
+        if "metrics" in app.extensions:
+            self._create_metrics()
+        app.before_request(self._admit)
+        app.after_request(self._record_status)
+        app.teardown_request(self._release)
+        app.extensions["admission"] = self
+
+    def _create_metrics(self):
+        # Third party imports
+        from prometheus_client import Counter as PrometheusCounter
+        from prometheus_client import Gauge
+
+        if self._metrics is not None:
+            return
+        self._metrics = dict(
+            limit=Gauge(
+                "admission_concurrency_limit",
+                "Adaptive concurrency limit.",
+                multiprocess_mode="livesum",
+            ),
+            inflight=Gauge(
+                "admission_inflight_requests",
+                "Admitted requests in flight.",
+                multiprocess_mode="livesum",
+            ),
+            rejected=PrometheusCounter(
+                "admission_rejected_requests_total",
+                "Requests rejected over the concurrency limit.",
+                ["priority"],
+            ),
+        )
+
+    def snapshot(self) -> dict:
+        limiter = self.limiter
+        if limiter is None:
+            return dict(enabled=False, limit=None, inflight=0, rejected={})
+        return dict(
+            enabled=True,
+            limit=round(limiter.limit, 2),
+            inflight=limiter.inflight,
+            rejected=dict(self.rejected),
+        )
+
+    def _update_metrics(self):
+        if self._metrics is not None and self.limiter is not None:
+            self._metrics["limit"].set(self.limiter.limit)
+            self._metrics["inflight"].set(self.limiter.inflight)
+
+    @staticmethod
+    def _priority() -> str:
+        # Local application imports
+        from app.extensions import READ_ONLY_METHODS
+
+        return READ_PRIORITY if request.method in READ_ONLY_METHODS else WRITE_PRIORITY
+
+    @staticmethod
+    def _is_exempt(path: str) -> bool:
+        config = current_app.config
+        probes = (
+            config.get("HEALTH_LIVENESS_PATH"),
+            config.get("HEALTH_READINESS_PATH"),
+        )
+        return path in config["ADMISSION_EXEMPT_PATHS"] or path in probes
+
+    def _admit(self):
+        config = current_app.config
+        if self._is_exempt(request.path):
+            return
+        priority = self._priority()
+        share = (
+            1 - config["ADMISSION_WRITE_RESERVE"] if priority == READ_PRIORITY else 1
+        )
+        if not self.limiter.acquire(share):
+            # Local application imports
+            from app.api.error import ServiceUnavailableError
+
+            self.rejected[priority] += 1
+            if self._metrics is not None:
+                self._metrics["rejected"].labels(priority).inc()
+            raise ServiceUnavailableError(retry_after=config["ADMISSION_RETRY_AFTER"])
+        g.admission_start_time = time.perf_counter()
+        g.admission_status = None
+        self._update_metrics()
+
+    @staticmethod
+    def _record_status(response):
+        g.admission_status = response.status_code
+        return response
+
+    def _release(self, exception=None):
+        start_time = getattr(g, "admission_start_time", None)
+        if start_time is None:
+            return
+        g.admission_start_time = None
+        status = getattr(g, "admission_status", None)
+        if status == 503:
+            # Shed further on (by a bulkhead), says nothing about the latency
+            self.limiter.release()
+        else:
+            failed = exception is not None or status is None or status >= 500
+            self.limiter.release(time.perf_counter() - start_time, failed)
+        self._update_metrics()
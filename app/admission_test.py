@@ -0,0 +1,79 @@
+# Third party imports
+from flask import Flask
+
+# Local application imports
+from app.admission import AdmissionController, GradientLimiter
+
+
+def test_limiter_acquire():
+    limiter = GradientLimiter(initial_limit=4, min_limit=1)
+    assert limiter.acquire(0.5) and limiter.acquire(0.5)
+    assert not limiter.acquire(0.5)
+    assert limiter.acquire() and limiter.acquire()
+    assert not limiter.acquire()
+    limiter.release()
+    assert limiter.inflight == 3
+    assert limiter.acquire()
+
+
+def test_limiter_adapts_to_latency():
+    limiter = GradientLimiter(initial_limit=10, min_limit=2, max_limit=100)
+
+    # Flat latency at the limit, the limit grows
+    for _ in range(50):
+        limiter._update(0.01, int(limiter.limit))
+    grown = limiter.limit
+    assert grown > 10
+
+    # Queueing, the latency rises and the limit shrinks
+    for _ in range(50):
+        limiter._update(0.1, int(limiter.limit))
+    assert limiter.limit < grown / 2
+
+    # Far below the limit the latency says nothing about it
+    limit = limiter.limit
+    limiter._update(1.0, 0)
+    assert limiter.limit == limit
+
+    assert limiter.acquire()
+    limiter.release(0.01, failed=True)
+    assert limiter.limit == max(2, limit * 0.9)
+
+
+def test_admission(app, client):
+    admission = app.extensions["admission"]
+    limiter = admission.limiter
+    # The reads use up their share of the limit
+    limiter.inflight = int(limiter.limit * 0.8)
+
+    response = client.get("/api/book/1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json()["error"]["code"] == 503
+
+    # The writes still have their reserve, admitted and rejected by validation
+    response = client.post("/api/book", json=dict(title=1))
+    assert response.status_code == 422
+
+    # Probes and metrics are never shed
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert b"admission_concurrency_limit" in response.data
+
+    assert admission.snapshot()["rejected"] == dict(read=1)
+    assert limiter.inflight == int(limiter.limit * 0.8)
+
+
+def test_admission_disabled():
+    app = Flask(__name__)
+    app.config["ADMISSION_ENABLED"] = False
+    admission = AdmissionController(app)
+    assert admission.limiter is None
+    assert "admission" not in app.extensions
+    assert admission.snapshot() == dict(
+        enabled=False, limit=None, inflight=0, rejected={}
+    )
+    admission._update_metrics()
+
+    assert AdmissionController().snapshot()["enabled"] is False
+    assert app.config["ADMISSION_EXEMPT_PATHS"] == ["/metrics", "/healthz", "/readyz"]
@@ -1,6 +1,24 @@
-# Local application imports
-from app.api.book import BookAPI
+# Standard library imports
+from importlib import import_module
+
+# Registered APIs as "module:attribute", imported on registration so importing
+# the app package does not pull in every API, its schemas and marshmallow
+APIS = ["app.api.book:BookAPI"]
+
+
+def load_api(path: str):
+    assert isinstance(path, str) and ":" in path
+    module_name, attr = path.split(":")
+    return getattr(import_module(module_name), attr)
 
 
 def register_apis(app):
-    BookAPI.register(app)
+    for path in APIS:
+        load_api(path).register(app)
+
+
+def __getattr__(name: str):
+    for path in APIS:
+        if path.endswith(f":{name}"):
+            return load_api(path)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,25 +2,54 @@
 import inspect
 import uuid
 from datetime import datetime as dt
-from typing import Optional
+from typing import List, Optional
 
 # Third party imports
-from flask import Request, g, request
+from flask import Request, after_this_request, current_app, g, request
 from flask_classful import FlaskView
 from flask_sqlalchemy import DefaultMeta
 from marshmallow.exceptions import ValidationError as SchemaValidationError
 from marshmallow.schema import SchemaMeta
 from webargs.flaskparser import parser, use_args
+from webargs.multidictproxy import MultiDictProxy
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import quote_etag
 
 # Local application imports
+from app.bulkhead import CHEAP, EXPENSIVE
+from app.capture import finish_request_capture, start_request_capture
+from app.explain import EXPLAIN_PARAM
+from app.profiling import finish_request_profile, start_request_profile
 from app.utils import localize_text
 
 # Local folder imports
 from .const import DEFAULT_ITEMS_PER_PAGE
-from .error import BadRequestError, NotFoundError, ValidationError
+from .deadline import start_request_deadline
+from .error import (
+    BadRequestError,
+    NotFoundError,
+    PreconditionFailedError,
+    ValidationError,
+)
+from .idempotency import idempotent
+from .model import Model, VersionedMixin
 from .representation import output_json
 from .response import APIResponse
 from .schema import APIPaginationDataSchema, BaseSchema
+from .unit_of_work import finish_request_unit_of_work, start_request_unit_of_work
+
+DEBUG_QUERY_ARGS = (EXPLAIN_PARAM,)
+
+
+@parser.location_loader("api_query")
+def load_api_query(req: Request, schema: BaseSchema):
+    """Query arguments without the debug switches, such as ``_explain``."""
+    args: MultiDict = MultiDict(
+        (key, value)
+        for key, value in req.args.items(multi=True)
+        if key not in DEBUG_QUERY_ARGS
+    )
+    return MultiDictProxy(args, schema)
 
 
 class BaseAPI(FlaskView):
@@ -37,6 +66,13 @@ class BaseAPI(FlaskView):
     api_version: Optional[str] = None
     trailing_slash = False
     service: Optional[type] = None
+    # PUT creates a missing item with the id of the URL, meant for models
+    # whose ids are chosen by the clients rather than a sequence
+    put_creates = False
+    # Cost class of the views, the classes have separate concurrency limits
+    # and connection pools so slow lists cannot starve the point lookups
+    default_cost_class = CHEAP
+    cost_classes = {"index": EXPENSIVE}
 
     def _add_api_version(self):
         if getattr(g, "api_version", None) is None:
@@ -69,11 +105,45 @@ class BaseAPI(FlaskView):
         request_id = uuid.uuid4()
         g.request_id = request_id
 
+    def _cost_class(self, name: str) -> str:
+        return self.cost_classes.get(name, self.default_cost_class)
+
+    def _start_deadline(self, name: str):
+        # Before the bulkhead, waiting for a slot uses up the deadline too
+        start_request_deadline(self._cost_class(name))
+
+    def _enter_bulkhead(self, name: str):
+        bulkheads = current_app.extensions.get("bulkheads")
+        if bulkheads is not None:
+            bulkheads.acquire(self._cost_class(name))
+
+    @staticmethod
+    def _start_unit_of_work():
+        # Committed before the profile and the capture are finished
+        start_request_unit_of_work()
+        after_this_request(finish_request_unit_of_work)
+
+    @staticmethod
+    def _start_profiling():
+        # Runs for error responses too, unlike the after_request hook
+        if start_request_profile():
+            after_this_request(finish_request_profile)
+
+    @staticmethod
+    def _start_capture():
+        if start_request_capture():
+            after_this_request(finish_request_capture)
+
     def before_request(self, name, *args, **kwargs):
         self._log_start_time()
         self._add_request_id()
         self._add_api_version()
         self._add_params()
+        self._start_deadline(name)
+        self._enter_bulkhead(name)
+        self._start_unit_of_work()
+        self._start_profiling()
+        self._start_capture()
 
     def _get_item_by_id_or_not_found(self, id: int):
         try:
@@ -102,6 +172,25 @@ class BaseAPI(FlaskView):
         )
         raise ValidationError(errors=errors)
 
+    def _if_match_versions(self) -> Optional[List[int]]:
+        """Versions of the ``If-Match`` header, None without a condition."""
+        if_match = request.if_match
+        if not if_match or if_match.star_tag:
+            return None
+        if self.model is None or not issubclass(self.model, VersionedMixin):
+            return None
+        # Strong comparison, an ETag that is no version matches nothing
+        return [int(tag) for tag in if_match.as_set() if tag.isdigit()]
+
+    @staticmethod
+    def _item_response(item: Model, schema: SchemaMeta, status_code: int = 200):
+        """The response of an item, versioned items carry their version as ETag."""
+        response = APIResponse().create_response(item=item, schema=schema)
+        if not isinstance(item, VersionedMixin):
+            return response if status_code == 200 else (response, status_code)
+        return response, status_code, {"ETag": quote_etag(str(item.version))}
+
+    @idempotent
     def post(self):
         request_body = request.get_json()
         if request_body is None:
@@ -112,16 +201,16 @@ class BaseAPI(FlaskView):
         except SchemaValidationError as err:
             raise ValidationError(errors=err.messages)
         item = self._service().create(data)
-        return APIResponse().create_response(item=item, schema=self.schema)
+        return self._item_response(item, self.schema)
 
     def get(self, id: int):
         self._update_params({"id": id})
         schema = self.schema
         assert schema is not None and issubclass(schema, BaseSchema)
         item = self._get_item_by_id_or_not_found(id)
-        return APIResponse().create_response(item=item, schema=schema)
+        return self._item_response(item, schema)
 
-    @use_args(APIPaginationDataSchema(), location="query")
+    @use_args(APIPaginationDataSchema(), location="api_query")
     def index(self, args):
         items_per_page: int = args.get("items_per_page") or DEFAULT_ITEMS_PER_PAGE
         page_index: Optional[int] = args.get("page_index")
@@ -150,14 +239,35 @@ class BaseAPI(FlaskView):
             data = schema().load(request_body)
         except SchemaValidationError as err:
             raise ValidationError(errors=err.messages)
-        item = self._get_item_by_id_or_not_found(id)
-        item = self._service().update(item, data)
-        return APIResponse().create_response(item=item, schema=schema)
+        versions = self._if_match_versions()
+        service = self._service()
+        try:
+            if versions is not None:
+                item, created = service.update_by_id(id, data, versions), False
+            elif self.put_creates:
+                item, created = service.update_or_create(id, data)
+            else:
+                item, created = service.update_by_id(id, data), False
+        except TypeError:
+            raise BadRequestError
+        if item is None:
+            # A missing item fails the If-Match condition as well
+            raise NotFoundError if versions is None else PreconditionFailedError
+        return self._item_response(item, schema, 201 if created else 200)
 
     def delete(self, id: int):
         self._update_params({"id": id})
-        item = self._get_item_by_id_or_not_found(id)
-        self._service().delete(item)
+        versions = self._if_match_versions()
+        if versions is not None:
+            try:
+                deleted = self._service().delete_by_id(id, versions)
+            except TypeError:
+                raise BadRequestError
+            if not deleted:
+                raise PreconditionFailedError
+        else:
+            item = self._get_item_by_id_or_not_found(id)
+            self._service().delete(item)
         return APIResponse().create_success_response(
             model=self.model, method=request.method
         )
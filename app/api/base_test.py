@@ -354,12 +354,11 @@ def test_put(
     monkeypatch.setattr("app.api.base.BaseAPI._update_params", lambda *x, **y: None)
     monkeypatch.setattr("app.api.schema.BaseSchema.load", lambda *x, **y: data)
     monkeypatch.setattr("app.api.base.BaseAPI._service", lambda *x, **y: service)
-    monkeypatch.setattr("app.api.service.BaseService.update", lambda *x, **y: item)
     monkeypatch.setattr(
-        "app.api.response.APIResponse.create_response", lambda *x, **y: data
+        "app.api.service.BaseService.update_by_id", lambda *x, **y: item
     )
     monkeypatch.setattr(
-        "app.api.base.BaseAPI._get_item_by_id_or_not_found", lambda *x, **y: None
+        "app.api.response.APIResponse.create_response", lambda *x, **y: data
     )
 
     response = authenticated_client.put(endpoint, json=put_body)
@@ -368,6 +367,14 @@ def test_put(
     response = api.put(id)
     assert response == data
 
+    # Missing item
+    monkeypatch.setattr(
+        "app.api.service.BaseService.update_by_id", lambda *x, **y: None
+    )
+
+    with pytest.raises(NotFoundError):
+        api.put(id)
+
     # Deserialization failure
     def raise_validation_error(*args):
         # Third party imports
@@ -393,6 +400,67 @@ def test_put(
         api.put(id)
 
 
+def test_put_creates(monkeypatch, app, db):
+    # Local application imports
+    from app.api.book import BookAPI
+
+    client = app.test_client()
+    assert client.put("/api/book/1000", json=dict(title="foo")).status_code == 404
+
+    monkeypatch.setattr(BookAPI, "put_creates", True)
+    response = client.put("/api/book/1000", json=dict(title="foo"))
+    assert response.status_code == 201
+    assert response.get_json()["data"] == dict(id=1000, title="foo")
+
+    # Idempotent, the same request updates the item it created
+    response = client.put("/api/book/1000", json=dict(title="foo"))
+    assert response.status_code == 200
+    assert response.get_json()["data"] == dict(id=1000, title="foo")
+    assert client.get("/api/book/1000").status_code == 200
+
+    # Later inserts take the ids after the one chosen by the client
+    response = client.post("/api/book", json=dict(title="bar"))
+    assert response.status_code == 200
+    assert response.get_json()["data"]["id"] == 1001
+
+    # The requests shared the app context (and session) of the db fixture
+    db.session.remove()
+
+
+def test_if_match(app, db, assert_num_queries):
+    client = app.test_client()
+    response = client.post("/api/book", json=dict(title="foo"))
+    assert response.headers["ETag"] == '"1"'
+    path = f"/api/book/{response.get_json()['data']['id']}"
+    assert client.get(path).headers["ETag"] == '"1"'
+
+    # A single conditional UPDATE, bumping the version
+    with assert_num_queries(1):
+        response = client.put(path, json=dict(title="bar"), headers={"If-Match": '"1"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+    # Another client wrote first
+    response = client.put(path, json=dict(title="baz"), headers={"If-Match": '"1"'})
+    assert response.status_code == 412
+    response = client.delete(path, headers={"If-Match": '"1", W/"2"'})
+    assert response.status_code == 412
+    assert client.get(path).get_json()["data"]["title"] == "bar"
+
+    # Unconditional writes still bump the version
+    assert client.put(path, json=dict(title="baz")).headers["ETag"] == '"3"'
+    with assert_num_queries(1):
+        response = client.delete(path, headers={"If-Match": '"2", "3"'})
+    assert response.status_code == 200
+    assert (
+        client.put(path, json=dict(title="x"), headers={"If-Match": "*"}).status_code
+        == 404
+    )
+
+    # The requests shared the app context (and session) of the db fixture
+    db.session.remove()
+
+
 def test_delete(
     monkeypatch,
     authenticated_client,
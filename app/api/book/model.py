@@ -1,9 +1,9 @@
 # Local application imports
-from app.api.model import CRUDModelMixin, Model
+from app.api.model import CRUDModelMixin, Model, VersionedMixin
 from app.extensions import db
 
 
-class Book(CRUDModelMixin, Model):
+class Book(VersionedMixin, CRUDModelMixin, Model):
 
     __tablename__ = "book"
 
@@ -13,9 +13,11 @@ class Book(CRUDModelMixin, Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def fake_row(cls, fake) -> dict:
+        return dict(title=fake.sentence())
+
     @classmethod
     def seed(cls, fake):
-        book = Book(
-            title=fake.sentence(),
-        )
+        book = Book(**cls.fake_row(fake))
         book.save()
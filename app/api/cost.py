@@ -0,0 +1,125 @@
+"""Cost guard of the list queries, based on the estimates of the planner.
+
+Before a list query runs its statement is explained (``EXPLAIN`` without
+``ANALYZE``, nothing is executed) and rejected when the estimated total cost
+exceeds ``QUERY_COST_LIMIT``. Estimates are cached per query shape, the SQL
+with the kind of its parameters, for ``QUERY_COST_CACHE_SECONDS`` so that
+they follow the growth of the tables and new statistics or indexes. The
+EXPLAIN runs in the transaction of the request, on the connection (and
+connection pool) of the query and within its deadline.
+"""
+# Standard library imports
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Third party imports
+from flask import current_app
+from sqlalchemy.orm import Query
+
+# Local application imports
+from app.explain import explain_in_transaction
+from app.utils import localize_text
+
+# Local folder imports
+from .error import BadRequestError
+
+WILDCARDS = ("%", "_")
+# Query shapes whose estimate is kept per process
+CACHE_SIZE = 1024
+
+
+class CostCache:
+    """Least recently used estimates of the query shapes, until they expire."""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._costs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[float]:
+        with self._lock:
+            entry = self._costs.get(key)
+            if entry is None:
+                return None
+            cost, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._costs[key]
+                return None
+            self._costs.move_to_end(key)
+            return cost
+
+    def set(self, key, cost: float, seconds: Optional[float] = None):
+        """Cache ``cost`` for ``seconds``, or until it is evicted without."""
+        expires_at = time.monotonic() + seconds if seconds else None
+        with self._lock:
+            self._costs[key] = (cost, expires_at)
+            self._costs.move_to_end(key)
+            while len(self._costs) > self.size:
+                self._costs.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._costs.clear()
+
+
+cost_cache = CostCache()
+
+
+def get_parameter_shape(value):
+    """What matters to the plan of a parameter rather than its value.
+
+    Patterns keep whether they start or end with a wildcard, numbers their
+    order of magnitude (an offset of 10 and of 10000 cost differently).
+    """
+    if isinstance(value, str):
+        return ("str", value.startswith(WILDCARDS), value.endswith(WILDCARDS))
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return ("int", value.bit_length())
+    if isinstance(value, (list, tuple)):
+        return ("list", len(value).bit_length())
+    return type(value).__name__
+
+
+def get_query_shape(statement: str, parameters: dict) -> Tuple:
+    return (statement,) + tuple(
+        (key, get_parameter_shape(value)) for key, value in sorted(parameters.items())
+    )
+
+
+def estimate_cost(query: Query) -> Optional[float]:
+    """Planner estimate of the total cost of ``query``, None when unknown."""
+    connection = query.session.connection(
+        mapper=query._bind_mapper(), clause=query.statement
+    )
+    if connection.dialect.name != "postgresql":
+        return None
+    compiled = query.statement.compile(dialect=connection.dialect)
+    statement, parameters = str(compiled), compiled.params
+    key = (str(connection.engine.url), get_query_shape(statement, parameters))
+    cost = cost_cache.get(key)
+    if cost is None:
+        result = explain_in_transaction(connection, statement, parameters, False)
+        if "error" in result:
+            current_app.logger.warning(f"Cost estimate failed: {result['error']}")
+            return None
+        cost = result["plan"]["Plan"]["Total Cost"]
+        cost_cache.set(key, cost, current_app.config["QUERY_COST_CACHE_SECONDS"])
+    return cost
+
+
+def check_query_cost(query: Query):
+    """Reject ``query`` when its estimated cost exceeds ``QUERY_COST_LIMIT``."""
+    limit = current_app.config["QUERY_COST_LIMIT"]
+    if not limit:
+        return
+    cost = estimate_cost(query)
+    if cost is None or cost <= limit:
+        return
+    message = localize_text("query_too_expensive").format(cost=round(cost), limit=limit)
+    raise BadRequestError(
+        message=message, errors=[dict(query=dict(cost=cost, limit=limit))]
+    )
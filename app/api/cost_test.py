@@ -0,0 +1,113 @@
+# Standard library imports
+import time
+
+# Third party imports
+import pytest
+
+# Local application imports
+from app.api import cost
+from app.api.book import Book
+from app.api.cost import (
+    CostCache,
+    check_query_cost,
+    cost_cache,
+    estimate_cost,
+    get_query_shape,
+)
+from app.api.error import BadRequestError
+
+
+@pytest.fixture(autouse=True)
+def clear_cost_cache():
+    cost_cache.clear()
+    yield
+    cost_cache.clear()
+
+
+def test_query_shape():
+    statement = "SELECT * FROM book WHERE title LIKE %(title)s LIMIT %(limit)s"
+
+    def shape(title, limit=10):
+        return get_query_shape(statement, dict(title=title, limit=limit))
+
+    assert shape("%a") == shape("%b")
+    assert shape("a%") != shape("%a")
+    assert shape("a%", limit=11) == shape("b%")
+    assert shape("a%", limit=10000) != shape("a%")
+
+
+def test_cost_cache():
+    cache = CostCache(size=2)
+    cache.set("a", 1.0)
+    cache.set("b", 2.0)
+    assert cache.get("a") == 1.0
+    # The least recently used one goes
+    cache.set("c", 3.0)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1.0 and cache.get("c") == 3.0
+
+
+def test_cost_cache_expiry(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache = CostCache()
+    cache.set("a", 1.0, seconds=10)
+    cache.set("b", 2.0)
+    now += 9
+    assert cache.get("a") == 1.0
+    now += 1
+    # Explained again, the tables or their statistics may have changed
+    assert cache.get("a") is None
+    assert cache.get("b") == 2.0
+
+
+def test_check_query_cost(monkeypatch, app, db):
+    explained = []
+    explain_in_transaction = cost.explain_in_transaction
+
+    def count_explain(connection, *args, **kwargs):
+        explained.append(connection)
+        return explain_in_transaction(connection, *args, **kwargs)
+
+    monkeypatch.setattr(cost, "explain_in_transaction", count_explain)
+    query = Book.filter([("title", "like", "%book%")])
+    estimate = estimate_cost(query)
+    assert estimate > 0
+    # On the connection of the session, within its transaction
+    assert explained == [db.session.connection()]
+    # Cached per shape
+    assert estimate_cost(Book.filter([("title", "like", "%other%")])) == estimate
+    assert len(explained) == 1
+
+    # Until the cached estimate expires
+    app.config["QUERY_COST_CACHE_SECONDS"] = 1
+    cost_cache.clear()
+    estimate_cost(query)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 1)
+    estimate_cost(query)
+    assert len(explained) == 3
+
+    app.config["QUERY_COST_LIMIT"] = 0
+    check_query_cost(query)
+    app.config["QUERY_COST_LIMIT"] = estimate * 2
+    check_query_cost(query)
+    app.config["QUERY_COST_LIMIT"] = estimate / 2
+    with pytest.raises(BadRequestError) as error:
+        check_query_cost(query)
+    assert error.value.errors == [dict(query=dict(cost=estimate, limit=estimate / 2))]
+    db.session.remove()
+
+
+def test_expensive_list(app, db, client):
+    app.config["QUERY_COST_LIMIT"] = 0.01
+    response = client.get("/api/book?pageIndex=1")
+    assert response.status_code == 400
+    error = response.get_json()["error"]
+    assert error["errors"][0]["query"]["limit"] == 0.01
+    assert "0.01" in error["message"]
+
+    app.config["QUERY_COST_LIMIT"] = 1e9
+    response = client.get("/api/book?pageIndex=1")
+    assert response.status_code == 200
+    db.session.remove()
@@ -0,0 +1,103 @@
+"""Request deadlines, the work of a request stops once its client gave up.
+
+The deadline of a request comes from the timeout of its cost class, clients
+may shorten it with a ``Request-Timeout`` header (in seconds). The time left
+becomes the ``statement_timeout`` of the PostgreSQL transactions the request
+begins, and the responses check it between their phases.
+"""
+# Standard library imports
+import math
+import time
+from typing import Optional
+
+# Third party imports
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# Local application imports
+from app.extensions import RoutingSession
+from app.utils import localize_text
+
+# Local folder imports
+from .error import BadRequestError, DeadlineExceededError
+
+HEADER = "Request-Timeout"
+# SQLSTATE of a statement canceled by the statement_timeout
+QUERY_CANCELED = "57014"
+
+
+def get_timeout_ms(cost_class: Optional[str] = None) -> float:
+    """Timeout of the current request in milliseconds, 0 without one."""
+    config = current_app.config
+    timeout_ms = config["REQUEST_TIMEOUTS_MS"].get(
+        cost_class, config["REQUEST_TIMEOUT_MS"]
+    )
+    value = request.headers.get(HEADER)
+    if value is None:
+        return timeout_ms
+    try:
+        requested_ms = float(value) * 1000
+    except ValueError:
+        requested_ms = math.nan
+    if not 0 < requested_ms < math.inf:
+        raise BadRequestError(message=localize_text("invalid_request_timeout"))
+    # Clients may only shorten the timeout
+    return min(timeout_ms, requested_ms) if timeout_ms else requested_ms
+
+
+def start_request_deadline(cost_class: Optional[str] = None):
+    timeout_ms = get_timeout_ms(cost_class)
+    g.deadline = time.monotonic() + timeout_ms / 1000 if timeout_ms else None
+
+
+def get_deadline() -> Optional[float]:
+    """``time.monotonic()`` deadline of the current request, if any."""
+    if not has_request_context():
+        return None
+    return getattr(g, "deadline", None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline of the current request."""
+    deadline = get_deadline()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline():
+    """Raise ``DeadlineExceededError`` once the deadline has passed."""
+    seconds = remaining()
+    if seconds is not None and seconds <= 0:
+        raise DeadlineExceededError
+
+
+def _set_statement_timeout(session, transaction, connection):
+    seconds = remaining()
+    if seconds is None or connection.dialect.name != "postgresql":
+        return
+    if seconds <= 0:
+        raise DeadlineExceededError
+    # Through the DBAPI cursor, part of beginning the transaction rather than
+    # a statement of the request (like the BEGIN sent by psycopg2)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(
+            "SET LOCAL statement_timeout = %s", (max(1, math.ceil(seconds * 1000)),)
+        )
+    finally:
+        cursor.close()
+
+
+def install_listener():
+    """Limit the statements of the request transactions (once per process)."""
+    if not event.contains(RoutingSession, "after_begin", _set_statement_timeout):
+        event.listen(RoutingSession, "after_begin", _set_statement_timeout)
+
+
+def handle_operational_error(error):
+    """Statements canceled at the deadline of the request fail with a 504."""
+    # Local application imports
+    from app import handle_error
+
+    if getattr(error.orig, "pgcode", None) != QUERY_CANCELED or get_deadline() is None:
+        raise error
+    return handle_error(DeadlineExceededError())
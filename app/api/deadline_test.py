@@ -0,0 +1,90 @@
+# Standard library imports
+import time
+
+# Third party imports
+import pytest
+from flask import g
+
+# Local application imports
+from app.api.book import Book
+from app.api.deadline import (
+    HEADER,
+    check_deadline,
+    get_timeout_ms,
+    remaining,
+    start_request_deadline,
+)
+from app.api.error import BadRequestError, DeadlineExceededError
+from app.api.service import BaseService
+
+# In milliseconds, SHOW formats the value
+SETTING_QUERY = "SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"
+
+
+def test_timeout(app):
+    timeouts = app.config["REQUEST_TIMEOUTS_MS"]
+    with app.test_request_context():
+        assert get_timeout_ms("cheap") == timeouts["cheap"]
+        assert get_timeout_ms("unknown") == app.config["REQUEST_TIMEOUT_MS"]
+
+    with app.test_request_context(headers={HEADER: "0.5"}):
+        assert get_timeout_ms("cheap") == 500
+    # Clients may only shorten the timeout
+    with app.test_request_context(headers={HEADER: "3600"}):
+        assert get_timeout_ms("cheap") == timeouts["cheap"]
+
+    for value in ("", "soon", "0", "-1", "inf", "nan"):
+        with app.test_request_context(headers={HEADER: value}):
+            with pytest.raises(BadRequestError):
+                get_timeout_ms("cheap")
+
+
+def test_check_deadline(app):
+    with app.test_request_context():
+        check_deadline()
+        start_request_deadline("cheap")
+        assert 0 < remaining() <= app.config["REQUEST_TIMEOUTS_MS"]["cheap"] / 1000
+        check_deadline()
+
+        g.deadline = time.monotonic() - 1
+        with pytest.raises(DeadlineExceededError):
+            check_deadline()
+
+
+def test_statement_timeout(app, db):
+    with app.test_request_context(headers={HEADER: "2"}):
+        start_request_deadline()
+        timeout = db.session.execute(SETTING_QUERY).scalar()
+        assert 1000 < int(timeout) <= 2000
+        db.session.remove()
+
+    # SET LOCAL, other transactions keep the default
+    with app.app_context():
+        assert db.session.execute(SETTING_QUERY).scalar() == "0"
+        db.session.remove()
+
+
+def test_deadline_exceeded(monkeypatch, app, db, client):
+    book = Book.create(title="Book")
+    url = f"/api/book/{book.id}"
+
+    def get_by_id_slow_query(self, id):
+        db.session.execute("SELECT pg_sleep(1)")
+
+    monkeypatch.setattr(BaseService, "get_by_id", get_by_id_slow_query)
+    response = client.get(url, headers={HEADER: "0.1"})
+    assert response.status_code == 504
+    assert response.get_json()["error"]["code"] == 504
+
+    def get_by_id_slow(self, id):
+        time.sleep(0.1)
+        return book
+
+    # Checked before the serialization
+    monkeypatch.setattr(BaseService, "get_by_id", get_by_id_slow)
+    response = client.get(url, headers={HEADER: "0.05"})
+    assert response.status_code == 504
+
+    response = client.get(url, headers={HEADER: "invalid"})
+    assert response.status_code == 400
+    db.session.remove()
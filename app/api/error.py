@@ -10,6 +10,7 @@ class APIError(BaseError):
     code: Optional[int] = None
     message: Optional[str] = None
     errors: Optional[List[dict]] = None
+    headers: Optional[dict] = None
 
     def __init__(self, errors: List[dict] = None, **kwargs):
         self.errors = errors
@@ -37,3 +38,28 @@ class ValidationError(APIError):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.message = localize_text("error_validation")
+
+
+class PreconditionFailedError(APIError):
+    code = 412
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.message = localize_text("error_precondition_failed")
+
+
+class ServiceUnavailableError(APIError):
+    code = 503
+
+    def __init__(self, retry_after: int = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.message = localize_text("error_service_unavailable")
+        self.headers = {"Retry-After": str(retry_after)}
+
+
+class DeadlineExceededError(APIError):
+    code = 504
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.message = localize_text("error_deadline_exceeded")
@@ -0,0 +1,158 @@
+"""Idempotency keys, retries of a request replay the response of the first try.
+
+The key is claimed with an INSERT in the transaction of the request and the
+response is stored in that same transaction, so the stored response commits
+(or rolls back) together with the changes of the request. A concurrent request
+with the same key blocks on the unique key until the first one finishes, then
+replays its response, or does the work itself when the first one rolled back.
+"""
+# Standard library imports
+import hashlib
+from datetime import datetime as dt
+from datetime import timedelta
+from functools import wraps
+from typing import Optional
+
+# Third party imports
+from flask import Response, current_app, request
+from flask_classful import unpack
+from sqlalchemy import inspect
+
+# Local application imports
+from app.extensions import db, use_primary
+from app.utils import localize_text
+
+# Local folder imports
+from .error import BadRequestError, ValidationError
+from .model import Model
+from .unit_of_work import unit_of_work
+from .upsert import upsert_statement
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# Set again by the replayed response
+SKIPPED_HEADERS = ("Content-Length",)
+
+
+class IdempotencyKey(Model):
+    __tablename__ = "idempotency_key"
+
+    key = db.Column(db.String(255), primary_key=True)
+    # Hash of the request, a key cannot be reused for another request
+    fingerprint = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    status_code = db.Column(db.Integer)
+    headers = db.Column(db.JSON(none_as_null=True))
+    body = db.Column(db.LargeBinary)
+
+
+def get_fingerprint() -> str:
+    data = f"{request.method} {request.path}\n".encode()
+    return hashlib.sha256(data + request.get_data(cache=True)).hexdigest()
+
+
+def claim(key: str, fingerprint: str, ttl: int) -> Optional[IdempotencyKey]:
+    """Claim ``key`` for the current request, expired keys are taken over.
+
+    Returns None when the request owns the key, otherwise the stored key.
+    """
+    now = dt.utcnow()
+    table = IdempotencyKey.__table__
+    row = dict(
+        key=key,
+        fingerprint=fingerprint,
+        expires_at=now + timedelta(seconds=ttl),
+        status_code=None,
+        headers=None,
+        body=None,
+    )
+    session = db.session
+    mapper = inspect(IdempotencyKey)
+    dialect_name = session.get_bind(mapper, clause=table.insert()).dialect.name
+    statement = upsert_statement(
+        dialect_name,
+        table,
+        [row],
+        ["key"],
+        [column for column in row if column != "key"],
+        where=table.c.expires_at <= now,
+    )
+    with unit_of_work() as work:
+        if work.session.execute(statement, mapper=mapper).rowcount:
+            work.mark_changed()
+            return None
+    return session.query(IdempotencyKey).populate_existing().get(key)
+
+
+def store(key: str, response: Response):
+    table = IdempotencyKey.__table__
+    headers = [
+        [name, value] for name, value in response.headers if name not in SKIPPED_HEADERS
+    ]
+    statement = (
+        table.update()
+        .where(table.c.key == key)
+        .values(
+            status_code=response.status_code, headers=headers, body=response.get_data(),
+        )
+    )
+    with unit_of_work() as work:
+        work.session.execute(statement, mapper=inspect(IdempotencyKey))
+        work.mark_changed()
+
+
+def replay(stored: IdempotencyKey) -> Response:
+    response = Response(
+        stored.body,
+        status=stored.status_code,
+        headers=[(name, value) for name, value in stored.headers],
+    )
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def purge_expired() -> int:
+    """Delete the expired keys, returns how many were deleted."""
+    table = IdempotencyKey.__table__
+    statement = table.delete().where(table.c.expires_at <= dt.utcnow())
+    with unit_of_work() as work:
+        result = work.session.execute(statement, mapper=inspect(IdempotencyKey))
+        work.mark_changed()
+    return result.rowcount
+
+
+def idempotent(view):
+    """Make a view of a ``BaseAPI`` idempotent for the requests with a key.
+
+    The response of the first request with an ``Idempotency-Key`` header is
+    replayed byte for byte to the later requests with that key. Error
+    responses roll back with the request and are not stored.
+    """
+
+    @wraps(view)
+    def wrapper(self, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(self, *args, **kwargs)
+        config = current_app.config
+        if not key or len(key) > config["IDEMPOTENCY_KEY_MAX_LENGTH"]:
+            raise BadRequestError(message=localize_text("invalid_idempotency_key"))
+
+        use_primary()
+        fingerprint = get_fingerprint()
+        stored = claim(key, fingerprint, config["IDEMPOTENCY_TTL_SECONDS"])
+        if stored is not None:
+            if stored.fingerprint != fingerprint:
+                message = localize_text("idempotency_key_reused")
+                raise ValidationError(errors=[{HEADER: [message]}])
+            return replay(stored)
+
+        response = view(self, *args, **kwargs)
+        if not isinstance(response, Response):
+            data, code, headers = unpack(response)
+            representation = self.representations["flask-classful/default"]
+            response = representation(data, code, headers)
+        store(key, response)
+        return response
+
+    return wrapper
@@ -0,0 +1,97 @@
+# Standard library imports
+import threading
+import time
+
+# Local application imports
+from app.api.idempotency import HEADER, REPLAYED_HEADER, purge_expired
+
+
+def count_books(db) -> int:
+    return db.session.execute("SELECT count(*) FROM book").scalar()
+
+
+def test_idempotent_post(app, db, assert_num_queries):
+    client = app.test_client()
+    headers = {HEADER: "key-1"}
+
+    # Claim, insert and store the response
+    with assert_num_queries(3):
+        first = client.post("/api/book", json=dict(title="foo"), headers=headers)
+    assert first.status_code == 200
+    assert REPLAYED_HEADER not in first.headers
+
+    retry = client.post("/api/book", json=dict(title="foo"), headers=headers)
+    assert retry.status_code == 200
+    assert retry.get_data() == first.get_data()
+    assert retry.headers["ETag"] == first.headers["ETag"]
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert count_books(db) == 1
+
+    # Another request with the same key
+    response = client.post("/api/book", json=dict(title="bar"), headers=headers)
+    assert response.status_code == 422
+    response = client.post("/api/book", json=dict(title="bar"), headers={HEADER: ""})
+    assert response.status_code == 400
+
+    # Failed requests are not stored
+    headers = {HEADER: "key-2"}
+    assert (
+        client.post("/api/book", json=dict(title=1), headers=headers).status_code == 422
+    )
+    response = client.post("/api/book", json=dict(title="bar"), headers=headers)
+    assert REPLAYED_HEADER not in response.headers
+    assert count_books(db) == 2
+
+    # The requests shared the app context (and session) of the db fixture
+    db.session.remove()
+
+
+def test_expired_keys(app, db):
+    app.config["IDEMPOTENCY_TTL_SECONDS"] = 0
+    client = app.test_client()
+    headers = {HEADER: "key"}
+    for _ in range(2):
+        response = client.post("/api/book", json=dict(title="foo"), headers=headers)
+        assert REPLAYED_HEADER not in response.headers
+    assert count_books(db) == 2
+
+    assert purge_expired() == 1
+    db.session.remove()
+
+
+def test_concurrent_duplicates(monkeypatch, app, db):
+    # Local application imports
+    from app.api.service import BaseService
+
+    create = BaseService.create
+
+    def slow_create(*args, **kwargs):
+        item = create(*args, **kwargs)
+        time.sleep(0.5)
+        return item
+
+    monkeypatch.setattr(BaseService, "create", slow_create)
+    responses = []
+
+    def post():
+        response = app.test_client().post(
+            "/api/book", json=dict(title="foo"), headers={HEADER: "key"}
+        )
+        responses.append(response)
+
+    threads = [threading.Thread(target=post) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    for thread in threads:
+        thread.join()
+
+    # The duplicate waited on the original and replayed its response
+    assert [response.status_code for response in responses] == [200, 200]
+    assert responses[0].get_data() == responses[1].get_data()
+    assert [REPLAYED_HEADER in response.headers for response in responses] == [
+        False,
+        True,
+    ]
+    assert count_books(db) == 1
+    db.session.remove()
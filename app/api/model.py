@@ -1,19 +1,59 @@
+# Standard library imports
+from typing import List, Optional, Sequence
+
+# Third party imports
+from flask_sqlalchemy import BaseQuery
+from sqlalchemy import Table, UniqueConstraint, inspect
+from sqlalchemy.ext.declarative import declared_attr
+
 # Local application imports
 from app.extensions import db
 
+# Local folder imports
+from .upsert import DIALECTS, upsert_statement
+
+
+def load_returned(session, model, result) -> list:
+    """Instances of the rows of a ``RETURNING`` result, replacing loaded state."""
+    query = session.query(model).populate_existing()
+    return list(query.instances(result))
+
 
 class Model(db.Model):
     __abstract__ = True
+    # Server generated values come back with RETURNING in the INSERT or UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
     def __init__(self, *arg, **kwargs):
         super().__init__(*arg, **kwargs)
 
 
+class VersionedMixin:
+    """Optimistic concurrency, every write of the row bumps its ``version``.
+
+    The ORM adds the version it loaded to the WHERE clause of its UPDATE and
+    DELETE statements and raises ``StaleDataError`` when another write came
+    first. The API exposes the version as the ETag of the item.
+    """
+
+    @declared_attr
+    def version(cls):
+        # Created with the model, after its own columns
+        return db.Column(db.Integer, nullable=False, server_default="1")
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return dict(Model.__mapper_args__, version_id_col=cls.version)
+
+
 class CRUDModelMixin:
     __table_args__ = {"extend_existing": True}
     # https://docs.sqlalchemy.org/en/13/core/metadata.html?highlight=\
     # extend_existing#sqlalchemy.schema.Table.params.extend_existing
 
+    # Set on the models by the declarative base
+    __table__: Table
+    query: BaseQuery
     session = None
 
     def __init__(self, session=None, *args, **kwargs):
@@ -26,11 +66,134 @@ class CRUDModelMixin:
 
     @classmethod
     def find_or_create(cls, commit=True, **kwargs):
+        if cls._upsert_dialect() and cls._conflict_target(kwargs):
+            # One statement, no duplicate when another request creates it too
+            return cls.upsert(
+                kwargs, index_elements=list(kwargs), update=False, commit=commit
+            )
         obj = cls.find(**kwargs)
         if not obj:
             obj = cls.create(commit=commit, **kwargs)
         return obj
 
+    @classmethod
+    def _upsert_dialect(cls) -> Optional[str]:
+        """Name of the dialect of the primary when it supports upserts."""
+        bind = db.session.get_bind(inspect(cls), clause=cls.__table__.insert())
+        name = bind.dialect.name
+        return name if name in DIALECTS else None
+
+    @classmethod
+    def _conflict_target(cls, keys: Sequence[str]) -> Optional[List[str]]:
+        """Columns of the primary key or of a unique constraint made of ``keys``."""
+        table = cls.__table__
+        candidates = [table.primary_key.columns]
+        candidates += [
+            constraint.columns
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        ]
+        candidates += [index.columns for index in table.indexes if index.unique]
+        for columns in candidates:
+            names = [column.key for column in columns]
+            if names and set(names) == set(keys):
+                return names
+        return None
+
+    @classmethod
+    def _upsert_columns(cls, keys, index_elements, update) -> tuple:
+        table = cls.__table__
+        index_elements = list(index_elements or table.primary_key.columns.keys())
+        assert all(key in table.columns for key in keys)
+        assert all(key in keys for key in index_elements)
+        update_columns = [
+            key
+            for key in keys
+            if key not in index_elements and table.columns[key] is not cls._version()
+        ]
+        return index_elements, update_columns if update else []
+
+    @classmethod
+    def _version(cls):
+        """The version column of a versioned model."""
+        return inspect(cls).version_id_col
+
+    @classmethod
+    def upsert(cls, values: dict, index_elements=None, update=True, commit=True):
+        """Insert a row or update the row conflicting on ``index_elements``
+        (the primary key by default), an existing row is left as is when
+        ``update`` is False. Returns the instance of the row.
+        """
+        assert isinstance(values, dict)
+        session = db.session
+        dialect_name = cls._upsert_dialect()
+        assert dialect_name is not None, f"Upserts require one of {DIALECTS}"
+        index_elements, update_columns = cls._upsert_columns(
+            values, index_elements, update
+        )
+        statement = upsert_statement(
+            dialect_name,
+            cls.__table__,
+            [values],
+            index_elements,
+            update_columns,
+            cls._version(),
+        )
+        obj = None
+        if dialect_name == "postgresql":
+            result = session.execute(
+                statement.returning(*cls.__table__.columns), mapper=inspect(cls)
+            )
+            # DO NOTHING returns no row, the existing one is selected after
+            returned = load_returned(session, cls, result)
+            obj = returned[0] if returned else None
+        else:
+            session.execute(statement, mapper=inspect(cls))
+        if obj is None:
+            keys = {key: values[key] for key in index_elements}
+            obj = cls.query.filter_by(**keys).populate_existing().one()
+        if commit is True:
+            session.commit()
+        return obj
+
+    @classmethod
+    def bulk_upsert(
+        cls, rows: List[dict], index_elements=None, update=True, commit=True
+    ) -> int:
+        """Upsert ``rows`` with multi-row statements, skips the rows that
+        conflict when ``update`` is False. Returns the number of rows written.
+        """
+        assert isinstance(rows, list)
+        if not rows:
+            return 0
+        keys = list(rows[0])
+        assert all(list(row) == keys for row in rows), "Rows need the same keys"
+        session = db.session
+        dialect_name = cls._upsert_dialect()
+        assert dialect_name is not None, f"Upserts require one of {DIALECTS}"
+        index_elements, update_columns = cls._upsert_columns(
+            keys, index_elements, update
+        )
+        count = 0
+        for start in range(0, len(rows), 1000):
+            end = start + 1000
+            statement = upsert_statement(
+                dialect_name,
+                cls.__table__,
+                rows[start:end],
+                index_elements,
+                update_columns,
+                cls._version(),
+            )
+            count += session.execute(statement, mapper=inspect(cls)).rowcount
+        # Loaded instances missed the statements, reload them on access
+        for obj in list(session.identity_map.values()):
+            if isinstance(obj, cls):
+                session.expire(obj)
+        if commit is True:
+            session.commit()
+        return count
+
     @classmethod
     def get_by_id(cls, id):
         if any((isinstance(id, str) and id.isdigit(), isinstance(id, (int, float))),):
@@ -113,14 +276,20 @@ class CRUDModelMixin:
             setattr(self, attr, value)
         return commit and self.save() or self
 
+    def _get_session(self):
+        # Instances loaded from the database skip __init__
+        return self.session or db.session
+
     def save(self, commit=True):
-        self.session.add(self)
+        session = self._get_session()
+        session.add(self)
         if commit is True:
-            self.session.commit()
+            session.commit()
         return self
 
     def delete(self, commit=True):
-        self.session.delete(self)
+        session = self._get_session()
+        session.delete(self)
         if commit is True:
-            self.session.commit()
+            session.commit()
         return
@@ -40,6 +40,50 @@ def test_crud_model_mixin_find_or_create(db_session, dummy_crud_model):
     assert len(dummy_crud_model.query.all()) == 3
 
 
+def test_crud_model_mixin_find_or_create_unique(
+    db_session, dummy_crud_model, assert_num_queries
+):
+    # Keys of the primary key (or a unique constraint) take a single upsert,
+    # an existing row is selected after the INSERT that did nothing
+    with assert_num_queries(1):
+        created = dummy_crud_model.find_or_create(commit=False, id=100)
+    with assert_num_queries(2):
+        found = dummy_crud_model.find_or_create(commit=False, id=100)
+    assert found is created
+    assert len(dummy_crud_model.query.all()) == 1
+
+
+def test_crud_model_mixin_upsert(db_session, dummy_crud_model):
+    created = dummy_crud_model.upsert(dict(id=1, txt="foo"))
+    assert created.txt == "foo"
+
+    updated = dummy_crud_model.upsert(dict(id=1, txt="bar"))
+    assert updated is created
+    assert updated.txt == "bar"
+
+    kept = dummy_crud_model.upsert(dict(id=1, txt="baz"), update=False)
+    assert kept.txt == "bar"
+    assert len(dummy_crud_model.query.all()) == 1
+
+    with pytest.raises(AssertionError):
+        dummy_crud_model.upsert(dict(txt="foo"))
+
+
+def test_crud_model_mixin_bulk_upsert(db_session, dummy_crud_model):
+    rows = [dict(id=index, txt=f"obj_{index}") for index in range(1, 4)]
+    assert dummy_crud_model.bulk_upsert(rows) == 3
+
+    rows = [dict(id=index, txt="new") for index in range(3, 6)]
+    assert dummy_crud_model.bulk_upsert(rows, update=False) == 2
+    assert dummy_crud_model.get_by_id(3).txt == "obj_3"
+    assert dummy_crud_model.bulk_upsert(rows) == 3
+    assert dummy_crud_model.get_by_id(3).txt == "new"
+    assert len(dummy_crud_model.query.all()) == 5
+
+    with pytest.raises(AssertionError):
+        dummy_crud_model.bulk_upsert([dict(id=6), dict(id=7, txt="foo")])
+
+
 def test_crud_model_mixin_get_by_id(db_session, dummy_crud_model):
     assert issubclass(dummy_crud_model, CRUDModelMixin)
 
@@ -186,3 +230,16 @@ def test_crud_model_mixin_delete(db_session, dummy_crud_model):
     assert len(dummy_crud_model.query.all()) == 1
     obj.delete()
     assert len(dummy_crud_model.query.all()) == 0
+
+
+def test_versioned_upsert(db_session):
+    # Local application imports
+    from app.api.book import Book
+
+    book = Book.upsert(dict(id=1, title="a"))
+    assert book.version == 1
+    assert Book.upsert(dict(id=1, title="b")).version == 2
+    assert Book.upsert(dict(id=1, title="c"), update=False).version == 2
+    Book.bulk_upsert([dict(id=1, title="d"), dict(id=2, title="e")])
+    assert Book.get_by_id(1).version == 3
+    assert Book.get_by_id(2).version == 1
@@ -5,7 +5,9 @@ import json
 from flask import make_response
 
 
-def output_json(data, code, headers=None):
+def output_json(data, code=None, headers=None):
+    # Views that return only data leave the status code to us
+    code = 200 if code is None else code
     assert isinstance(code, int)
     assert data is not None
     assert headers is None or isinstance(headers, dict)
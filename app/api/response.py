@@ -1,5 +1,6 @@
 # Standard library imports
 import math
+from functools import partial
 from typing import Optional, Tuple
 
 # Third party imports
@@ -8,9 +9,15 @@ from flask_sqlalchemy import DefaultMeta
 from marshmallow.schema import SchemaMeta
 from sqlalchemy.orm import Query
 
+# Local application imports
+from app.extensions import metrics
+from app.i18n import get_catalog
+
 # Local folder imports
 from ..utils import localize_text
 from .const import HttpMethodVerbs
+from .cost import check_query_cost
+from .deadline import check_deadline
 from .error import APIError
 from .model import Model
 from .schema import (
@@ -107,21 +114,40 @@ class APIResponse(object):
     def create_success_response(self, model: DefaultMeta, method: str) -> dict:
         assert issubclass(model, Model)
         assert isinstance(method, str)
-        model_name = localize_text(model.__name__.lower()).capitalize()
-        method_verb = HttpMethodVerbs[method].done()
-        message = f"{model_name} {localize_text('successfully')} {(method_verb)}"
+        message = self.get_success_message(model, method)
         success = dict(message=message)
         response = self._create_response(success=success)
         result = APISuccessResponseSchema().dump(response)
         return result
 
+    @staticmethod
+    def render_success_message(model_key: str, method: str, gettext) -> str:
+        model_name = gettext(model_key).capitalize()
+        method_verb = gettext(HttpMethodVerbs[method].value[1])
+        return f"{model_name} {gettext('successfully')} {method_verb}"
+
+    def get_success_message(self, model: DefaultMeta, method: str) -> str:
+        """Success message, rendered once per model, method and locale."""
+        model_key = model.__name__.lower()
+        catalog = get_catalog()
+        if catalog is None:
+            return self.render_success_message(model_key, method, localize_text)
+        return catalog.render(
+            ("success", model_key, method),
+            lambda locale: self.render_success_message(
+                model_key, method, partial(catalog.gettext, locale=locale)
+            ),
+        )
+
     def create_response(self, item: Model, schema: SchemaMeta) -> dict:
         # Validate
         assert isinstance(item, Model)
         assert issubclass(schema, BaseSchema)
 
         # Serialize
-        data = schema(many=False).dump(item)
+        check_deadline()
+        with metrics.measure_serialization(schema.__name__):
+            data = schema(many=False).dump(item)
 
         response = self._create_response(data=data)
 
@@ -140,7 +166,10 @@ class APIResponse(object):
         assert issubclass(schema, BaseSchema)
         assert isinstance(items_per_page, int)
 
+        # Ordering does not change the count, only its cost
+        check_query_cost(query.order_by(None))
         total_items = query.count()
+        check_deadline()
         start_index, stop_index, page_index, total_pages = self._get_pagination_params(
             page_index, start_index, items_per_page, total_items
         )
@@ -149,10 +178,13 @@ class APIResponse(object):
 
         # Slice
         items = query.slice(start_index - 1, stop_index)
+        check_query_cost(items)
         current_item_count = items.count()
+        check_deadline()
 
         # Serialize
-        items = schema(many=True).dump(items)
+        with metrics.measure_serialization(schema.__name__):
+            items = schema(many=True).dump(items)
 
         # Prepare result
         data = dict(
@@ -2,8 +2,8 @@
 from datetime import datetime as dt
 
 # Third party imports
-from flask import g
-from marshmallow import fields
+from flask import g, has_request_context
+from marshmallow import fields, post_dump
 from marshmallow.schema import BaseSchema as Schema
 
 # Local application imports
@@ -45,6 +45,18 @@ class APIResponseSchema(BaseSchema):
         lambda _: timedelta_in_ms(dt.now(), getattr(g, "request_start_time", None))
     )
 
+    @post_dump
+    def add_query_plans(self, data, **kwargs):
+        """Plans of the request's queries with ?_explain=analyze in debug mode."""
+        if has_request_context():
+            # Local application imports
+            from app.explain import explain_request_queries
+
+            plans = explain_request_queries()
+            if plans is not None:
+                data["explain"] = plans
+        return data
+
 
 class APISingleResponseSchema(APIResponseSchema):
     """Inspiration: https://google.github.io/styleguide/jsoncstyleguide.xml"""
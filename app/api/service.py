@@ -1,11 +1,28 @@
 # Standard library imports
-from typing import Optional
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
 
 # Third party imports
+from sqlalchemy import and_, inspect
 from sqlalchemy.orm import Query
+from sqlalchemy.orm.exc import StaleDataError
+
+# Local application imports
+from app.extensions import use_primary
 
 # Local folder imports
-from .model import CRUDModelMixin, Model
+from .error import PreconditionFailedError
+from .model import CRUDModelMixin, Model, load_returned
+from .unit_of_work import unit_of_work
+
+
+@contextmanager
+def precondition_on_stale_data():
+    """A versioned write that lost to another one fails the precondition."""
+    try:
+        yield
+    except StaleDataError:
+        raise PreconditionFailedError
 
 
 class BaseService:
@@ -27,22 +44,167 @@ class BaseService:
         assert self.model is not None
         return self.model.filter(filters)
 
-    def create(self, data: dict, commit: bool = True) -> Model:
-        assert isinstance(commit, bool)
+    def create(self, data: dict) -> Model:
         assert isinstance(data, dict)
         assert self.model is not None
-        return self.model.create(commit, **data)
+        use_primary()
+        with unit_of_work() as work:
+            item = work.add(self.model(**data))
+            # The response needs the primary key
+            work.flush()
+        return item
 
     @staticmethod
-    def update(item: Model, data: dict, commit: bool = True) -> Model:
-        assert isinstance(commit, bool)
+    def update(item: Model, data: dict) -> Model:
         assert isinstance(item, Model)
         assert isinstance(data, dict)
-        return item.update(commit, **data)
+        use_primary()
+        with unit_of_work() as work:
+            work.add(item.update(commit=False, **data))
+        return item
+
+    def update_by_id(
+        self, id: int, data: dict, versions: Optional[List[int]] = None
+    ) -> Optional[Model]:
+        """Update the item ``id`` with a single ``UPDATE ... RETURNING``.
+
+        The returned row populates the item, nothing is loaded before the
+        write. With ``versions`` (of a versioned model) only an item at one of
+        these versions is updated, the condition replaces a row lock. Returns
+        None when there is no such item. Databases without RETURNING load the
+        item and update it, raising ``PreconditionFailedError`` when another
+        write changed its version in between.
+        """
+        if not isinstance(id, int):
+            raise TypeError
+        assert isinstance(data, dict)
+        assert self.model is not None
+        mapper = inspect(self.model)
+        assert len(mapper.primary_key) == 1
+        assert all(key in mapper.columns for key in data)
+        version = mapper.version_id_col
+        assert versions is None or version is not None
+        if versions is not None and not versions:
+            return None
+        if not data:
+            item = self.get_by_id(id)
+            return item if self._has_version(item, versions) else None
+        use_primary()
+        table = self.model.__table__
+        values = {mapper.columns[key]: value for key, value in data.items()}
+        criteria = [mapper.primary_key[0] == id]
+        if version is not None:
+            # Statements bypass the version counter of the ORM
+            values[version] = version + 1
+            if versions is not None:
+                criteria.append(version.in_(versions))
+        statement = (
+            table.update()
+            .where(and_(*criteria))
+            .values(values)
+            .returning(*table.columns)
+        )
+        with precondition_on_stale_data(), unit_of_work() as work:
+            bind = work.session.get_bind(mapper, clause=statement)
+            if not bind.dialect.implicit_returning:
+                item = self.get_by_id(id)
+                if not self._has_version(item, versions):
+                    return None
+                item = self.update(item, data)
+                # The version check of the ORM runs with the flush
+                work.flush()
+                return item
+            result = work.session.execute(statement, mapper=mapper)
+            items = load_returned(work.session, self.model, result)
+            item = items[0] if items else None
+            if item is not None:
+                work.add(item)
+        return item
+
+    @staticmethod
+    def _has_version(item: Optional[Model], versions: Optional[List[int]]) -> bool:
+        if item is None:
+            return False
+        return versions is None or item.version in versions
+
+    def upsert(self, data: dict, index_elements=None, update: bool = True) -> Model:
+        assert isinstance(data, dict)
+        assert isinstance(update, bool)
+        assert self.model is not None
+        use_primary()
+        with unit_of_work() as work:
+            item = work.add(
+                self.model.upsert(data, index_elements, update, commit=False)
+            )
+        return item
+
+    def bulk_upsert(
+        self, rows: List[dict], index_elements=None, update: bool = True
+    ) -> int:
+        assert isinstance(rows, list)
+        assert isinstance(update, bool)
+        assert self.model is not None
+        use_primary()
+        with unit_of_work() as work:
+            count = self.model.bulk_upsert(rows, index_elements, update, commit=False)
+            work.mark_changed()
+        return count
+
+    def update_or_create(self, id: int, data: dict) -> Tuple[Model, bool]:
+        """Update the item ``id`` or create it with that id, idempotently.
+
+        Returns the item and whether it was created. A concurrent request
+        creating the same item turns the insert into an update. The id comes
+        from the client, on PostgreSQL the sequence of the primary key moves
+        past it so that later inserts do not take it.
+        """
+        # Local application imports
+        from app.bulk import reset_sequences
+
+        item = self.update_by_id(id, data)
+        if item is not None:
+            return item, False
+        assert self.model is not None
+        mapper = inspect(self.model)
+        primary_key = mapper.primary_key[0].key
+        use_primary()
+        with unit_of_work() as work:
+            item = work.add(
+                self.model.upsert(dict(data, **{primary_key: id}), commit=False)
+            )
+            connection = work.session.connection(mapper=mapper)
+            if connection.dialect.name == "postgresql":
+                reset_sequences(connection, self.model.__table__)
+        return item, True
+
+    def delete_by_id(self, id: int, versions: Optional[List[int]] = None) -> bool:
+        """Delete the item ``id`` with a single DELETE, only at one of
+        ``versions`` when given. Returns whether an item was deleted.
+        """
+        if not isinstance(id, int):
+            raise TypeError
+        assert self.model is not None
+        mapper = inspect(self.model)
+        assert len(mapper.primary_key) == 1
+        version = mapper.version_id_col
+        assert versions is None or version is not None
+        if versions is not None and not versions:
+            return False
+        criteria = [mapper.primary_key[0] == id]
+        if versions is not None:
+            criteria.append(version.in_(versions))
+        use_primary()
+        statement = self.model.__table__.delete().where(and_(*criteria))
+        with precondition_on_stale_data(), unit_of_work() as work:
+            deleted = work.session.execute(statement, mapper=mapper).rowcount > 0
+            if deleted:
+                work.mark_changed()
+        return deleted
 
     @staticmethod
-    def delete(item: Model, commit: bool = True):
+    def delete(item: Model):
         assert isinstance(item, Model)
-        assert isinstance(commit, bool)
-        item.delete(commit=commit)
+        use_primary()
+        with unit_of_work() as work:
+            work.delete(item)
         return
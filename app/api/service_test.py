@@ -2,6 +2,8 @@
 import pytest
 
 # Local application imports
+from app.api.book import Book
+from app.api.error import PreconditionFailedError
 from app.api.service import BaseService
 
 
@@ -37,31 +39,30 @@ def test_list(monkeypatch, db_session, dummy_crud_model):
         base_service.list("a")
 
 
-def test_create(monkeypatch, dummy_crud_model):
-    expected_output = None
+def test_create(db_session, count_commits, dummy_crud_model):
+    commits = count_commits(db_session)
     data = dict(txt="foo")
-    monkeypatch.setattr(
-        "app.api.model.CRUDModelMixin.create", lambda *x, **y: expected_output
-    )
     base_service = BaseService(dummy_crud_model)
-    assert base_service.create(data) == expected_output
+    item = base_service.create(data)
+    assert item.id is not None
+    assert item.txt == "foo"
+    assert len(commits) == 1
 
     with pytest.raises(AssertionError):
         base_service.create("a")
 
-    with pytest.raises(AssertionError):
-        base_service.create(data, "a")
-
 
-def test_update(monkeypatch, dummy_crud_model):
+def test_update(db_session, count_commits, dummy_crud_model):
     item = dummy_crud_model(txt="foo")
+    db_session.add(item)
+    db_session.commit()
+    commits = count_commits(db_session)
+
     data = dict(txt="bar")
-    expected_output = None
-    monkeypatch.setattr(
-        "app.api.model.CRUDModelMixin.update", lambda *x, **y: expected_output
-    )
     base_service = BaseService(dummy_crud_model)
-    assert base_service.update(item, data) == expected_output
+    assert base_service.update(item, data) == item
+    assert item.txt == "bar"
+    assert len(commits) == 1
 
     with pytest.raises(AssertionError):
         base_service.update("a", data)
@@ -69,21 +70,82 @@ def test_update(monkeypatch, dummy_crud_model):
     with pytest.raises(AssertionError):
         base_service.update(item, "a")
 
+
+def test_update_by_id(db_session, count_commits, dummy_crud_model):
+    item = dummy_crud_model(txt="foo")
+    db_session.add(item)
+    db_session.commit()
+    commits = count_commits(db_session)
+
+    base_service = BaseService(dummy_crud_model)
+    assert base_service.update_by_id(item.id, dict(txt="bar")) is item
+    assert item.txt == "bar"
+    assert len(commits) == 1
+    assert base_service.update_by_id(item.id, {}) is item
+    assert base_service.update_by_id(item.id + 1, dict(txt="bar")) is None
+
+    with pytest.raises(TypeError):
+        base_service.update_by_id("a", dict(txt="bar"))
+
     with pytest.raises(AssertionError):
-        base_service.update(item, data, "a")
+        base_service.update_by_id(item.id, dict(unknown="bar"))
 
 
-def test_delete(monkeypatch, dummy_crud_model):
-    item = dummy_crud_model(txt="foo")
-    expected_output = None
-    monkeypatch.setattr(
-        "app.api.model.CRUDModelMixin.delete", lambda *x, **y: expected_output
-    )
+def test_update_by_id_without_returning(monkeypatch, db_session):
+    book = Book(title="foo")
+    db_session.add(book)
+    db_session.commit()
+    # Databases without RETURNING (SQLite) load the item and flush the update
+    monkeypatch.setattr(db_session.get_bind().dialect, "implicit_returning", False)
+
+    base_service = BaseService(Book)
+    assert base_service.update_by_id(book.id, dict(title="bar"), [1]) is book
+    assert (book.title, book.version) == ("bar", 2)
+
+    # Another write bumps the version of the loaded item in between
+    db_session.execute(Book.__table__.update().values(version=Book.version + 1))
+    with pytest.raises(PreconditionFailedError):
+        base_service.update_by_id(book.id, dict(title="baz"), [2])
+
+
+def test_upsert(db_session, count_commits, dummy_crud_model):
+    commits = count_commits(db_session)
     base_service = BaseService(dummy_crud_model)
-    assert base_service.delete(item) == expected_output
+    item = base_service.upsert(dict(id=1, txt="foo"))
+    assert base_service.upsert(dict(id=1, txt="bar")) is item
+    assert item.txt == "bar"
+    rows = [dict(id=1, txt="baz"), dict(id=2, txt="qux")]
+    assert base_service.bulk_upsert(rows, update=False) == 1
+    assert item.txt == "bar"
+    assert len(commits) == 3
 
     with pytest.raises(AssertionError):
-        base_service.delete("a")
+        base_service.upsert("a")
+
+    with pytest.raises(AssertionError):
+        base_service.bulk_upsert("a")
+
+
+def test_update_or_create(db_session, dummy_crud_model):
+    base_service = BaseService(dummy_crud_model)
+    item, created = base_service.update_or_create(10, dict(txt="foo"))
+    assert created is True
+    assert (item.id, item.txt) == (10, "foo")
+
+    assert base_service.update_or_create(10, dict(txt="bar")) == (item, False)
+    assert item.txt == "bar"
+
+
+def test_delete(db_session, count_commits, dummy_crud_model):
+    item = dummy_crud_model(txt="foo")
+    db_session.add(item)
+    db_session.commit()
+    commits = count_commits(db_session)
+
+    base_service = BaseService(dummy_crud_model)
+    assert base_service.delete(item) is None
+    assert base_service.get_by_id(item.id) is None
+    assert len(commits) == 1
 
     with pytest.raises(AssertionError):
-        base_service.delete(item, "a")
+        base_service.delete("a")
@@ -0,0 +1,98 @@
+# Standard library imports
+from contextlib import contextmanager
+from typing import Optional
+
+# Third party imports
+from flask import g, has_request_context
+
+# Local application imports
+from app.extensions import db
+
+
+class UnitOfWork:
+    """Changes collected in a session and committed once.
+
+    Services add and delete through the unit of work instead of committing
+    themselves, the API commits the unit of work of a request when the
+    request ends, so an endpoint touching several rows is atomic and costs a
+    single commit.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+        self.changed = False
+
+    def add(self, item):
+        self.session.add(item)
+        self.changed = True
+        return item
+
+    def delete(self, item):
+        self.session.delete(item)
+        self.changed = True
+
+    def mark_changed(self):
+        """Changes written by statements executed in the session."""
+        self.changed = True
+
+    def flush(self):
+        """Send the pending changes, assigns the primary keys of new items."""
+        self.session.flush()
+
+    def commit(self):
+        if self.changed:
+            self.session.commit()
+            self.changed = False
+
+    def rollback(self):
+        self.session.rollback()
+        self.changed = False
+
+
+def get_unit_of_work() -> Optional[UnitOfWork]:
+    """The unit of work of the current request, if it started one."""
+    if not has_request_context():
+        return None
+    return getattr(g, "unit_of_work", None)
+
+
+@contextmanager
+def unit_of_work():
+    """The request's unit of work, or one committed at the end of the block."""
+    current = get_unit_of_work()
+    if current is not None:
+        yield current
+        return
+
+    work = UnitOfWork()
+    try:
+        yield work
+        work.commit()
+    except Exception:
+        work.rollback()
+        raise
+
+
+def start_request_unit_of_work():
+    g.unit_of_work = UnitOfWork()
+
+
+def finish_request_unit_of_work(response):
+    """Commit the changes of a successful request, roll back error responses.
+
+    Runs before the response is sent, a failing commit turns the response
+    into an error instead of acknowledging changes that were lost.
+    """
+    work = get_unit_of_work()
+    if work is None:
+        return response
+    g.unit_of_work = None
+    if response.status_code >= 400:
+        work.rollback()
+        return response
+    try:
+        work.commit()
+    except Exception:
+        work.rollback()
+        raise
+    return response
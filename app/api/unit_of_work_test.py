@@ -0,0 +1,59 @@
+# Third party imports
+import pytest
+from flask import Response, current_app
+
+# Local application imports
+from app.api.service import BaseService
+from app.api.unit_of_work import (
+    finish_request_unit_of_work,
+    get_unit_of_work,
+    start_request_unit_of_work,
+    unit_of_work,
+)
+
+
+def test_request_unit_of_work(db_session, count_commits, dummy_crud_model):
+    commits = count_commits(db_session)
+    base_service = BaseService(dummy_crud_model)
+    assert get_unit_of_work() is None
+
+    with current_app.test_request_context():
+        start_request_unit_of_work()
+        first = base_service.create(dict(txt="foo"))
+        second = base_service.create(dict(txt="bar"))
+        base_service.update(first, dict(txt="baz"))
+        base_service.delete(second)
+        assert commits == []
+
+        response = Response(status=200)
+        assert finish_request_unit_of_work(response) is response
+        assert len(commits) == 1
+        assert get_unit_of_work() is None
+
+    assert base_service.get_by_id(first.id).txt == "baz"
+    assert base_service.get_by_id(second.id) is None
+
+
+def test_request_unit_of_work_rollback(db_session, count_commits, dummy_crud_model):
+    commits = count_commits(db_session)
+    base_service = BaseService(dummy_crud_model)
+
+    with current_app.test_request_context():
+        start_request_unit_of_work()
+        item = base_service.create(dict(txt="foo"))
+        item_id = item.id
+        finish_request_unit_of_work(Response(status=400))
+
+    assert commits == []
+    assert base_service.get_by_id(item_id) is None
+
+
+def test_unit_of_work_rollback(db_session, dummy_crud_model):
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as work:
+            item = work.add(dummy_crud_model(txt="foo"))
+            work.flush()
+            item_id = item.id
+            raise RuntimeError()
+
+    assert BaseService(dummy_crud_model).get_by_id(item_id) is None
@@ -0,0 +1,80 @@
+"""``INSERT ... ON CONFLICT`` statements for PostgreSQL and SQLite.
+
+SQLAlchemy 1.3 only ships the PostgreSQL construct, SQLite (3.24+) gets the
+same clause appended by the compiler hook of :class:`SQLiteInsert`.
+"""
+# Standard library imports
+from typing import List, Optional, Sequence
+
+# Third party imports
+from sqlalchemy import Column, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.dml import Insert
+
+DIALECTS = ("postgresql", "sqlite")
+
+
+class SQLiteInsert(Insert):
+    """INSERT with an ``ON CONFLICT`` clause on SQLite."""
+
+    index_elements: List[str] = []
+    update_columns: List[str] = []
+    version_column: Optional[str] = None
+    where = None
+
+
+@compiles(SQLiteInsert, "sqlite")
+def _compile_sqlite_insert(insert, compiler, **kwargs):
+    statement = compiler.visit_insert(insert, **kwargs)
+    quote = compiler.preparer.quote
+    target = ", ".join(quote(column) for column in insert.index_elements)
+    if not insert.update_columns:
+        return f"{statement} ON CONFLICT ({target}) DO NOTHING"
+    assignments = [
+        f"{quote(column)} = excluded.{quote(column)}"
+        for column in insert.update_columns
+    ]
+    if insert.version_column is not None:
+        version = quote(insert.version_column)
+        assignments.append(f"{version} = {version} + 1")
+    assignments = ", ".join(assignments)
+    statement = f"{statement} ON CONFLICT ({target}) DO UPDATE SET {assignments}"
+    if insert.where is not None:
+        statement += f" WHERE {compiler.process(insert.where, **kwargs)}"
+    return statement
+
+
+def upsert_statement(
+    dialect_name: str,
+    table: Table,
+    rows: List[dict],
+    index_elements: Sequence[str],
+    update_columns: Optional[Sequence[str]] = None,
+    version_column: Optional[Column] = None,
+    where=None,
+):
+    """Insert ``rows``, update ``update_columns`` of the rows conflicting on
+    ``index_elements`` (skip them when there are no columns to update).
+    Updates increment the ``version_column`` of versioned rows and only apply
+    to the existing rows matching ``where``."""
+    assert dialect_name in DIALECTS, f"Upserts require one of {DIALECTS}"
+    assert rows and index_elements
+    update_columns = list(update_columns or [])
+    if dialect_name == "postgresql":
+        statement = postgresql.insert(table).values(rows)
+        if not update_columns:
+            return statement.on_conflict_do_nothing(index_elements=index_elements)
+        set_ = {column: statement.excluded[column] for column in update_columns}
+        if version_column is not None:
+            set_[version_column.key] = version_column + 1
+        return statement.on_conflict_do_update(
+            index_elements=index_elements, set_=set_, where=where
+        )
+    statement = SQLiteInsert(table).values(rows)
+    statement.index_elements = list(index_elements)
+    statement.update_columns = update_columns
+    if version_column is not None and update_columns:
+        statement.version_column = version_column.name
+    statement.where = where
+    return statement
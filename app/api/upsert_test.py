@@ -0,0 +1,53 @@
+# Third party imports
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Local application imports
+from app.api.upsert import upsert_statement
+
+metadata = MetaData()
+table = Table(
+    "upsert_item",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+)
+
+
+def test_upsert_statement():
+    rows = [dict(id=1, name="foo")]
+    statement = upsert_statement("postgresql", table, rows, ["id"], ["name"])
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (id) DO UPDATE SET name = excluded.name" in sql
+
+    statement = upsert_statement("sqlite", table, rows, ["id"])
+    sql = str(statement.compile(dialect=sqlite.dialect()))
+    assert sql.endswith("ON CONFLICT (id) DO NOTHING")
+
+    where = table.c.name.is_(None)
+    statement = upsert_statement("sqlite", table, rows, ["id"], ["name"], where=where)
+    sql = str(statement.compile(dialect=sqlite.dialect()))
+    assert sql.endswith(
+        "DO UPDATE SET name = excluded.name WHERE upsert_item.name IS NULL"
+    )
+
+
+def test_sqlite_upsert():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    rows = [dict(id=1, name="foo"), dict(id=2, name="bar")]
+    with engine.begin() as connection:
+        connection.execute(upsert_statement("sqlite", table, rows, ["id"], ["name"]))
+        rows = [dict(id=2, name="baz"), dict(id=3, name="qux")]
+        connection.execute(upsert_statement("sqlite", table, rows, ["id"]))
+        assert connection.execute(table.select()).fetchall() == [
+            (1, "foo"),
+            (2, "bar"),
+            (3, "qux"),
+        ]
+        connection.execute(upsert_statement("sqlite", table, rows, ["id"], ["name"]))
+        assert connection.execute(table.select()).fetchall() == [
+            (1, "foo"),
+            (2, "baz"),
+            (3, "qux"),
+        ]
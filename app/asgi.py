@@ -0,0 +1,129 @@
+# Standard library imports
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Optional, Tuple
+
+# Third party imports
+from flask import Flask
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """Translate an ASGI HTTP scope into a WSGI environ."""
+    assert scope["type"] == "http"
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        if key in environ:
+            value = f"{environ[key]},{value}"
+        environ[key] = value
+    # Chunked request bodies have been read completely
+    environ.setdefault("CONTENT_LENGTH", str(len(body)))
+    return environ
+
+
+class ASGIAdapter:
+    """Serves the Flask application (and so every ``BaseAPI`` view) over ASGI.
+
+    SQLAlchemy 1.3 has no asyncio support, so this is the thread-offloaded
+    path: the event loop owns the connections and request bodies, and each
+    request runs the unchanged WSGI stack in a pool of ``ASGI_THREADS``
+    threads. Responses are byte-for-byte those of the WSGI path.
+    """
+
+    def __init__(self, app: Flask, max_workers: Optional[int] = None):
+        assert isinstance(app, Flask)
+        self.app = app
+        max_workers = max_workers or app.config.get("ASGI_THREADS")
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="asgi"
+        )
+
+    def _call_wsgi(self, environ: dict) -> Tuple[int, List[tuple], bytes]:
+        response: dict = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = headers
+
+        result = self.app.wsgi_app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], body
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        return body
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                health = self.app.extensions.get("health")
+                if health is not None:
+                    # Fill the connection pools before accepting requests
+                    loop = asyncio.get_event_loop()
+                    await loop.run_in_executor(self.executor, health.warm_up, self.app)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        assert scope["type"] == "http"
+
+        body = await self._read_body(receive)
+        environ = build_environ(scope, body)
+        loop = asyncio.get_event_loop()
+        status, headers, response_body = await loop.run_in_executor(
+            self.executor, self._call_wsgi, environ
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in headers
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response_body})
@@ -0,0 +1,127 @@
+# Standard library imports
+import asyncio
+import json
+
+# Third party imports
+import pytest
+from flask import Flask, request
+
+# Local application imports
+from app.asgi import ASGIAdapter, build_environ
+
+
+def call(adapter, scope, body=b""):
+    messages = []
+    chunks = [body[:2], body[2:]]
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return dict(type="http.request", body=chunk, more_body=bool(chunks))
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.get_event_loop().run_until_complete(adapter(scope, receive, send))
+    return messages
+
+
+def http_scope(method="GET", path="/", query_string=b"", headers=None):
+    return dict(
+        type="http",
+        method=method,
+        path=path,
+        query_string=query_string,
+        headers=headers or [],
+        server=("testserver", 80),
+        client=("127.0.0.1", 1234),
+    )
+
+
+def test_build_environ():
+    scope = http_scope(
+        method="POST",
+        path="/api/bøøk",
+        query_string=b"a=1",
+        headers=[
+            (b"content-type", b"application/json"),
+            (b"content-length", b"2"),
+            (b"x-foo", b"1"),
+            (b"x-foo", b"2"),
+        ],
+    )
+    environ = build_environ(scope, b"{}")
+    assert environ["REQUEST_METHOD"] == "POST"
+    assert environ["PATH_INFO"] == "/api/bøøk".encode("utf8").decode("latin1")
+    assert environ["QUERY_STRING"] == "a=1"
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["CONTENT_LENGTH"] == "2"
+    assert environ["HTTP_X_FOO"] == "1,2"
+    assert environ["SERVER_NAME"] == "testserver"
+    assert environ["REMOTE_ADDR"] == "127.0.0.1"
+    assert environ["wsgi.input"].read() == b"{}"
+
+    with pytest.raises(AssertionError):
+        build_environ(dict(type="websocket"), b"")
+
+
+def test_asgi_adapter():
+    app = Flask(__name__)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return dict(args=request.args, json=request.get_json()), 201
+
+    adapter = ASGIAdapter(app, max_workers=2)
+    scope = http_scope(
+        method="POST",
+        path="/echo",
+        query_string=b"a=1",
+        headers=[(b"content-type", b"application/json")],
+    )
+    start, body = call(adapter, scope, b'{"b": 2}')
+
+    assert start["type"] == "http.response.start"
+    assert start["status"] == 201
+    assert (b"content-type", b"application/json") in start["headers"]
+    assert json.loads(body["body"]) == dict(args=dict(a="1"), json=dict(b=2))
+
+    with pytest.raises(AssertionError):
+        ASGIAdapter(None)
+
+
+def test_asgi_adapter_lifespan():
+    adapter = ASGIAdapter(Flask(__name__), max_workers=1)
+    messages = []
+    events = [dict(type="lifespan.startup"), dict(type="lifespan.shutdown")]
+
+    async def receive():
+        return events.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(adapter(dict(type="lifespan"), receive, send))
+    assert [m["type"] for m in messages] == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+
+
+def test_asgi_response_shape(app, db):
+    # Local application imports
+    from app.api.book import Book
+
+    with app.app_context():
+        book = Book.create(title="foo")
+        path = f"/api/book/{book.id}"
+
+    wsgi_response = app.test_client().get(path).json
+    start, body = call(ASGIAdapter(app), http_scope(path=path))
+    asgi_response = json.loads(body["body"])
+    # The request shared the app context (and session) of the db fixture
+    db.session.remove()
+
+    assert start["status"] == 200
+    assert asgi_response.keys() == wsgi_response.keys()
+    assert asgi_response["data"] == wsgi_response["data"]
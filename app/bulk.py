@@ -0,0 +1,270 @@
+"""Streaming import and export of the models of the registered APIs.
+
+Rows move in batches of ``batch_size`` so memory stays constant whatever the
+size of the file. PostgreSQL streams through ``COPY``, other databases use a
+streaming SELECT for exports and batched executemany INSERTs for imports.
+"""
+# Standard library imports
+import csv
+import io
+import json
+from itertools import islice
+from typing import IO, Callable, Iterable, Iterator, List, Optional
+
+# Third party imports
+from sqlalchemy import func, select
+
+# Local application imports
+from app.api import APIS, load_api
+
+FORMATS = ("csv", "ndjson")
+BATCH_SIZE = 10000
+# Written for None by copy_rows, so empty strings stay empty strings
+COPY_NULL = "\\N"
+
+
+def get_api(name: str):
+    """The registered API of the model named ``name`` (case insensitive)."""
+    for path in APIS:
+        api = load_api(path)
+        model = getattr(api, "model", None)
+        if model is not None and model.__name__.lower() == name.lower():
+            return api
+    names = [load_api(path).model.__name__ for path in APIS]
+    raise ValueError(f"No registered model named {name}, use one of {names}")
+
+
+def get_format(path: str, file_format: Optional[str] = None) -> str:
+    """The explicit ``file_format`` or the one of the file extension."""
+    if file_format is None:
+        extension = path.rsplit(".", 1)[-1].lower()
+        file_format = "ndjson" if extension in ("ndjson", "jsonl") else extension
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format {file_format}, use one of {FORMATS}")
+    return file_format
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def copy_rows(connection, table, rows: List[dict]):
+    """Load rows with PostgreSQL ``COPY FROM STDIN`` in the CSV format."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [COPY_NULL if row[column] is None else row[column] for column in columns]
+        for row in rows
+    )
+    buffer.seek(0)
+
+    preparer = connection.dialect.identifier_preparer
+    column_names = ", ".join(preparer.quote(column) for column in columns)
+    statement = (
+        f"COPY {preparer.format_table(table)} ({column_names}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
+
+
+def insert_rows(connection, table, rows: List[dict], batch_size: int = 1000):
+    for start in range(0, len(rows), batch_size):
+        end = start + batch_size
+        connection.execute(table.insert(), rows[start:end])
+
+
+def get_load_method(engine, method: str = "auto") -> Callable:
+    """``copy_rows`` on PostgreSQL (unless ``method`` is insert)."""
+    assert method in ("auto", "copy", "insert")
+    if method == "auto":
+        method = "copy" if engine.dialect.name == "postgresql" else "insert"
+    assert (
+        method == "insert" or engine.dialect.name == "postgresql"
+    ), "COPY requires PostgreSQL"
+    if method == "copy":
+        return copy_rows
+    return insert_rows
+
+
+def _copy_to(connection, table, columns: List[str], output: IO):
+    preparer = connection.dialect.identifier_preparer
+    column_names = ", ".join(preparer.quote(column) for column in columns)
+    order_by = ", ".join(preparer.quote(column.name) for column in table.primary_key)
+    query = f"SELECT {column_names} FROM {preparer.format_table(table)}"
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", output
+        )
+    finally:
+        cursor.close()
+
+
+def export_model(
+    engine,
+    model,
+    output: IO,
+    file_format: str,
+    batch_size: int = BATCH_SIZE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Write every row of ``model`` to ``output``, returns the number of rows."""
+    table = model.__table__
+    columns = [column.name for column in table.columns]
+    with engine.connect() as connection:
+        count = connection.execute(select([func.count()]).select_from(table)).scalar()
+        if engine.dialect.name == "postgresql" and file_format == "csv":
+            _copy_to(connection, table, columns, output)
+            if progress is not None:
+                progress(count)
+            return count
+
+        query = select([table]).order_by(*table.primary_key.columns)
+        result = connection.execution_options(stream_results=True).execute(query)
+        writer = csv.writer(output) if file_format == "csv" else None
+        if writer is not None:
+            writer.writerow(columns)
+        exported = 0
+        for rows in iter(lambda: result.fetchmany(batch_size), []):
+            if writer is not None:
+                writer.writerows(rows)
+            else:
+                output.writelines(
+                    json.dumps(dict(row), default=str) + "\n" for row in rows
+                )
+            exported += len(rows)
+            if progress is not None:
+                progress(exported)
+    return exported
+
+
+def read_rows(source: IO, file_format: str) -> Iterator[dict]:
+    """Rows of a CSV (with a header) or NDJSON file.
+
+    CSV cannot tell NULL from an empty string, empty values are read as NULL.
+    """
+    if file_format == "csv":
+        for row in csv.DictReader(source):
+            yield {key: value if value != "" else None for key, value in row.items()}
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def get_field_keys(schema) -> dict:
+    """Column name to schema data key of the loadable fields of ``schema``."""
+    return {
+        field.attribute or name: field.data_key or name
+        for name, field in schema.fields.items()
+        if not field.dump_only
+    }
+
+
+def validate_rows(schema, rows: List[dict], first_line: int):
+    """Validate rows against ``schema``, only the columns it loads."""
+    field_keys = get_field_keys(schema)
+    data = [
+        {field_keys[key]: value for key, value in row.items() if key in field_keys}
+        for row in rows
+    ]
+    errors = schema.validate(data, many=True)
+    if errors:
+        messages = "; ".join(
+            f"row {first_line + index}: {error}"
+            for index, error in sorted(errors.items())[:10]
+        )
+        raise ValueError(f"{len(errors)} invalid row(s), {messages}")
+
+
+def _check_columns(table, columns: Iterable[str]):
+    unknown = set(columns) - set(table.columns.keys())
+    if unknown:
+        raise ValueError(f"Unknown columns for {table.name}: {sorted(unknown)}")
+
+
+def reset_sequences(connection, table):
+    """Move the primary key sequences past the ids inserted without them
+    (PostgreSQL). Sequences only move forward, past the values handed out to
+    transactions that did not commit yet as well.
+    """
+    preparer = connection.dialect.identifier_preparer
+    table_name = preparer.format_table(table)
+    for column in table.primary_key.columns:
+        if column.autoincrement is False:
+            continue
+        maximum = f"SELECT MAX({preparer.quote(column.name)}) FROM {table_name}"
+        connection.execute(
+            f"SELECT setval(sequence, GREATEST(COALESCE(({maximum}), 0), "
+            "COALESCE(pg_sequence_last_value(sequence), 0)) + 1, false) "
+            "FROM CAST(pg_get_serial_sequence(%s, %s) AS regclass) AS sequence",
+            (table_name, column.name),
+        )
+
+
+def import_model(
+    engine,
+    model,
+    source: IO,
+    file_format: str,
+    schema=None,
+    batch_size: int = BATCH_SIZE,
+    method: str = "auto",
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Insert the rows of ``source`` in a single transaction.
+
+    Without a ``schema`` a CSV file is streamed as is into ``COPY`` on
+    PostgreSQL. Otherwise rows are read, validated against ``schema`` and
+    loaded ``batch_size`` at a time.
+    """
+    table = model.__table__
+    load = get_load_method(engine, method)
+    imported = 0
+    with engine.begin() as connection:
+        if load is copy_rows and file_format == "csv" and schema is None:
+            header: List[str] = next(csv.reader([source.readline()]), [])
+            _check_columns(table, header)
+            preparer = connection.dialect.identifier_preparer
+            column_names = ", ".join(preparer.quote(column) for column in header)
+            cursor = connection.connection.cursor()
+            try:
+                cursor.copy_expert(
+                    f"COPY {preparer.format_table(table)} ({column_names}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    source,
+                )
+                imported = cursor.rowcount
+            finally:
+                cursor.close()
+            if progress is not None:
+                progress(imported)
+        else:
+            for rows in batched(read_rows(source, file_format), batch_size):
+                # Columns missing from some rows are NULL
+                columns = list(dict.fromkeys(key for row in rows for key in row))
+                _check_columns(table, columns)
+                rows = [{column: row.get(column) for column in columns} for row in rows]
+                if schema is not None:
+                    # Line numbers of the file, after the CSV header
+                    validate_rows(
+                        schema, rows, imported + (2 if file_format == "csv" else 1)
+                    )
+                load(connection, table, rows)
+                imported += len(rows)
+                if progress is not None:
+                    progress(imported)
+        if engine.dialect.name == "postgresql" and imported:
+            reset_sequences(connection, table)
+    return imported
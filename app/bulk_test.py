@@ -0,0 +1,129 @@
+# Standard library imports
+import io
+import json
+
+# Third party imports
+import pytest
+from sqlalchemy import create_engine
+
+# Local application imports
+from app.api.book import Book, BookAPI, BookSchema
+from app.bulk import batched, export_model, get_api, get_format, import_model
+
+
+def test_get_api():
+    assert get_api("book") is BookAPI
+    with pytest.raises(ValueError):
+        get_api("recipe")
+
+
+def test_get_format():
+    assert get_format("books.csv") == "csv"
+    assert get_format("books.jsonl") == "ndjson"
+    assert get_format("-", "ndjson") == "ndjson"
+    with pytest.raises(ValueError):
+        get_format("books.xml")
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+@pytest.fixture
+def sqlite_engine(tmpdir):
+    engine = create_engine(f"sqlite:///{tmpdir.join('bulk.db')}")
+    Book.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_import_export_sqlite(sqlite_engine):
+    source = io.StringIO(
+        '{"title": "a"}\n\n{"title": ""}\n{"id": 10, "title": "c, \\"d\\""}\n'
+    )
+    progress = []
+    count = import_model(
+        sqlite_engine,
+        Book,
+        source,
+        "ndjson",
+        schema=BookSchema(),
+        batch_size=2,
+        progress=progress.append,
+    )
+    assert count == 3 and progress == [2, 3]
+
+    output = io.StringIO()
+    assert export_model(sqlite_engine, Book, output, "ndjson", batch_size=2) == 3
+    rows = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert rows == [
+        dict(id=1, title="a", version=1),
+        dict(id=2, title="", version=1),
+        dict(id=10, title='c, "d"', version=1),
+    ]
+
+    output = io.StringIO()
+    export_model(sqlite_engine, Book, output, "csv")
+    assert output.getvalue().splitlines() == [
+        "id,title,version",
+        "1,a,1",
+        "2,,1",
+        '10,"c, ""d""",1',
+    ]
+
+
+def test_import_validation(sqlite_engine):
+    with pytest.raises(ValueError, match="row 3:.*title"):
+        source = io.StringIO('{"title": "a"}\n{"title": "b"}\n{"title": 5}\n')
+        import_model(sqlite_engine, Book, source, "ndjson", schema=BookSchema())
+    with pytest.raises(ValueError, match="row 2:.*null"):
+        source = io.StringIO('title\n""\n')
+        import_model(sqlite_engine, Book, source, "csv", schema=BookSchema())
+    with pytest.raises(ValueError, match="Unknown columns.*titel"):
+        source = io.StringIO('{"title": "a"}\n{"titel": "b"}\n')
+        import_model(sqlite_engine, Book, source, "ndjson")
+    # A single transaction, nothing was imported
+    assert sqlite_engine.execute("SELECT count(*) FROM book").scalar() == 0
+
+
+def test_import_export_postgresql(db):
+    engine = db.engine
+    books = [Book(title=title) for title in ("a", "", 'b, "c"')]
+    db.session.add_all(books)
+    db.session.commit()
+    db.session.remove()
+
+    csv_output = io.StringIO()
+    assert export_model(engine, Book, csv_output, "csv") == 3
+    assert csv_output.getvalue().splitlines() == [
+        "id,title,version",
+        "1,a,1",
+        '2,"",1',
+        '3,"b, ""c""",1',
+    ]
+    ndjson_output = io.StringIO()
+    export_model(engine, Book, ndjson_output, "ndjson")
+
+    # Streamed into COPY as is
+    engine.execute("TRUNCATE book")
+    csv_output.seek(0)
+    assert import_model(engine, Book, csv_output, "csv") == 3
+    output = io.StringIO()
+    export_model(engine, Book, output, "ndjson")
+    assert output.getvalue() == ndjson_output.getvalue()
+
+    # Validated and copied in batches
+    engine.execute("TRUNCATE book")
+    ndjson_output.seek(0)
+    count = import_model(
+        engine, Book, ndjson_output, "ndjson", schema=BookSchema(), batch_size=2
+    )
+    assert count == 3
+    output = io.StringIO()
+    export_model(engine, Book, output, "ndjson")
+    assert output.getvalue() == ndjson_output.getvalue()
+
+    # The id sequence continues after the imported ids
+    assert Book.create(title="d").id == 4
+    db.session.remove()
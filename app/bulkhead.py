@@ -0,0 +1,113 @@
+# Standard library imports
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+# Third party imports
+from flask import Flask, current_app, g
+
+CHEAP = "cheap"
+EXPENSIVE = "expensive"
+
+
+class Bulkheads:
+    """Separate concurrency limits for the cost classes of the API routes.
+
+    Every cost class gets ``BULKHEAD_LIMITS[cost_class]`` slots per process,
+    a request waits up to ``BULKHEAD_TIMEOUT_MS`` for a slot of its class and
+    is rejected with a 503 after that. Slow list and export requests then
+    queue among themselves and cannot take the workers of the point lookups.
+    Classes without a limit are not limited.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self.inflight: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self._lock = threading.Lock()
+        self._metrics = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("BULKHEAD_ENABLED", True)
+        app.config.setdefault("BULKHEAD_LIMITS", {CHEAP: 50, EXPENSIVE: 4})
+        app.config.setdefault("BULKHEAD_TIMEOUT_MS", 100)
+        app.config.setdefault("BULKHEAD_DB_POOLS", {})
+        if not app.config["BULKHEAD_ENABLED"] or "bulkheads" in app.extensions:
+            return
+
+        for cost_class, limit in app.config["BULKHEAD_LIMITS"].items():
+            assert isinstance(limit, int) and limit > 0
+            self.semaphores[cost_class] = threading.BoundedSemaphore(limit)
+        if "metrics" in app.extensions:
+            self._create_metrics()
+        app.teardown_request(self._release)
+        app.extensions["bulkheads"] = self
+
+    def _create_metrics(self):
+        # Third party imports
+        from prometheus_client import Counter as PrometheusCounter
+        from prometheus_client import Gauge
+
+        if self._metrics is not None:
+            return
+        self._metrics = dict(
+            inflight=Gauge(
+                "bulkhead_inflight_requests",
+                "Requests in flight per cost class.",
+                ["cost_class"],
+                multiprocess_mode="livesum",
+            ),
+            rejected=PrometheusCounter(
+                "bulkhead_rejected_requests_total",
+                "Requests rejected over the limit of their cost class.",
+                ["cost_class"],
+            ),
+        )
+
+    def snapshot(self) -> dict:
+        return dict(inflight=dict(self.inflight), rejected=dict(self.rejected))
+
+    def _update_inflight(self, cost_class: str, change: int):
+        with self._lock:
+            self.inflight[cost_class] += change
+        if self._metrics is not None:
+            self._metrics["inflight"].labels(cost_class).inc(change)
+
+    def acquire(self, cost_class: str):
+        """Enter the bulkhead of ``cost_class`` for the current request.
+
+        Raises ``ServiceUnavailableError`` when no slot frees up in time.
+        """
+        g.cost_class = cost_class
+        semaphore = self.semaphores.get(cost_class)
+        if semaphore is not None:
+            config = current_app.config
+            if not semaphore.acquire(timeout=config["BULKHEAD_TIMEOUT_MS"] / 1000):
+                # Local application imports
+                from app.api.error import ServiceUnavailableError
+
+                self.rejected[cost_class] += 1
+                if self._metrics is not None:
+                    self._metrics["rejected"].labels(cost_class).inc()
+                raise ServiceUnavailableError(
+                    retry_after=config.get("ADMISSION_RETRY_AFTER", 1)
+                )
+        g.bulkhead = cost_class
+        self._update_inflight(cost_class, 1)
+
+    def _release(self, exception=None):
+        cost_class = getattr(g, "bulkhead", None)
+        if cost_class is None:
+            return
+        g.bulkhead = None
+        semaphore = self.semaphores.get(cost_class)
+        if semaphore is not None:
+            semaphore.release()
+        self._update_inflight(cost_class, -1)
+
+
+def get_cost_class() -> Optional[str]:
+    """Cost class of the current request, None outside of the API views."""
+    return getattr(g, "cost_class", None)
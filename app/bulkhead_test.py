@@ -0,0 +1,68 @@
+# Third party imports
+import pytest
+from flask import g
+from flask_sqlalchemy import get_state
+
+# Local application imports
+from app.bulkhead import CHEAP, EXPENSIVE
+
+
+def test_bulkheads(app, db, client):
+    app.config["BULKHEAD_TIMEOUT_MS"] = 0
+    bulkheads = app.extensions["bulkheads"]
+    # The list requests fill their bulkhead
+    semaphore = bulkheads.semaphores[EXPENSIVE]
+    for _ in range(app.config["BULKHEAD_LIMITS"][EXPENSIVE]):
+        semaphore.acquire()
+
+    response = client.get("/api/book?pageIndex=1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    # The point lookups are still served
+    response = client.get("/api/book/1")
+    assert response.status_code == 404
+
+    for _ in range(app.config["BULKHEAD_LIMITS"][EXPENSIVE]):
+        semaphore.release()
+    response = client.get("/api/book?pageIndex=1")
+    assert response.status_code == 200
+
+    # The context of the last request is kept open by the client
+    assert bulkheads.snapshot() == dict(
+        inflight={CHEAP: 0, EXPENSIVE: 1}, rejected={EXPENSIVE: 1}
+    )
+    db.session.remove()
+
+
+@pytest.fixture
+def pool_app():
+    # Local application imports
+    from app import create_app
+    from app.config import TestConfig
+
+    class PoolConfig(TestConfig):
+        BULKHEAD_DB_POOLS = {EXPENSIVE: {"pool_size": 2, "max_overflow": 0}}
+
+    return create_app(config=PoolConfig)
+
+
+def test_db_pools(pool_app):
+    # Local application imports
+    from app.extensions import db
+
+    with pool_app.test_request_context():
+        engine = db.session.get_bind()
+        assert engine is db.engine
+
+        g.cost_class = EXPENSIVE
+        pool_engine = db.session.get_bind()
+        assert pool_engine is not engine
+        assert pool_engine.url == engine.url
+        assert pool_engine.pool.size() == 2
+        assert get_state(pool_app).connectors[(None, EXPENSIVE)]
+
+        # Classes without a pool of their own use the default one
+        g.cost_class = CHEAP
+        assert db.session.get_bind() is engine
+        db.session.remove()
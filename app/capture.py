@@ -0,0 +1,173 @@
+# Standard library imports
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import List, Optional
+
+# Third party imports
+from flask import current_app, g, request
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "[redacted]"
+
+
+def redact(value, fields: tuple):
+    """Replace the values of keys containing one of ``fields`` (case insensitive)."""
+    if isinstance(value, dict):
+        return {
+            key: REDACTED
+            if any(field in key.lower() for field in fields)
+            else redact(item, fields)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+def body_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class TrafficRecorder:
+    """Appends captured requests to a JSON lines file from a background thread.
+
+    Requests only put a dict on a queue, the writer thread serializes them and
+    appends them in batches with a single ``os.write`` to a file opened with
+    ``O_APPEND``, so the pre-forked workers can share the file.
+    """
+
+    batch_size = 200
+    flush_interval = 1.0
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread_pid: Optional[int] = None
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork, start one per worker process
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._queue = queue.Queue()
+                thread = threading.Thread(
+                    target=self._run, name="traffic-recorder", daemon=True
+                )
+                self._thread_pid = os.getpid()
+                thread.start()
+                atexit.register(self.flush)
+
+    def record(self, path: str, entry: dict):
+        self._ensure_thread()
+        self._queue.put((path, entry))
+
+    def flush(self):
+        """Block until the recorded entries are written."""
+        if self._thread_pid == os.getpid():
+            self._queue.join()
+
+    def _write(self, batch: List[tuple]):
+        lines: dict = {}
+        for path, entry in batch:
+            line = json.dumps(entry, separators=(",", ":"), default=str)
+            lines.setdefault(path, []).append(line + "\n")
+        for path, path_lines in lines.items():
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, "".join(path_lines).encode())
+            finally:
+                os.close(fd)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except OSError as error:
+                logger.error(f"Writing captured traffic failed: {error}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+recorder = TrafficRecorder()
+
+
+def start_request_capture() -> bool:
+    """Capture the current request when capture is enabled and it is sampled."""
+    config = current_app.config
+    if not config["CAPTURE_ENABLED"]:
+        return False
+    if random.random() >= config["CAPTURE_SAMPLE_RATE"]:
+        return False
+    g.capture_start = (time.time(), time.perf_counter())
+    return True
+
+
+def _capture_body(config) -> Optional[dict]:
+    data = request.get_data(cache=True)
+    if not data:
+        return None
+    fields = tuple(config["CAPTURE_REDACT_FIELDS"])
+    if config["CAPTURE_BODIES"] and len(data) <= config["CAPTURE_MAX_BODY_BYTES"]:
+        try:
+            return dict(json=redact(json.loads(data), fields))
+        except ValueError:
+            pass
+    # Not replayable, kept to tell the requests apart
+    return dict(hash=body_hash(data), size=len(data))
+
+
+def finish_request_capture(response):
+    capture_start = getattr(g, "capture_start", None)
+    if capture_start is None:
+        return response
+    g.capture_start = None
+    started_at, start_time = capture_start
+    config = current_app.config
+    url_rule = request.url_rule
+    entry = dict(
+        t=round(started_at, 6),
+        m=request.method,
+        p=request.path,
+        r=url_rule.rule if url_rule is not None else None,
+        s=response.status_code,
+        d=round((time.perf_counter() - start_time) * 1000, 3),
+    )
+    if request.args:
+        fields = tuple(config["CAPTURE_REDACT_FIELDS"])
+        entry["a"] = redact(request.args.to_dict(flat=False), fields)
+    body = _capture_body(config)
+    if body is not None:
+        entry["b"] = body
+    recorder.record(config["CAPTURE_FILE"], entry)
+    return response
+
+
+def read_capture(path: str) -> List[dict]:
+    """The captured entries of ``path`` in the order of their start time."""
+    with open(path) as capture_file:
+        entries = [json.loads(line) for line in capture_file if line.strip()]
+    # Batches of the workers are interleaved
+    return sorted(entries, key=lambda entry: entry["t"])
@@ -14,6 +14,114 @@ class Config(metaclass=MetaFlaskEnv):
     PORT = "5050"
     GLOBAL_URL_PREFIX = "api"
 
+    # Production server (manage.py serve)
+    SERVER_WORKERS = 4
+    # sync, gevent or eventlet
+    SERVER_WORKER_CLASS = "sync"
+    # Concurrent requests per gevent / eventlet worker
+    SERVER_WORKER_CONNECTIONS = 1000
+    # Recycle a worker after this many requests (0 disables), plus a random
+    # jitter so that the workers do not all restart at once
+    SERVER_MAX_REQUESTS = 10000
+    SERVER_MAX_REQUESTS_JITTER = 1000
+    # Recycle a worker once its resident memory exceeds this size (0 disables)
+    SERVER_MAX_MEMORY_MB = 0
+    SERVER_GRACEFUL_TIMEOUT = 30
+    SERVER_BACKLOG = 2048
+
+    # ASGI (asgi.py), requests run in this many threads, keep it within the
+    # SQLAlchemy pool size plus overflow
+    ASGI_THREADS = 15
+
+    # Prometheus metrics
+    METRICS_ENABLED = True
+    METRICS_PATH = "/metrics"
+    # Directory shared by the pre-forked workers so /metrics reports the totals
+    # of all of them, required with more than one worker
+    METRICS_MULTIPROCESS_DIR: Optional[str] = None
+
+    # Per-request query budgets, requests exceeding them are logged
+    QUERY_BUDGET_COUNT = 20
+    QUERY_BUDGET_MS = 500
+    # The same statement repeated more often than this hints at an N+1
+    QUERY_BUDGET_DUPLICATES = 5
+    # X-DB-Query-Count, X-DB-Query-Time-Ms and X-DB-Duplicate-Queries headers
+    QUERY_DEBUG_HEADERS = False
+    # In debug mode, ?_explain=analyze adds the plans of the request's SELECT
+    # statements to the response. With EXPLAIN_LOG_SEQ_SCANS every debug
+    # request is explained and sequential scans of large tables are logged
+    EXPLAIN_LOG_SEQ_SCANS = False
+    EXPLAIN_SEQ_SCAN_MIN_ROWS = 10000
+
+    # Sampling profiler, requests carrying a signed PROFILE_HEADER (manage.py
+    # profile_token) or slower than PROFILE_THRESHOLD_MS (0 disables) are
+    # sampled and written to PROFILE_DIR as collapsed stacks
+    PROFILE_HEADER = "X-Profile"
+    PROFILE_THRESHOLD_MS = 0
+    PROFILE_INTERVAL_MS = 5
+    PROFILE_DIR = os.path.abspath("profiles")
+    # Seconds a profile token stays valid
+    PROFILE_TOKEN_MAX_AGE = 3600
+
+    # Traffic capture for manage.py replay, a CAPTURE_SAMPLE_RATE share of the
+    # API requests is appended to CAPTURE_FILE. JSON bodies up to
+    # CAPTURE_MAX_BODY_BYTES are kept (other bodies only as a hash) with the
+    # values of keys containing one of CAPTURE_REDACT_FIELDS redacted
+    CAPTURE_ENABLED = False
+    CAPTURE_FILE = os.path.abspath("captures/traffic.jsonl")
+    CAPTURE_SAMPLE_RATE = 1.0
+    CAPTURE_BODIES = True
+    CAPTURE_MAX_BODY_BYTES = 4096
+    CAPTURE_REDACT_FIELDS = ["password", "secret", "token", "authorization", "api_key"]
+
+    # The first response to a POST with an Idempotency-Key header is stored
+    # for IDEMPOTENCY_TTL_SECONDS and replayed to the retries with that key
+    IDEMPOTENCY_TTL_SECONDS = 86400
+    IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+    # Adaptive concurrency limit of every process, adjusted to the observed
+    # latency between ADMISSION_MIN_LIMIT and ADMISSION_MAX_LIMIT. Requests
+    # over the limit get a 503 with a Retry-After header. Reads leave
+    # ADMISSION_WRITE_RESERVE of the limit to the writes, metrics
+    # (ADMISSION_EXEMPT_PATHS) and the HEALTH_* probes are always admitted
+    ADMISSION_ENABLED = True
+    ADMISSION_INITIAL_LIMIT = 20
+    ADMISSION_MIN_LIMIT = 2
+    ADMISSION_MAX_LIMIT = 200
+    ADMISSION_WRITE_RESERVE = 0.2
+    ADMISSION_RETRY_AFTER = 1
+    ADMISSION_EXEMPT_PATHS = ["/metrics", "/healthz", "/readyz"]
+
+    # Bulkheads, the API views declare a cost class (BaseAPI.cost_classes) and
+    # every class has BULKHEAD_LIMITS concurrent requests per process. Requests
+    # wait BULKHEAD_TIMEOUT_MS for a slot of their class, then get a 503. The
+    # classes of BULKHEAD_DB_POOLS also get their own connection pools with
+    # these engine options, e.g. {"expensive": {"pool_size": 4, "max_overflow": 0}}
+    BULKHEAD_ENABLED = True
+    BULKHEAD_LIMITS = {"cheap": 50, "expensive": 4}
+    BULKHEAD_TIMEOUT_MS = 100
+    BULKHEAD_DB_POOLS: dict = {}
+
+    # Request deadlines, the requests of a cost class get REQUEST_TIMEOUTS_MS
+    # (the other ones REQUEST_TIMEOUT_MS, 0 disables) and clients may shorten
+    # it with a Request-Timeout header in seconds. The time left becomes the
+    # statement_timeout of their transactions, late requests get a 504
+    REQUEST_TIMEOUT_MS = 10000
+    REQUEST_TIMEOUTS_MS = {"cheap": 5000, "expensive": 30000}
+
+    # Cost guard of the list queries (PostgreSQL), queries whose planner
+    # estimate exceeds QUERY_COST_LIMIT are rejected with a 400 before they
+    # run (0 disables). Estimates are cached per query shape for
+    # QUERY_COST_CACHE_SECONDS (0 keeps them until evicted)
+    QUERY_COST_LIMIT = 0
+    QUERY_COST_CACHE_SECONDS = 300
+
+    # Probes, HEALTH_LIVENESS_PATH answers while the process serves requests,
+    # HEALTH_READINESS_PATH once the worker filled its connection pools with
+    # SQLALCHEMY_POOL_MIN_SIZE connections and warmed its caches
+    HEALTH_LIVENESS_PATH = "/healthz"
+    HEALTH_READINESS_PATH = "/readyz"
+
     # Flask
     SECRET_KEY = "MY_VERY_SECRET_KEY"
 
@@ -24,6 +132,19 @@ class Config(metaclass=MetaFlaskEnv):
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
     SQLALCHEMY_ECHO: bool = False
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
+    # Read replicas, a list or a comma separated string of database URIs
+    SQLALCHEMY_REPLICA_URIS: Optional[str] = None
+    # round_robin or least_latency
+    SQLALCHEMY_REPLICA_STRATEGY = "round_robin"
+    # Reads stick to the primary for this many seconds after a client's write
+    SQLALCHEMY_STICKY_PRIMARY_SECONDS = 5
+    SQLALCHEMY_STICKY_PRIMARY_COOKIE = "db_primary_until"
+    # Connection pool of a gevent / eventlet worker, every waiting greenlet
+    # holds a connection so size it for the expected concurrency per worker
+    SQLALCHEMY_GREEN_POOL_SIZE = 50
+    SQLALCHEMY_GREEN_MAX_OVERFLOW = 50
+    # Connections opened in every pool before a worker reports ready
+    SQLALCHEMY_POOL_MIN_SIZE = 5
 
     # flask-babel
     BABEL_DEFAULT_LOCALE = "en"
@@ -35,6 +156,9 @@ class Config(metaclass=MetaFlaskEnv):
 class DevConfig(Config):
     ENV = "dev"
 
+    QUERY_DEBUG_HEADERS = True
+    EXPLAIN_LOG_SEQ_SCANS = True
+
     # SQLAlchemy
     SQLALCHEMY_ECHO = True
     SQLALCHEMY_DATABASE_URI = (
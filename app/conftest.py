@@ -1,3 +1,6 @@
+# Standard library imports
+from contextlib import contextmanager
+
 # Third party imports
 import pytest
 
@@ -58,11 +61,48 @@ def db_session(db):
     transaction = connection.begin()
     options = dict(bind=connection, binds={})
     scoped_session = db.create_scoped_session(options=options)
+    session = db.session
     db.session = scoped_session
     yield scoped_session
     transaction.rollback()
     connection.close()
     scoped_session.remove()
+    db.session = session
+
+
+@pytest.fixture
+def assert_num_queries():
+    """Assert the number of statements executed within the block.
+
+    with assert_num_queries(1):
+        client.get(f"/api/book/{id}")
+    """
+    # Local application imports
+    from app.queries import count_queries
+
+    @contextmanager
+    def _assert_num_queries(expected: int):
+        with count_queries() as stats:
+            yield stats
+        statements = "\n".join(stats.statements.elements())
+        assert (
+            stats.count == expected
+        ), f"Expected {expected} queries, executed {stats.count}:\n{statements}"
+
+    return _assert_num_queries
+
+
+@pytest.fixture
+def count_commits(monkeypatch):
+    """The commits of ``session`` from now on, one item per commit."""
+
+    def _count_commits(session) -> list:
+        commits = []
+        commit = session.commit
+        monkeypatch.setattr(session, "commit", lambda: commits.append(commit()))
+        return commits
+
+    return _count_commits
 
 
 @pytest.fixture
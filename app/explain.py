@@ -0,0 +1,174 @@
+# Standard library imports
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+# Third party imports
+from flask import current_app, request
+
+# Local application imports
+from app.queries import get_request_stats
+
+EXPLAIN_PARAM = "_explain"
+EXPLAIN_MODES = ("analyze",)
+
+_SELECT_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+# "SCAN TABLE book" (SQLite < 3.36) or "SCAN book", without an index
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*USING)")
+
+
+def get_explain_mode() -> Optional[str]:
+    """``?_explain=analyze`` of the current request, only honoured in debug."""
+    if not current_app.debug:
+        return None
+    mode = request.args.get(EXPLAIN_PARAM)
+    return mode if mode in EXPLAIN_MODES else None
+
+
+def should_capture_queries() -> bool:
+    config = current_app.config
+    return bool(get_explain_mode()) or (
+        current_app.debug and config["EXPLAIN_LOG_SEQ_SCANS"]
+    )
+
+
+def _walk_plan(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk_plan(child)
+
+
+def _postgresql_table_rows(cursor, table: str) -> float:
+    cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", (table,))
+    row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+def explain_postgresql(cursor, statement, parameters, analyze: bool) -> dict:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+    result = cursor.fetchone()[0]
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]
+
+    seq_scans = []
+    for node in _walk_plan(plan["Plan"]):
+        if node["Node Type"] != "Seq Scan":
+            continue
+        table = node["Relation Name"]
+        scanned = node.get("Actual Rows", 0) * node.get("Actual Loops", 1) + node.get(
+            "Rows Removed by Filter", 0
+        )
+        # reltuples is -1 (0 before PostgreSQL 14) until the table is analyzed
+        rows = _postgresql_table_rows(cursor, table)
+        rows = max(rows if rows > 0 else node["Plan Rows"], scanned)
+        seq_scans.append(dict(table=table, rows=int(rows)))
+    return dict(plan=plan, seq_scans=seq_scans)
+
+
+def explain_sqlite(cursor, statement, parameters, analyze: bool) -> dict:
+    cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    plan = [row[-1] for row in cursor.fetchall()]
+
+    seq_scans = []
+    for detail in plan:
+        match = _SQLITE_SCAN_RE.match(detail)
+        if match is None:
+            continue
+        # Subqueries are scanned under their alias
+        table = match.group(1)
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        )
+        if cursor.fetchone() is not None:
+            cursor.execute(f'SELECT count(*) FROM "{table}"')
+            seq_scans.append(dict(table=table, rows=cursor.fetchone()[0]))
+    return dict(plan=plan, seq_scans=seq_scans)
+
+
+EXPLAINERS = {"postgresql": explain_postgresql, "sqlite": explain_sqlite}
+
+
+def _explain(explainer, dbapi_connection, statement, parameters, analyze) -> dict:
+    cursor = dbapi_connection.cursor()
+    try:
+        start_time = time.perf_counter()
+        result = explainer(cursor, statement, parameters, analyze)
+        result["explain_ms"] = round((time.perf_counter() - start_time) * 1000, 3)
+    finally:
+        cursor.close()
+    return result
+
+
+def explain_query(engine, statement: str, parameters, analyze: bool) -> dict:
+    explainer = EXPLAINERS.get(engine.dialect.name)
+    result: Dict[str, Any] = dict(statement=statement)
+    if explainer is None:
+        return dict(result, error=f"EXPLAIN is not supported on {engine.dialect.name}")
+
+    # Returned to the pool, and rolled back, on close
+    connection = engine.raw_connection()
+    try:
+        result.update(_explain(explainer, connection, statement, parameters, analyze))
+    except Exception as error:
+        result["error"] = str(error)
+    finally:
+        connection.close()
+    return result
+
+
+def explain_in_transaction(
+    connection, statement: str, parameters, analyze: bool
+) -> dict:
+    """Explain on the SQLAlchemy ``connection`` of a session, within its
+    transaction and so with its settings (e.g. the ``statement_timeout``).
+
+    A savepoint keeps the transaction usable when the EXPLAIN fails.
+    """
+    dialect_name = connection.dialect.name
+    explainer = EXPLAINERS.get(dialect_name)
+    result: Dict[str, Any] = dict(statement=statement)
+    if explainer is None:
+        return dict(result, error=f"EXPLAIN is not supported on {dialect_name}")
+
+    try:
+        with connection.begin_nested():
+            result.update(
+                _explain(
+                    explainer, connection.connection, statement, parameters, analyze
+                )
+            )
+    except Exception as error:
+        result["error"] = str(error)
+    return result
+
+
+def explain_request_queries() -> Optional[List[dict]]:
+    """Plans of the SELECT statements executed by the current request.
+
+    Only SELECT statements are explained, ``EXPLAIN ANALYZE`` executes the
+    statement and would repeat writes. Plans with sequential scans on tables
+    of at least ``EXPLAIN_SEQ_SCAN_MIN_ROWS`` rows are logged.
+    """
+    stats = get_request_stats()
+    if stats is None or stats.queries is None:
+        return None
+    # Explained once per request
+    queries, stats.queries = stats.queries, None
+
+    mode = get_explain_mode()
+    min_rows = current_app.config["EXPLAIN_SEQ_SCAN_MIN_ROWS"]
+    plans = []
+    for engine, statement, parameters, seconds in queries:
+        if not _SELECT_RE.match(statement):
+            continue
+        result = explain_query(engine, statement, parameters, analyze=bool(mode))
+        result["duration_ms"] = round(seconds * 1000, 3)
+        plans.append(result)
+        for seq_scan in result.get("seq_scans", []):
+            if seq_scan["rows"] >= min_rows:
+                current_app.logger.warning(
+                    f"Sequential scan on {seq_scan['table']} ({seq_scan['rows']} rows)"
+                    f" by {request.method} {request.path}: {statement}"
+                )
+    return plans if mode else None
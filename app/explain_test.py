@@ -0,0 +1,106 @@
+# Standard library imports
+import logging
+
+# Third party imports
+import pytest
+
+# Local application imports
+from app import create_app
+from app.config import TestConfig
+from app.explain import explain_in_transaction, explain_query
+from app.extensions import db as _db
+
+
+class SQLiteConfig(TestConfig):
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+
+
+@pytest.fixture
+def sqlite_app():
+    # Local application imports
+    from app.api.book import Book
+
+    app = create_app(SQLiteConfig)
+    app.debug = True
+    with app.app_context():
+        _db.create_all()
+        for i in range(3):
+            Book.create(title=f"book {i}")
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+def test_explain_sqlite(sqlite_app, caplog):
+    client = sqlite_app.test_client()
+    sqlite_app.config["EXPLAIN_SEQ_SCAN_MIN_ROWS"] = 3
+
+    with caplog.at_level(logging.WARNING):
+        response = client.get("/api/book?pageIndex=1&_explain=analyze")
+    assert response.status_code == 200
+    explain = response.json["explain"]
+    # Total count, page count and the page itself
+    assert len(explain) == 3
+    for query in explain:
+        assert query["statement"].startswith("SELECT")
+        assert query["duration_ms"] >= 0
+        assert any("SCAN" in detail for detail in query["plan"])
+        assert query["seq_scans"] == [dict(table="book", rows=3)]
+    assert "Sequential scan on book (3 rows) by GET /api/book" in caplog.text
+
+    response = client.get("/api/book/1?_explain=analyze")
+    assert len(response.json["explain"]) == 1
+    assert response.json["explain"][0]["seq_scans"] == []
+
+
+def test_explain_debug_only(sqlite_app):
+    client = sqlite_app.test_client()
+
+    sqlite_app.debug = False
+    response = client.get("/api/book?pageIndex=1&_explain=analyze")
+    # Not an unknown argument of the index either
+    assert response.status_code == 200
+    assert "explain" not in response.json
+
+    sqlite_app.debug = True
+    response = client.get("/api/book?pageIndex=1&_explain=foo")
+    assert "explain" not in response.json
+
+
+def test_explain_postgresql(app, db):
+    with app.app_context():
+        db.session.execute("INSERT INTO book (title) VALUES ('foo')")
+        db.session.commit()
+        result = explain_query(
+            db.engine,
+            "SELECT * FROM book WHERE title = %(title)s",
+            {"title": "foo"},
+            True,
+        )
+        failed = explain_query(db.engine, "SELECT * FROM foo", {}, True)
+        db.session.remove()
+
+    plan = result["plan"]
+    assert plan["Plan"]["Node Type"] == "Seq Scan"
+    assert plan["Plan"]["Actual Rows"] == 1
+    assert "Execution Time" in plan
+    assert result["seq_scans"][0]["table"] == "book"
+    assert result["explain_ms"] >= 0
+    assert 'relation "foo" does not exist' in failed["error"]
+
+
+def test_explain_in_transaction(app, db):
+    with app.app_context():
+        db.session.execute("INSERT INTO book (title) VALUES ('foo')")
+        connection = db.session.connection()
+        # Sees the uncommitted row of the transaction
+        result = explain_in_transaction(
+            connection, "SELECT * FROM book", {}, analyze=True
+        )
+        failed = explain_in_transaction(connection, "SELECT * FROM foo", {}, False)
+        # The transaction is still usable after the failed EXPLAIN
+        assert db.session.execute("SELECT count(*) FROM book").scalar() == 1
+        db.session.remove()
+
+    assert result["plan"]["Plan"]["Actual Rows"] == 1
+    assert 'relation "foo" does not exist' in failed["error"]
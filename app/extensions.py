@@ -1,8 +1,279 @@
+# Standard library imports
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional
+
 # Third party imports
+from flask import Flask, current_app, g, has_app_context, has_request_context, request
 from flask_babel import Babel
-from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, _EngineConnector, get_state
+from itsdangerous import BadSignature, TimestampSigner
+from sqlalchemy import event, orm
+from sqlalchemy.engine import Connection
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# Local application imports
+from app.admission import AdmissionController
+from app.bulkhead import Bulkheads
+from app.health import Health
+from app.i18n import MessageCatalog
+from app.metrics import Metrics
+from app.queries import QueryCounter
+
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
+REPLICA_BIND_PREFIX = "replica_"
+STICKY_PRIMARY_SALT = "sticky-primary"
+
+
+class ReplicaSelector:
+    """Picks the replica bind that serves the next read-only operation.
+
+    Supported strategies are ``round_robin`` and ``least_latency``, the latter
+    uses an exponentially weighted moving average of the statement latency
+    observed on every replica engine.
+    """
+
+    strategies = ("round_robin", "least_latency")
+    smoothing = 0.2
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._latencies: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def choose(self, bind_keys: List[str], strategy: str = "round_robin") -> str:
+        assert isinstance(bind_keys, list) and len(bind_keys)
+        assert strategy in self.strategies
+        if strategy == "least_latency":
+            return min(bind_keys, key=lambda key: self._latencies.get(key, 0.0))
+        return bind_keys[next(self._counter) % len(bind_keys)]
+
+    def record(self, bind_key: str, duration: float):
+        assert isinstance(bind_key, str)
+        with self._lock:
+            latency = self._latencies.get(bind_key)
+            if latency is None:
+                self._latencies[bind_key] = duration
+            else:
+                self._latencies[bind_key] = (
+                    self.smoothing * duration + (1 - self.smoothing) * latency
+                )
+
+    def latency(self, bind_key: str) -> Optional[float]:
+        return self._latencies.get(bind_key)
+
+    def instrument(self, bind_key: str, engine):
+        """Measure the statement latency of a replica engine (once)."""
+        if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            return
+
+        def _after_cursor_execute(conn, cursor, statement, params, context, many):
+            start_time = conn.info.pop("replica_query_start_time", None)
+            if start_time is not None:
+                self.record(bind_key, time.perf_counter() - start_time)
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, params, context, many):
+    conn.info["replica_query_start_time"] = time.perf_counter()
+
+
+class RoutingSession(SignallingSession):
+    """Session that sends read-only operations to the replica binds.
+
+    Writes (flushes and DML statements), sessions that have been marked with
+    :func:`use_primary` and sessions bound to an explicit connection always
+    use the primary defined by ``SQLALCHEMY_DATABASE_URI``.
+    """
+
+    def __init__(self, db, **options):
+        self._route_reads = options.get("bind") is None
+        super().__init__(db, **options)
+
+    def _use_primary(self, clause=None) -> bool:
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["use_primary"] = True
+            if has_request_context():
+                g.db_used_primary = True
+        return self.info.get("use_primary", False)
+
+    def get_bind(self, mapper=None, clause=None):
+        bind = super().get_bind(mapper, clause)
+        if not self._route_reads or isinstance(bind, Connection):
+            return bind
+
+        state = get_state(self.app)
+        if bind is not state.db.get_engine(self.app):
+            return bind
+        bind_key = None
+        replica_binds = state.db.get_replica_binds(self.app)
+        if replica_binds and not self._use_primary(clause):
+            strategy = self.app.config["SQLALCHEMY_REPLICA_STRATEGY"]
+            bind_key = state.db.replica_selector.choose(replica_binds, strategy)
+
+        pool = _get_request_pool(self.app)
+        engine = state.db.get_engine(self.app, bind=bind_key, pool=pool)
+        if bind_key is not None:
+            state.db.replica_selector.instrument(bind_key, engine)
+        return engine
+
+
+def _get_request_pool(app: Flask) -> Optional[str]:
+    """The connection pool of the cost class of the current request, if any."""
+    if not has_request_context():
+        return None
+    # Local application imports
+    from app.bulkhead import get_cost_class
+
+    cost_class = get_cost_class()
+    return cost_class if cost_class in app.config["BULKHEAD_DB_POOLS"] else None
+
 
-db = SQLAlchemy()
-migrate = Migrate()
+class PoolEngineConnector(_EngineConnector):
+    """Engine of a bind with its own connection pool for a cost class.
+
+    The pool options of ``BULKHEAD_DB_POOLS[pool]`` override the engine
+    options, the connections of a cost class are then bounded separately.
+    """
+
+    def __init__(self, sa, app, bind=None, pool=None):
+        super().__init__(sa, app, bind)
+        self._pool = pool
+
+    def get_options(self, sa_url, echo):
+        options = super().get_options(sa_url, echo)
+        options.update(self._app.config["BULKHEAD_DB_POOLS"][self._pool])
+        return options
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension with read replica routing.
+
+    Replicas are configured through ``SQLALCHEMY_REPLICA_URIS`` and registered
+    as ``replica_<n>`` binds. After a client performs a write its reads stick to
+    the primary for ``SQLALCHEMY_STICKY_PRIMARY_SECONDS`` (tracked in a signed
+    cookie) to keep read-your-writes consistency.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_selector = ReplicaSelector()
+
+    def create_session(self, options):
+        # Items stay loaded after a commit, serializing them takes no SELECT
+        options.setdefault("expire_on_commit", False)
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", None)
+        app.config.setdefault("SQLALCHEMY_REPLICA_STRATEGY", "round_robin")
+        app.config.setdefault("SQLALCHEMY_STICKY_PRIMARY_SECONDS", 5)
+        app.config.setdefault("SQLALCHEMY_STICKY_PRIMARY_COOKIE", "db_primary_until")
+        app.config.setdefault("BULKHEAD_DB_POOLS", {})
+
+        replica_uris = app.config["SQLALCHEMY_REPLICA_URIS"] or []
+        if isinstance(replica_uris, str):
+            replica_uris = [uri.strip() for uri in replica_uris.split(",")]
+            replica_uris = [uri for uri in replica_uris if uri]
+        assert app.config["SQLALCHEMY_REPLICA_STRATEGY"] in ReplicaSelector.strategies
+
+        if replica_uris:
+            binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+            for index, uri in enumerate(replica_uris):
+                binds[f"{REPLICA_BIND_PREFIX}{index}"] = uri
+            app.config["SQLALCHEMY_BINDS"] = binds
+            app.before_request(_stick_to_primary)
+            app.after_request(_set_sticky_primary_cookie)
+
+        super().init_app(app)
+
+    def get_engine(self, app=None, bind=None, pool=None):
+        """The engine of ``bind``, or of its connection pool named ``pool``.
+
+        Pools are ignored on SQLite, it has no pool to size.
+        """
+        if pool is None:
+            return super().get_engine(app, bind)
+        app = self.get_app(app)
+        uri = (app.config.get("SQLALCHEMY_BINDS") or {}).get(
+            bind, app.config["SQLALCHEMY_DATABASE_URI"]
+        )
+        if make_url(uri).drivername.startswith("sqlite"):
+            return super().get_engine(app, bind)
+        state = get_state(app)
+        with self._engine_lock:
+            # Connectors of the pools are keyed by bind and pool, next to the
+            # ones of the binds so that disposing the engines covers them
+            connector = state.connectors.get((bind, pool))
+            if connector is None:
+                connector = PoolEngineConnector(self, app, bind, pool)
+                state.connectors[(bind, pool)] = connector
+        return connector.get_engine()
+
+    @staticmethod
+    def get_replica_binds(app: Flask) -> List[str]:
+        binds = app.config.get("SQLALCHEMY_BINDS") or {}
+        return sorted(key for key in binds if key.startswith(REPLICA_BIND_PREFIX))
+
+
+def use_primary():
+    """Route all further operations of the current session to the primary."""
+    if not has_app_context():
+        return
+    db.session.info["use_primary"] = True
+    if has_request_context():
+        g.db_used_primary = True
+
+
+def get_sticky_primary_signer(app: Flask) -> TimestampSigner:
+    # Signed, clients cannot pin their reads to the primary
+    return TimestampSigner(app.config["SECRET_KEY"], salt=STICKY_PRIMARY_SALT)
+
+
+def _stick_to_primary():
+    if request.method not in READ_ONLY_METHODS:
+        db.session.info["use_primary"] = True
+        return
+    config = current_app.config
+    value = request.cookies.get(config["SQLALCHEMY_STICKY_PRIMARY_COOKIE"])
+    if value is None:
+        return
+    signer = get_sticky_primary_signer(current_app)
+    try:
+        # Expired after the sticky seconds whatever the cookie says
+        signer.unsign(value, max_age=config["SQLALCHEMY_STICKY_PRIMARY_SECONDS"])
+    except BadSignature:
+        return
+    db.session.info["use_primary"] = True
+
+
+def _set_sticky_primary_cookie(response):
+    if getattr(g, "db_used_primary", False) is True:
+        config = current_app.config
+        response.set_cookie(
+            config["SQLALCHEMY_STICKY_PRIMARY_COOKIE"],
+            get_sticky_primary_signer(current_app).sign("primary").decode(),
+            max_age=config["SQLALCHEMY_STICKY_PRIMARY_SECONDS"],
+            httponly=True,
+        )
+    return response
+
+
+# Typed as the flask_sqlalchemy extension so that db.Model is a valid base class
+db: SQLAlchemy = RoutingSQLAlchemy()
 babel = Babel()
+catalog = MessageCatalog()
+metrics = Metrics()
+query_counter = QueryCounter()
+admission = AdmissionController()
+bulkheads = Bulkheads()
+health = Health()
+
+
+@babel.localeselector
+def select_locale():
+    return catalog.select_locale()
@@ -0,0 +1,123 @@
+# Standard library imports
+import time
+
+# Third party imports
+import pytest
+
+# Local application imports
+from app.config import TestConfig
+from app.extensions import ReplicaSelector, db, get_sticky_primary_signer, use_primary
+
+
+def test_replica_selector_round_robin():
+    selector = ReplicaSelector()
+    bind_keys = ["replica_0", "replica_1"]
+
+    chosen = [selector.choose(bind_keys) for _ in range(4)]
+    assert chosen == ["replica_0", "replica_1", "replica_0", "replica_1"]
+
+    with pytest.raises(AssertionError):
+        selector.choose([])
+
+    with pytest.raises(AssertionError):
+        selector.choose(bind_keys, strategy="foo")
+
+
+def test_replica_selector_least_latency():
+    selector = ReplicaSelector()
+    bind_keys = ["replica_0", "replica_1"]
+
+    selector.record("replica_0", 0.2)
+    # Unmeasured replicas are tried first
+    assert selector.choose(bind_keys, strategy="least_latency") == "replica_1"
+
+    selector.record("replica_1", 0.4)
+    assert selector.choose(bind_keys, strategy="least_latency") == "replica_0"
+
+    selector.record("replica_0", 1.2)
+    assert selector.latency("replica_0") == pytest.approx(0.4)
+    assert selector.choose(bind_keys, strategy="least_latency") in bind_keys
+
+
+@pytest.fixture
+def replica_app(monkeypatch, tmp_path):
+    # Local application imports
+    from app import create_app
+    from app.api.book import Book
+
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URIS = f"sqlite:///{tmp_path / 'replica.db'}"
+
+    app = create_app(config=ReplicaConfig)
+    monkeypatch.setattr(db, "session", db.create_scoped_session())
+
+    with app.app_context():
+        for bind in (None, "replica_0"):
+            engine = db.get_engine(app, bind=bind)
+            db.metadata.create_all(engine)
+            title = "replica" if bind else "primary"
+            engine.execute(Book.__table__.insert(), id=1, title=title)
+
+    yield app
+
+    db.session.remove()
+
+
+def test_routing_session(replica_app):
+    # Local application imports
+    from app.api.book import Book
+
+    assert replica_app.config["SQLALCHEMY_BINDS"] == {
+        "replica_0": replica_app.config["SQLALCHEMY_REPLICA_URIS"]
+    }
+
+    with replica_app.app_context():
+        assert Book.query.get(1).title == "replica"
+        assert db.replica_selector.latency("replica_0") is not None
+
+    with replica_app.app_context():
+        use_primary()
+        assert Book.query.get(1).title == "primary"
+
+    with replica_app.app_context():
+        Book.create(title="new")
+        assert Book.query.filter_by(title="new").count() == 1
+
+
+def test_read_your_writes(monkeypatch, replica_app):
+    with replica_app.test_client() as client:
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "replica"
+
+        response = client.put("/api/book/1", json=dict(title="updated"))
+        assert "db_primary_until" in response.headers["Set-Cookie"]
+
+        # Reads stick to the primary after the write
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "updated"
+
+    with replica_app.test_client() as client:
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "replica"
+
+        client.set_cookie("localhost", "db_primary_until", "foo")
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "replica"
+
+        # The timestamps of earlier versions are not trusted either
+        far_future = str(time.time() + 3600)
+        client.set_cookie("localhost", "db_primary_until", far_future)
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "replica"
+
+        # Signed cookies expire after the sticky seconds
+        with replica_app.app_context():
+            value = get_sticky_primary_signer(replica_app).sign("primary").decode()
+        client.set_cookie("localhost", "db_primary_until", value)
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "updated"
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 60)
+        response = client.get("/api/book/1")
+        assert response.json["data"]["title"] == "replica"
@@ -0,0 +1,176 @@
+# Standard library imports
+import os
+import socket
+
+# Third party imports
+from flask import Flask
+from flask_sqlalchemy import get_state
+from psycopg2 import OperationalError, extensions
+from sqlalchemy.engine.url import make_url
+
+# Local application imports
+from app.server import Worker, dispose_engines
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that yields to the gevent hub while waiting."""
+    # Third party imports
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def eventlet_wait_callback(conn, timeout=-1):
+    """psycopg2 wait callback that yields to the eventlet hub while waiting."""
+    # Third party imports
+    from eventlet.hubs import trampoline
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def patch(worker_class: str):
+    """Monkey patch the standard library and make psycopg2 waits cooperative."""
+    assert worker_class in ("gevent", "eventlet")
+    if worker_class == "gevent":
+        # Third party imports
+        from gevent import monkey
+
+        monkey.patch_all()
+        extensions.set_wait_callback(gevent_wait_callback)
+    else:
+        # Third party imports
+        import eventlet
+
+        eventlet.monkey_patch()
+        extensions.set_wait_callback(eventlet_wait_callback)
+
+
+def configure_green_pool(app: Flask):
+    """Size the connection pools for many concurrent greenlets.
+
+    Engines are recreated on first use with the new pool options.
+    """
+    dispose_engines(app)
+    uri = app.config.get("SQLALCHEMY_DATABASE_URI")
+    if uri is None or make_url(uri).drivername.startswith("sqlite"):
+        return
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = dict(
+        app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {},
+        pool_size=app.config["SQLALCHEMY_GREEN_POOL_SIZE"],
+        max_overflow=app.config["SQLALCHEMY_GREEN_MAX_OVERFLOW"],
+    )
+    get_state(app).connectors.clear()
+
+
+class CountingMiddleware:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.handled_requests = 0
+
+    def __call__(self, environ, start_response):
+        try:
+            return self.wsgi_app(environ, start_response)
+        finally:
+            self.handled_requests += 1
+
+
+class GeventWorker(Worker):
+    """Serves up to ``worker_connections`` requests concurrently in greenlets."""
+
+    def run(self):
+        patch("gevent")
+        self.init_process()
+        configure_green_pool(self.app)
+        self.warm_up()
+
+        # Third party imports
+        import gevent
+        from gevent import socket as gevent_socket
+        from gevent.pool import Pool
+        from gevent.pywsgi import WSGIServer
+
+        listener = gevent_socket.socket(fileno=os.dup(self.listener.fileno()))
+        wsgi_app = CountingMiddleware(self.app)
+        server = WSGIServer(
+            listener, wsgi_app, spawn=Pool(self.worker_connections), log=None
+        )
+        server.start()
+        while self.alive and not self._should_recycle(wsgi_app.handled_requests):
+            gevent.sleep(self.timeout)
+        server.stop(timeout=self.graceful_timeout)
+
+
+def get_graceful_protocol() -> type:
+    """eventlet's HttpProtocol marking its connection busy during a request.
+
+    eventlet 0.29 leaves every connection marked idle, so stopping the server
+    shuts down the connections of the requests in progress as well.
+    """
+    # Third party imports
+    from eventlet import wsgi
+
+    class GracefulHttpProtocol(wsgi.HttpProtocol):
+        def handle_one_response(self):
+            self.conn_state[2] = wsgi.STATE_REQUEST
+            try:
+                super().handle_one_response()
+            finally:
+                # Closed once the response is sent when the server stopped
+                if self.conn_state[2] == wsgi.STATE_REQUEST:
+                    self.conn_state[2] = wsgi.STATE_IDLE
+
+    return GracefulHttpProtocol
+
+
+class EventletWorker(Worker):
+    """Serves up to ``worker_connections`` requests concurrently in greenthreads."""
+
+    def run(self):
+        patch("eventlet")
+        self.init_process()
+        configure_green_pool(self.app)
+        self.warm_up()
+
+        # Third party imports
+        import eventlet
+        from eventlet import wsgi
+
+        listener = eventlet.greenio.GreenSocket(
+            socket.socket(fileno=os.dup(self.listener.fileno()))
+        )
+        wsgi_app = CountingMiddleware(self.app)
+        pool = eventlet.GreenPool(self.worker_connections)
+        server = eventlet.spawn(
+            wsgi.server,
+            listener,
+            wsgi_app,
+            custom_pool=pool,
+            protocol=get_graceful_protocol(),
+            log_output=False,
+        )
+        while self.alive and not self._should_recycle(wsgi_app.handled_requests):
+            eventlet.sleep(self.timeout)
+        # Stop accepting and close the idle connections, killing the server
+        # returns as soon as it waits for the requests in progress
+        server.kill()
+        listener.close()
+        with eventlet.Timeout(self.graceful_timeout, False):
+            pool.waitall()
@@ -0,0 +1,211 @@
+# Standard library imports
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+# Third party imports
+import gevent
+import pytest
+from flask import Flask, g
+from psycopg2 import OperationalError, extensions
+
+# Local application imports
+from app.config import TestConfig
+from app.extensions import db
+from app.green import (
+    CountingMiddleware,
+    configure_green_pool,
+    eventlet_wait_callback,
+    gevent_wait_callback,
+    patch,
+)
+from app.server import PreforkServer, Worker, get_worker_class
+
+
+class DummyConnection:
+    def __init__(self, states):
+        self.states = list(states)
+
+    def poll(self):
+        return self.states.pop(0)
+
+    @staticmethod
+    def fileno():
+        return 1
+
+
+def test_gevent_wait_callback(monkeypatch):
+    waits = []
+    monkeypatch.setattr("gevent.socket.wait_read", lambda *x, **y: waits.append("read"))
+    monkeypatch.setattr(
+        "gevent.socket.wait_write", lambda *x, **y: waits.append("write")
+    )
+
+    states = [extensions.POLL_READ, extensions.POLL_WRITE, extensions.POLL_OK]
+    gevent_wait_callback(DummyConnection(states))
+    assert waits == ["read", "write"]
+
+    with pytest.raises(OperationalError):
+        gevent_wait_callback(DummyConnection([extensions.POLL_ERROR]))
+
+
+def test_eventlet_wait_callback(monkeypatch):
+    waits = []
+
+    def trampoline(fileno, read=False, write=False):
+        waits.append("read" if read else "write")
+
+    monkeypatch.setattr("eventlet.hubs.trampoline", trampoline)
+
+    states = [extensions.POLL_READ, extensions.POLL_WRITE, extensions.POLL_OK]
+    eventlet_wait_callback(DummyConnection(states))
+    assert waits == ["read", "write"]
+
+    with pytest.raises(OperationalError):
+        eventlet_wait_callback(DummyConnection([extensions.POLL_ERROR]))
+
+
+def test_patch():
+    with pytest.raises(AssertionError):
+        patch("sync")
+
+
+def test_get_worker_class():
+    assert get_worker_class("gevent").__name__ == "GeventWorker"
+    assert get_worker_class("eventlet").__name__ == "EventletWorker"
+
+    with pytest.raises(AssertionError):
+        get_worker_class("foo")
+
+
+def test_configure_green_pool(app):
+    configure_green_pool(app)
+    engine_options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    assert engine_options["pool_size"] == TestConfig.SQLALCHEMY_GREEN_POOL_SIZE
+    assert engine_options["max_overflow"] == TestConfig.SQLALCHEMY_GREEN_MAX_OVERFLOW
+
+    with app.app_context():
+        assert db.engine.pool.size() == TestConfig.SQLALCHEMY_GREEN_POOL_SIZE
+
+    sqlite_app = Flask(__name__)
+    sqlite_app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    sqlite_app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(sqlite_app)
+    configure_green_pool(sqlite_app)
+    assert sqlite_app.config["SQLALCHEMY_ENGINE_OPTIONS"] == {}
+
+
+def test_counting_middleware():
+    middleware = CountingMiddleware(lambda environ, start_response: [b"OK"])
+    assert middleware({}, None) == [b"OK"]
+    assert middleware.handled_requests == 1
+
+
+def test_flask_g_is_greenlet_local(app, dummy_api):
+    def handle_request():
+        with app.test_request_context("/"):
+            dummy_api(api_version="1.0").before_request(name="get")
+            request_id = g.request_id
+            start_time = g.request_start_time
+            # Yield to the other greenlets handling a request
+            gevent.sleep(0.01)
+            assert g.request_id == request_id
+            assert g.request_start_time == start_time
+            return request_id
+
+    greenlets = [gevent.spawn(handle_request) for _ in range(10)]
+    gevent.joinall(greenlets, raise_error=True)
+    assert len({greenlet.value for greenlet in greenlets}) == 10
+
+
+def create_sleepy_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    @app.route("/")
+    def sleep():
+        # Cooperative once the worker has monkey patched the standard library
+        time.sleep(0.5)
+        return str(os.getpid())
+
+    db.init_app(app)
+    return app
+
+
+@pytest.mark.parametrize("worker_class", ["gevent", "eventlet"])
+def test_green_worker(worker_class):
+    server = PreforkServer(
+        create_sleepy_app,
+        host="127.0.0.1",
+        port=0,
+        workers=1,
+        worker_class=worker_class,
+    )
+    server.poll_interval = 0.05
+    port = server.bind().getsockname()[1]
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            server.run()
+        finally:
+            os._exit(0)
+
+    def get(_):
+        with urlopen(f"http://127.0.0.1:{port}/", timeout=10) as response:
+            return int(response.read())
+
+    try:
+        # Wait for the worker to start
+        get(None)
+
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            worker_pids = set(executor.map(get, range(10)))
+        # A single worker served the requests concurrently
+        assert len(worker_pids) == 1
+        assert time.monotonic() - start_time < 2.5
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+
+@pytest.mark.parametrize("worker_class", ["gevent", "eventlet"])
+def test_green_worker_graceful_stop(monkeypatch, worker_class):
+    # Notice the stop request while the request is in flight
+    monkeypatch.setattr(Worker, "timeout", 0.05)
+    server = PreforkServer(
+        create_sleepy_app,
+        host="127.0.0.1",
+        port=0,
+        workers=1,
+        worker_class=worker_class,
+    )
+    server.poll_interval = 0.05
+    port = server.bind().getsockname()[1]
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            server.run()
+        finally:
+            os._exit(0)
+
+    def get():
+        with urlopen(f"http://127.0.0.1:{port}/", timeout=10) as response:
+            return response.status
+
+    try:
+        assert get() == 200
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            in_flight = executor.submit(get)
+            time.sleep(0.2)
+            # The worker stops once the request in progress is answered
+            os.kill(pid, signal.SIGTERM)
+            assert in_flight.result() == 200
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
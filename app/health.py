@@ -0,0 +1,121 @@
+# Standard library imports
+from typing import List, Optional, Sequence
+
+# Third party imports
+from flask import Flask, Response, current_app
+from sqlalchemy import orm
+from sqlalchemy.pool import QueuePool
+
+
+def get_engines(app: Flask) -> list:
+    """Engines of the primary, the replicas and the pools of the cost classes."""
+    # Local application imports
+    from app.extensions import db
+
+    binds: List[Optional[str]] = [None]
+    binds += db.get_replica_binds(app)
+    engines = [db.get_engine(app, bind=bind) for bind in binds]
+    for pool in app.config.get("BULKHEAD_DB_POOLS") or {}:
+        engines.extend(db.get_engine(app, bind=bind, pool=pool) for bind in binds)
+    # SQLite has no pools of its own, the same engine is returned
+    return list({id(engine): engine for engine in engines}.values())
+
+
+def fill_pool(engine, size: int) -> int:
+    """Open connections until ``size`` of them wait in the pool of ``engine``.
+
+    Returns the number of pooled connections, at most the pool size.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    size = min(size, pool.size())
+    connections: List = []
+    try:
+        # Held together, so every checkout takes or opens another connection
+        for _ in range(size):
+            connections.append(engine.raw_connection())
+    finally:
+        for connection in connections:
+            connection.close()
+    return size
+
+
+def warm_caches(app: Flask):
+    """Configure the mappers and render the messages of the registered APIs."""
+    # Local application imports
+    from app.api import APIS, load_api
+    from app.api.const import HttpMethodVerbs
+    from app.api.response import APIResponse
+    from app.i18n import get_catalog
+
+    orm.configure_mappers()
+    with app.app_context():
+        catalog = get_catalog()
+        locales: Sequence[Optional[str]] = (None,)
+        if catalog is not None:
+            locales = catalog.locales
+    models = [load_api(path).model for path in APIS]
+    for locale in locales:
+        headers = {"Accept-Language": locale} if locale else {}
+        with app.test_request_context(headers=headers):
+            for model in models:
+                for method in HttpMethodVerbs.__members__:
+                    APIResponse().get_success_message(model, method)
+
+
+class Health:
+    """Liveness and readiness probes, plain routes outside of the API views.
+
+    The liveness probe answers as long as the process serves requests. The
+    readiness probe answers once :meth:`warm_up` filled the connection pools
+    with ``SQLALCHEMY_POOL_MIN_SIZE`` connections and warmed the caches. The
+    servers warm up every worker before it accepts requests, with any other
+    server the first readiness probe does.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.ready = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("HEALTH_LIVENESS_PATH", "/healthz")
+        app.config.setdefault("HEALTH_READINESS_PATH", "/readyz")
+        app.config.setdefault("SQLALCHEMY_POOL_MIN_SIZE", 5)
+        if "health" in app.extensions:
+            return
+
+        self.ready = False
+        app.add_url_rule(app.config["HEALTH_LIVENESS_PATH"], "healthz", self.liveness)
+        app.add_url_rule(app.config["HEALTH_READINESS_PATH"], "readyz", self.readiness)
+        app.extensions["health"] = self
+
+    def warm_up(self, app: Flask) -> bool:
+        """Fill the pools and warm the caches, returns whether it is ready.
+
+        A failure (e.g. the database is unreachable) is logged and leaves the
+        process unready, the next readiness probe retries.
+        """
+        try:
+            with app.app_context():
+                for engine in get_engines(app):
+                    fill_pool(engine, app.config["SQLALCHEMY_POOL_MIN_SIZE"])
+            warm_caches(app)
+        except Exception:
+            app.logger.exception("Warm-up failed")
+            return False
+        self.ready = True
+        return True
+
+    @staticmethod
+    def liveness() -> Response:
+        return Response("ok", mimetype="text/plain")
+
+    def readiness(self) -> Response:
+        if not self.ready:
+            # Served by a server that did not warm up, or warming up failed
+            self.warm_up(current_app._get_current_object())
+        if not self.ready:
+            return Response("warming up", status=503, mimetype="text/plain")
+        return Response("ok", mimetype="text/plain")
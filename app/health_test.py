@@ -0,0 +1,74 @@
+# Third party imports
+from sqlalchemy import create_engine
+
+# Local application imports
+from app import create_app
+from app import health as health_module
+from app.config import TestConfig
+from app.health import fill_pool
+from app.queries import count_queries
+
+
+def test_liveness(app, client):
+    with count_queries() as stats:
+        response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.data == b"ok"
+    assert stats.count == 0
+
+
+def test_readiness(app, client):
+    # Local application imports
+    from app.extensions import db
+
+    health = app.extensions["health"]
+    assert not health.ready
+    db.engine.dispose()
+
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert health.ready
+    assert db.engine.pool.checkedin() == app.config["SQLALCHEMY_POOL_MIN_SIZE"]
+    # The messages of the APIs are rendered in every locale
+    catalog = app.extensions["message_catalog"]
+    assert ("success", "book", "DELETE", "nl") in catalog._rendered
+
+    with count_queries() as stats:
+        response = client.get("/readyz")
+    assert response.status_code == 200
+    assert stats.count == 0
+
+
+def test_readiness_failure(monkeypatch, app, client):
+    def fill_pool_unreachable(engine, size):
+        raise ConnectionError("unreachable")
+
+    monkeypatch.setattr(health_module, "fill_pool", fill_pool_unreachable)
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert not app.extensions["health"].ready
+
+    # The next probe retries
+    monkeypatch.undo()
+    response = client.get("/readyz")
+    assert response.status_code == 200
+
+
+def test_fill_pool():
+    engine = create_engine("sqlite://")
+    assert fill_pool(engine, 5) == 0
+
+
+def test_probes_exempt_from_admission():
+    class Config(TestConfig):
+        HEALTH_LIVENESS_PATH = "/live"
+        ADMISSION_EXEMPT_PATHS = ["/metrics"]
+
+    app = create_app(config=Config)
+    # No request left under the limit, the moved probe is still admitted
+    limiter = app.extensions["admission"].limiter
+    limiter.inflight = int(limiter.limit)
+    with app.test_client() as client:
+        response = client.get("/live")
+        assert response.status_code == 200
+        assert response.data == b"ok"
@@ -0,0 +1,128 @@
+# Standard library imports
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+# Third party imports
+from flask import Flask
+from flask.globals import _app_ctx_stack, _request_ctx_stack
+
+EXTENSION_NAME = "message_catalog"
+
+
+@lru_cache(maxsize=None)
+def load_messages(directories: Tuple[str, ...]) -> Dict[Tuple[str, str], str]:
+    """Parse every ``<locale>/LC_MESSAGES/messages.po`` once per process.
+
+    Untranslated and obsolete entries are left out so lookups fall back to the
+    default locale.
+    """
+    # Third party imports
+    from babel.messages.pofile import read_po
+
+    messages: Dict[Tuple[str, str], str] = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for locale in sorted(os.listdir(directory)):
+            path = os.path.join(directory, locale, "LC_MESSAGES", "messages.po")
+            if not os.path.isfile(path):
+                continue
+            with open(path, "rb") as po_file:
+                catalog = read_po(po_file, locale=locale)
+            for message in catalog:
+                if message.id and isinstance(message.id, str) and message.string:
+                    messages.setdefault((locale, message.id), message.string)
+    return messages
+
+
+@lru_cache(maxsize=256)
+def parse_accept_language(header: str) -> Tuple[str, ...]:
+    """Languages of an Accept-Language header, ordered by quality."""
+    languages = []
+    for position, part in enumerate(header.split(",")):
+        language, _, params = part.strip().partition(";")
+        language = language.strip().lower().replace("_", "-")
+        if not language:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if quality > 0:
+            languages.append((-quality, position, language))
+    return tuple(language for _, _, language in sorted(languages))
+
+
+class MessageCatalog:
+    """In-memory message catalog keyed by ``(locale, key)``.
+
+    Also the flask-babel locale selector, so dates and numbers formatted by
+    flask-babel use the same locale as the messages.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.messages: Dict[Tuple[str, str], str] = {}
+        self.default_locale = "en"
+        self.locales: Tuple[str, ...] = (self.default_locale,)
+        self._rendered: Dict[tuple, str] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        directories = app.config.get("BABEL_TRANSLATION_DIRECTORIES") or ""
+        self.messages = load_messages(tuple(directories.split(";")))
+        self.default_locale = app.config.get("BABEL_DEFAULT_LOCALE") or "en"
+        self.locales = tuple(app.config.get("LANGUAGES") or (self.default_locale,))
+        self._rendered = {}
+        app.extensions[EXTENSION_NAME] = self
+
+    def gettext(self, key: str, locale: Optional[str] = None) -> str:
+        locale = locale or self.select_locale()
+        message = self.messages.get((locale, key))
+        if message is None:
+            return self.messages.get((self.default_locale, key), key)
+        return message
+
+    def select_locale(self) -> str:
+        ctx = _request_ctx_stack.top
+        if ctx is None:
+            return self.default_locale
+        # Selected once per request, like flask-babel does
+        locale = getattr(ctx, "message_locale", None)
+        if locale is None:
+            header = ctx.request.headers.get("Accept-Language")
+            locale = self.default_locale
+            if header:
+                locale = self.best_match(parse_accept_language(header))
+            ctx.message_locale = locale
+        return locale
+
+    def best_match(self, languages: Iterable[str]) -> str:
+        for language in languages:
+            if language in self.locales:
+                return language
+            # "nl-BE" is served by "nl"
+            language = language.split("-")[0]
+            if language in self.locales:
+                return language
+        return self.default_locale
+
+    def render(self, key: tuple, render_message, locale: Optional[str] = None) -> str:
+        """Memoize the message ``render_message(locale)`` per key and locale."""
+        locale = locale or self.select_locale()
+        cache_key = key + (locale,)
+        message = self._rendered.get(cache_key)
+        if message is None:
+            message = self._rendered[cache_key] = render_message(locale)
+        return message
+
+
+def get_catalog() -> Optional[MessageCatalog]:
+    ctx = _app_ctx_stack.top
+    if ctx is None:
+        return None
+    return ctx.app.extensions.get(EXTENSION_NAME)
@@ -0,0 +1,77 @@
+# Local application imports
+from app.api.book import Book
+from app.api.error import NotFoundError
+from app.api.response import APIResponse
+from app.extensions import catalog
+from app.i18n import MessageCatalog, get_catalog, load_messages, parse_accept_language
+
+
+def test_load_messages(app):
+    directories = (app.config["BABEL_TRANSLATION_DIRECTORIES"], "/does/not/exist")
+    messages = load_messages(directories)
+    assert messages[("nl", "error_not_found")] == "Deze bron kan niet gevonden worden."
+    assert messages[("en", "error_not_found")] == "This resource could not be found."
+    # Obsolete entries are left out
+    assert ("nl", "book") not in messages
+    # Parsed once per process
+    assert load_messages(directories) is messages
+
+
+def test_parse_accept_language():
+    assert parse_accept_language("nl") == ("nl",)
+    assert parse_accept_language("en;q=0.5, nl-BE, fr;q=0.8") == ("nl-be", "fr", "en")
+    assert parse_accept_language("de;q=0, en;q=foo, ,nl") == ("nl",)
+    assert parse_accept_language("") == ()
+
+
+def test_best_match():
+    message_catalog = MessageCatalog()
+    message_catalog.locales = ("en", "nl")
+    assert message_catalog.best_match(("nl-be", "en")) == "nl"
+    assert message_catalog.best_match(("fr", "en")) == "en"
+    assert message_catalog.best_match(("fr",)) == "en"
+
+
+def test_gettext(app):
+    assert get_catalog() is None
+
+    with app.app_context():
+        assert get_catalog() is catalog
+        assert catalog.gettext("error_validation", "nl").startswith("Er heeft")
+        # Falls back to the default locale and then the key
+        assert catalog.gettext("error_validation", "fr").startswith("An error")
+        assert catalog.gettext("unknown", "nl") == "unknown"
+
+    with app.test_request_context(headers={"Accept-Language": "fr, nl;q=0.9"}):
+        assert catalog.select_locale() == "nl"
+        assert NotFoundError().message == "Deze bron kan niet gevonden worden."
+
+    with app.test_request_context():
+        assert catalog.select_locale() == "en"
+        assert NotFoundError().message == "This resource could not be found."
+
+
+def test_render(app):
+    calls = []
+
+    def render_message(locale):
+        calls.append(locale)
+        return f"message {locale}"
+
+    with app.app_context():
+        assert catalog.render(("test",), render_message, "nl") == "message nl"
+        assert catalog.render(("test",), render_message, "nl") == "message nl"
+        assert catalog.render(("test",), render_message) == "message en"
+    assert calls == ["nl", "en"]
+
+
+def test_success_message(app):
+    api_response = APIResponse()
+    assert (
+        api_response.get_success_message(Book, "DELETE") == "Book successfully deleted"
+    )
+
+    with app.test_request_context():
+        message = api_response.get_success_message(Book, "DELETE")
+        assert message == "Book successfully deleted"
+        assert catalog._rendered[("success", "book", "DELETE", "en")] == message
@@ -0,0 +1,166 @@
+# Standard library imports
+import glob
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Third party imports
+from flask import Flask, Response, g, request
+
+# Local application imports
+from app.queries import get_request_stats
+
+# Read by prometheus_client when it is first imported
+MULTIPROCESS_ENV = "prometheus_multiproc_dir"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def clear_multiprocess_dir():
+    """Remove the samples of previous runs, call before forking the workers."""
+    path = os.environ.get(MULTIPROCESS_ENV)
+    if path:
+        for sample_file in glob.glob(os.path.join(path, "*.db")):
+            os.remove(sample_file)
+
+
+class Metrics:
+    """Prometheus metrics of the requests, exported on ``METRICS_PATH``.
+
+    With ``METRICS_MULTIPROCESS_DIR`` set the samples are written to memory
+    mapped files in that directory and aggregated over all the pre-forked
+    workers on export.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        self.requests = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("METRICS_PATH", "/metrics")
+        app.config.setdefault("METRICS_MULTIPROCESS_DIR", None)
+        if not app.config["METRICS_ENABLED"] or "metrics" in app.extensions:
+            return
+
+        multiprocess_dir = app.config["METRICS_MULTIPROCESS_DIR"]
+        if multiprocess_dir:
+            os.makedirs(multiprocess_dir, exist_ok=True)
+            os.environ.setdefault(MULTIPROCESS_ENV, multiprocess_dir)
+        self._create_metrics()
+
+        app.before_request(self._start_request)
+        app.after_request(self._record_request)
+        app.add_url_rule(app.config["METRICS_PATH"], "metrics", self.export)
+        app.extensions["metrics"] = self
+
+    def _create_metrics(self):
+        # Metrics are registered once per process
+        if self.requests is not None:
+            return
+
+        # Third party imports
+        from prometheus_client import Counter, Histogram
+
+        self.requests = Counter(
+            "http_requests_total",
+            "HTTP requests by route and status code.",
+            ["method", "endpoint", "status"],
+        )
+        self.latency = Histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency.",
+            ["method", "endpoint"],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.response_size = Histogram(
+            "http_response_size_bytes",
+            "HTTP response body size.",
+            ["method", "endpoint"],
+            buckets=SIZE_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            "db_queries_per_request",
+            "Database queries executed per request.",
+            ["endpoint"],
+            buckets=QUERY_COUNT_BUCKETS,
+        )
+        self.db_time = Histogram(
+            "db_query_duration_seconds_per_request",
+            "Time spent executing database queries per request.",
+            ["endpoint"],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.serialization = Histogram(
+            "serialization_duration_seconds",
+            "Time spent serializing response data by schema.",
+            ["schema"],
+            buckets=LATENCY_BUCKETS,
+        )
+
+    @staticmethod
+    def _start_request():
+        g.metrics_start_time = time.perf_counter()
+
+    @staticmethod
+    def _endpoint() -> str:
+        # The route rule keeps the label cardinality bounded
+        url_rule = request.url_rule
+        return url_rule.rule if url_rule is not None else "<unmatched>"
+
+    def _record_request(self, response):
+        start_time = getattr(g, "metrics_start_time", None)
+        if start_time is None or request.endpoint == "metrics":
+            return response
+
+        endpoint = self._endpoint()
+        method = request.method
+        self.requests.labels(method, endpoint, response.status_code).inc()
+        self.latency.labels(method, endpoint).observe(time.perf_counter() - start_time)
+        if not response.is_streamed:
+            size = response.calculate_content_length()
+            if size is not None:
+                self.response_size.labels(method, endpoint).observe(size)
+        # Counted by the QueryCounter extension
+        query_stats = get_request_stats()
+        if query_stats is not None:
+            self.db_queries.labels(endpoint).observe(query_stats.count)
+            self.db_time.labels(endpoint).observe(query_stats.seconds)
+        g.metrics_start_time = None
+        return response
+
+    @contextmanager
+    def measure_serialization(self, schema_name: str):
+        if self.requests is None:
+            yield
+            return
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.serialization.labels(schema_name).observe(
+                time.perf_counter() - start_time
+            )
+
+    @staticmethod
+    def export() -> Response:
+        # Third party imports
+        from prometheus_client import (
+            CONTENT_TYPE_LATEST,
+            REGISTRY,
+            CollectorRegistry,
+            generate_latest,
+        )
+        from prometheus_client.multiprocess import MultiProcessCollector
+
+        registry = REGISTRY
+        if os.environ.get(MULTIPROCESS_ENV):
+            registry = CollectorRegistry()
+            MultiProcessCollector(registry)
+        return Response(
+            generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST}
+        )
@@ -0,0 +1,118 @@
+# Standard library imports
+import os
+import subprocess
+import sys
+import textwrap
+
+# Third party imports
+from flask import Flask
+from prometheus_client import REGISTRY
+
+# Local application imports
+from app.metrics import MULTIPROCESS_ENV, Metrics, clear_multiprocess_dir
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_request_metrics(app, db):
+    # Local application imports
+    from app.api.book import Book
+
+    with app.app_context():
+        path = f"/api/book/{Book.create(title='foo').id}"
+    endpoint = "/api/book/<int:id>"
+    labels = dict(method="GET", endpoint=endpoint)
+    requests_ok = sample("http_requests_total", status="200", **labels)
+    requests_not_found = sample("http_requests_total", status="404", **labels)
+    latency_count = sample("http_request_duration_seconds_count", **labels)
+    queries = sample("db_queries_per_request_sum", endpoint=endpoint)
+    serialized = sample("serialization_duration_seconds_count", schema="BookSchema")
+
+    client = app.test_client()
+    assert client.get(path).status_code == 200
+    assert client.get("/api/book/0").status_code == 404
+    response = client.get("/metrics")
+    # The requests shared the app context (and session) of the db fixture
+    db.session.remove()
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert b"http_request_duration_seconds_bucket" in response.data
+    assert sample("http_requests_total", status="200", **labels) == requests_ok + 1
+    assert sample("http_requests_total", status="404", **labels) == (
+        requests_not_found + 1
+    )
+    assert sample("http_request_duration_seconds_count", **labels) == (
+        latency_count + 2
+    )
+    assert sample("http_response_size_bytes_sum", **labels) > 0
+    assert sample("db_queries_per_request_sum", endpoint=endpoint) >= queries + 2
+    assert sample("serialization_duration_seconds_count", schema="BookSchema") == (
+        serialized + 1
+    )
+    # The metrics endpoint itself is not recorded
+    assert sample("http_requests_total", method="GET", endpoint="/metrics") == 0
+
+
+def test_metrics_disabled():
+    app = Flask(__name__)
+    app.config["METRICS_ENABLED"] = False
+    Metrics(app)
+    assert "metrics" not in app.extensions
+    assert app.test_client().get("/metrics").status_code == 404
+
+
+def test_clear_multiprocess_dir(tmpdir, monkeypatch):
+    tmpdir.join("counter_1.db").write("")
+    tmpdir.join("other.txt").write("")
+    monkeypatch.delenv(MULTIPROCESS_ENV, raising=False)
+    clear_multiprocess_dir()
+    assert len(tmpdir.listdir()) == 2
+
+    monkeypatch.setenv(MULTIPROCESS_ENV, str(tmpdir))
+    clear_multiprocess_dir()
+    assert [path.basename for path in tmpdir.listdir()] == ["other.txt"]
+
+
+def test_multiprocess_metrics(tmpdir):
+    # prometheus_client selects the multiprocess mode when it is first
+    # imported, so the workers are forked in a fresh interpreter
+    script = textwrap.dedent(
+        f"""
+        import os
+        from flask import Flask
+        from app.metrics import Metrics
+
+        app = Flask(__name__)
+        app.config["METRICS_MULTIPROCESS_DIR"] = {str(tmpdir)!r}
+        Metrics(app)
+        app.add_url_rule("/", "index", lambda: "OK")
+
+        pids = []
+        for _ in range(2):
+            pid = os.fork()
+            if pid == 0:
+                client = app.test_client()
+                for _ in range(5):
+                    client.get("/")
+                os._exit(0)
+            pids.append(pid)
+        for pid in pids:
+            os.waitpid(pid, 0)
+
+        print(app.test_client().get("/metrics").data.decode())
+        """
+    )
+    env = dict(os.environ)
+    env.pop(MULTIPROCESS_ENV, None)
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    metrics = result.stdout.decode()
+    assert 'http_requests_total{endpoint="/",method="GET",status="200"} 10.0' in metrics
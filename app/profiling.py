@@ -0,0 +1,198 @@
+# Standard library imports
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime as dt
+from typing import Any, Dict, Optional
+
+# Third party imports
+from flask import Flask, current_app, g, request
+from itsdangerous import BadSignature, TimestampSigner
+
+SIGNER_SALT = "request-profile"
+
+
+def get_signer(app: Flask) -> TimestampSigner:
+    return TimestampSigner(app.config["SECRET_KEY"], salt=SIGNER_SALT)
+
+
+def create_profile_token(app: Flask) -> str:
+    """Value of the ``PROFILE_HEADER`` that profiles a request on demand."""
+    return get_signer(app).sign(str(os.getpid())).decode()
+
+
+def is_valid_profile_token(app: Flask, token: str) -> bool:
+    max_age = app.config["PROFILE_TOKEN_MAX_AGE"]
+    try:
+        get_signer(app).unsign(token, max_age=max_age)
+    except BadSignature:
+        return False
+    return True
+
+
+def is_monkey_patched() -> bool:
+    """Whether gevent or eventlet replaced the threads with greenlets."""
+    gevent_monkey: Any = sys.modules.get("gevent.monkey")
+    if gevent_monkey is not None and gevent_monkey.is_module_patched("threading"):
+        return True
+    eventlet_patcher: Any = sys.modules.get("eventlet.patcher")
+    return eventlet_patcher is not None and eventlet_patcher.is_monkey_patched("thread")
+
+
+def collapse_stack(frame) -> str:
+    """Frames from the outermost to ``frame``, in the collapsed stack format."""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class ProfileSession:
+    def __init__(self, thread_id: int, triggered: bool, threshold: float):
+        self.thread_id = thread_id
+        self.triggered = triggered
+        self.start_time = time.perf_counter()
+        # Requests are sampled once they are slower than the threshold
+        self.sample_from = self.start_time + (0 if triggered else threshold)
+        self.stacks: Counter = Counter()
+
+    def to_collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class SamplingProfiler:
+    """Samples the stack of profiled requests from a single background thread.
+
+    A request is profiled when it carries a valid signed ``PROFILE_HEADER``
+    (see :func:`create_profile_token`) or, with ``PROFILE_THRESHOLD_MS`` set,
+    once it runs longer than the threshold. The samples are written to
+    ``PROFILE_DIR`` in the collapsed stack format read by flamegraph.pl and
+    speedscope. Requests that are not profiled only register their thread.
+
+    Greenlets of gevent / eventlet workers all run in one thread, the frames
+    of the sampler cannot be told apart per request there. Requests are not
+    profiled in green workers, which is logged once per worker.
+    """
+
+    def __init__(self):
+        self.interval = 0.005
+        self.sessions: Dict[int, ProfileSession] = {}
+        self.green_warning_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._setup_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def _ensure_thread(self):
+        # Threads do not survive a fork and the green workers patch threading
+        # after the import, the primitives and the thread are per process
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._setup_lock:
+            if self._thread_pid == pid:
+                return
+            self._lock = threading.Lock()
+            self._wakeup = threading.Event()
+            self.sessions = {}
+            thread = threading.Thread(
+                target=self._run, name="sampling-profiler", daemon=True
+            )
+            self._thread = thread
+            self._thread_pid = pid
+        # Never with a lock held, starting may switch to the new thread
+        thread.start()
+
+    def start(self, triggered: bool, threshold: float) -> ProfileSession:
+        self._ensure_thread()
+        thread_id = threading.get_ident()
+        session = ProfileSession(thread_id, triggered, threshold)
+        with self._lock:
+            self.sessions[thread_id] = session
+        self._wakeup.set()
+        return session
+
+    def stop(self, session: ProfileSession):
+        with self._lock:
+            if self.sessions.get(session.thread_id) is session:
+                del self.sessions[session.thread_id]
+
+    def sample(self) -> Optional[float]:
+        """Sample the due sessions, returns the seconds until the next sample."""
+        now = time.perf_counter()
+        with self._lock:
+            sessions = list(self.sessions.values())
+        if not sessions:
+            return None
+        frames = sys._current_frames()
+        next_sample = None
+        for session in sessions:
+            if session.sample_from > now:
+                wait = session.sample_from - now
+            else:
+                frame = frames.get(session.thread_id)
+                if frame is not None:
+                    session.stacks[collapse_stack(frame)] += 1
+                wait = self.interval
+            next_sample = wait if next_sample is None else min(next_sample, wait)
+        return next_sample
+
+    def _run(self):
+        while True:
+            timeout = self.sample()
+            # Sleep until a request starts when nothing is being profiled
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+
+profiler = SamplingProfiler()
+
+
+def start_request_profile() -> bool:
+    """Profile the current request if it is triggered or may become slow."""
+    config = current_app.config
+    threshold_ms = config["PROFILE_THRESHOLD_MS"]
+    token = request.headers.get(config["PROFILE_HEADER"])
+    triggered = token is not None and is_valid_profile_token(current_app, token)
+    if not triggered and not threshold_ms:
+        return False
+    if is_monkey_patched():
+        if profiler.green_warning_pid != os.getpid():
+            profiler.green_warning_pid = os.getpid()
+            current_app.logger.warning("Requests are not profiled in green workers")
+        return False
+    profiler.interval = config["PROFILE_INTERVAL_MS"] / 1000
+    g.profile_session = profiler.start(triggered, (threshold_ms or 0) / 1000)
+    return True
+
+
+def finish_request_profile(response):
+    session = getattr(g, "profile_session", None)
+    if session is None:
+        return response
+    g.profile_session = None
+    profiler.stop(session)
+    if not session.stacks:
+        return response
+
+    directory = current_app.config["PROFILE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    endpoint = (request.endpoint or "unmatched").replace(":", "-")
+    timestamp = dt.now().strftime("%Y%m%dT%H%M%S")
+    request_id = getattr(g, "request_id", os.getpid())
+    filename = f"{timestamp}-{request.method}-{endpoint}-{request_id}.collapsed"
+    path = os.path.join(directory, filename)
+    with open(path, "w") as collapsed_file:
+        collapsed_file.write(session.to_collapsed())
+    elapsed_ms = (time.perf_counter() - session.start_time) * 1000
+    current_app.logger.info(
+        f"Profiled {request.method} {request.path} ({elapsed_ms:.0f} ms): {path}"
+    )
+    if session.triggered:
+        response.headers["X-Profile-File"] = filename
+    return response
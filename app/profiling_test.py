@@ -0,0 +1,147 @@
+# Standard library imports
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+# Third party imports
+from flask import Flask
+
+# Local application imports
+from app.profiling import (
+    SamplingProfiler,
+    collapse_stack,
+    create_profile_token,
+    is_monkey_patched,
+    is_valid_profile_token,
+)
+
+
+def test_profile_token(app):
+    token = create_profile_token(app)
+    assert is_valid_profile_token(app, token) is True
+    assert is_valid_profile_token(app, token + "x") is False
+    assert is_valid_profile_token(app, "foo") is False
+
+    other_app = Flask(__name__)
+    other_app.config.update(SECRET_KEY="other", PROFILE_TOKEN_MAX_AGE=60)
+    assert is_valid_profile_token(other_app, token) is False
+
+
+def test_collapse_stack():
+    def inner():
+        return collapse_stack(sys._getframe())
+
+    stack = inner().split(";")
+    assert stack[-1].startswith(f"inner ({__file__}:")
+    assert stack[-2].startswith("test_collapse_stack (")
+
+
+def test_sampling_profiler():
+    profiler = SamplingProfiler()
+    profiler.interval = 0.001
+    assert profiler.sample() is None
+
+    slow = profiler.start(triggered=False, threshold=60)
+    # Not due before the threshold
+    assert 59 < profiler.sample() <= 60
+    assert not slow.stacks
+    profiler.stop(slow)
+
+    session = profiler.start(triggered=True, threshold=60)
+    deadline = time.monotonic() + 0.1
+    while time.monotonic() < deadline:
+        pass
+    profiler.stop(session)
+    assert profiler.sessions == {}
+    assert sum(session.stacks.values()) > 10
+    assert all("test_sampling_profiler" in stack for stack in session.stacks)
+    assert session.to_collapsed().endswith("\n")
+    assert profiler._thread.name == "sampling-profiler"
+    assert profiler._thread in threading.enumerate()
+
+
+def get_profiles(directory):
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def test_request_profile(app, tmpdir, monkeypatch):
+    app.config["PROFILE_DIR"] = str(tmpdir.join("profiles"))
+    app.config["PROFILE_INTERVAL_MS"] = 1
+    client = app.test_client()
+
+    # Slow down the request so it is sampled
+    def slow_get_by_id(self, id):
+        deadline = time.monotonic() + 0.05
+        while time.monotonic() < deadline:
+            pass
+
+    monkeypatch.setattr("app.api.service.BaseService.get_by_id", slow_get_by_id)
+
+    # Not profiled
+    response = client.get("/api/book/1", headers={"X-Profile": "foo"})
+    assert response.status_code == 404
+    assert get_profiles(app.config["PROFILE_DIR"]) == []
+
+    # Signed header
+    token = create_profile_token(app)
+    response = client.get("/api/book/1", headers={"X-Profile": token})
+    assert response.status_code == 404
+    filename = response.headers["X-Profile-File"]
+    assert get_profiles(app.config["PROFILE_DIR"]) == [filename]
+    with open(os.path.join(app.config["PROFILE_DIR"], filename)) as collapsed_file:
+        stacks = collapsed_file.read()
+    assert "slow_get_by_id" in stacks
+    os.remove(os.path.join(app.config["PROFILE_DIR"], filename))
+
+    # Slower than the threshold
+    app.config["PROFILE_THRESHOLD_MS"] = 10
+    response = client.get("/api/book/1")
+    assert "X-Profile-File" not in response.headers
+    assert len(get_profiles(app.config["PROFILE_DIR"])) == 1
+
+
+def test_profiler_in_green_worker():
+    # The profiler of the prefork master is created before the worker patches
+    # threading, patching the test process would leak into the other tests
+    script = textwrap.dedent(
+        """
+        import time
+        from flask import Flask
+        from app.profiling import create_profile_token, profiler
+        from app.profiling import start_request_profile
+
+        from gevent import monkey
+        monkey.patch_all()
+        import gevent
+
+        session = profiler.start(triggered=True, threshold=0)
+        deadline = time.monotonic() + 0.05
+        while time.monotonic() < deadline:
+            gevent.sleep(0.001)
+        profiler.stop(session)
+        print("sampler", profiler._thread.is_alive())
+
+        app = Flask(__name__)
+        app.config.update(
+            SECRET_KEY="secret",
+            PROFILE_HEADER="X-Profile",
+            PROFILE_TOKEN_MAX_AGE=60,
+            PROFILE_THRESHOLD_MS=0,
+        )
+        headers = {"X-Profile": create_profile_token(app)}
+        with app.test_request_context(headers=headers):
+            print("profiled", start_request_profile())
+        """
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        stdout=subprocess.PIPE,
+        check=True,
+        timeout=30,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.stdout.decode().split("\n")[:2] == ["sampler True", "profiled False"]
+    assert is_monkey_patched() is False
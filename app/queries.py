@@ -0,0 +1,167 @@
+# Standard library imports
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Third party imports
+from flask import Flask, current_app, g, request
+from flask.globals import _request_ctx_stack
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+
+class QueryStats:
+    """Statements executed while recording, with their total duration.
+
+    Statements are compared on their SQL text, the parameters are bound
+    separately, so the same statement executed again and again for different
+    rows (the N+1 pattern) shows up in ``duplicates``.
+    """
+
+    def __init__(self, capture: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+        # (engine, statement, parameters, seconds) of every query, for EXPLAIN
+        self.queries: Optional[list] = [] if capture else None
+
+    def record(self, statement: str, seconds: float, engine=None, parameters=None):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+        if self.queries is not None and engine is not None:
+            self.queries.append((engine, statement, parameters, seconds))
+
+    @property
+    def duplicates(self) -> Dict[str, int]:
+        return {s: n for s, n in self.statements.most_common() if n > 1}
+
+    @property
+    def duplicate_count(self) -> int:
+        return sum(n - 1 for n in self.statements.values())
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+
+def _recorders() -> List[QueryStats]:
+    recorders = getattr(_local, "recorders", None)
+    if recorders is None:
+        recorders = _local.recorders = []
+    return recorders
+
+
+def _before_cursor_execute(conn, cursor, statement, params, context, many):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, params, context, many):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    seconds = time.perf_counter() - start_times.pop()
+    request_stats = get_request_stats()
+    if request_stats is not None:
+        if many:
+            request_stats.record(statement, seconds)
+        else:
+            request_stats.record(statement, seconds, conn.engine, params)
+    for recorder in _recorders():
+        recorder.record(statement, seconds)
+
+
+def install_listeners():
+    """Record the statements of every engine (once per process)."""
+    if not event.contains(Engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def get_request_stats() -> Optional[QueryStats]:
+    if _request_ctx_stack.top is None:
+        return None
+    return getattr(g, "query_stats", None)
+
+
+@contextmanager
+def count_queries():
+    """Record the statements executed by the current thread within the block."""
+    install_listeners()
+    stats = QueryStats()
+    recorders = _recorders()
+    recorders.append(stats)
+    try:
+        yield stats
+    finally:
+        recorders.remove(stats)
+
+
+class QueryCounter:
+    """Counts the statements of every request and enforces query budgets.
+
+    Requests that execute more than ``QUERY_BUDGET_COUNT`` statements, spend
+    more than ``QUERY_BUDGET_MS`` in the database or repeat statements more than
+    ``QUERY_BUDGET_DUPLICATES`` times are logged as warnings. With
+    ``QUERY_DEBUG_HEADERS`` the numbers are added to the response headers.
+    """
+
+    def __init__(self, app: Optional[Flask] = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask):
+        app.config.setdefault("QUERY_DEBUG_HEADERS", False)
+        app.config.setdefault("QUERY_BUDGET_COUNT", 20)
+        app.config.setdefault("QUERY_BUDGET_MS", 500)
+        app.config.setdefault("QUERY_BUDGET_DUPLICATES", 5)
+        if "query_counter" in app.extensions:
+            return
+
+        install_listeners()
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions["query_counter"] = self
+
+    @staticmethod
+    def _start_request():
+        # Local application imports
+        from app.explain import should_capture_queries
+
+        g.query_stats = QueryStats(capture=should_capture_queries())
+
+    def _finish_request(self, response):
+        stats = get_request_stats()
+        if stats is None:
+            return response
+        g.query_stats = None
+
+        config = current_app.config
+        if config["QUERY_DEBUG_HEADERS"]:
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Query-Time-Ms"] = f"{stats.milliseconds:.2f}"
+            response.headers["X-DB-Duplicate-Queries"] = str(stats.duplicate_count)
+        self.check_budget(stats)
+        return response
+
+    @staticmethod
+    def check_budget(stats: QueryStats) -> List[str]:
+        config = current_app.config
+        violations = []
+        if stats.count > config["QUERY_BUDGET_COUNT"]:
+            violations.append(f"{stats.count} queries")
+        if stats.milliseconds > config["QUERY_BUDGET_MS"]:
+            violations.append(f"{stats.milliseconds:.0f} ms in the database")
+        if stats.duplicate_count > config["QUERY_BUDGET_DUPLICATES"]:
+            statement, times = next(iter(stats.duplicates.items()))
+            violations.append(f"possible N+1, executed {times} times: {statement}")
+        if violations:
+            current_app.logger.warning(
+                f"Query budget exceeded by {request.method} {request.path}: "
+                + "; ".join(violations)
+            )
+        return violations
@@ -0,0 +1,104 @@
+# Standard library imports
+import logging
+
+# Third party imports
+from sqlalchemy import text
+
+# Local application imports
+from app.queries import QueryStats, count_queries
+
+
+def test_query_stats():
+    stats = QueryStats()
+    stats.record("SELECT 1", 0.001)
+    stats.record("SELECT 2", 0.002)
+    stats.record("SELECT 2", 0.003)
+    stats.record("SELECT 2", 0.004)
+    assert stats.count == 4
+    assert round(stats.milliseconds) == 10
+    assert stats.duplicates == {"SELECT 2": 3}
+    assert stats.duplicate_count == 2
+
+
+def test_count_queries(app, db):
+    with app.app_context():
+        with count_queries() as outer:
+            db.session.execute(text("SELECT 1"))
+            with count_queries() as inner:
+                db.session.execute(text("SELECT 2"))
+        db.session.execute(text("SELECT 3"))
+        db.session.rollback()
+
+    assert list(outer.statements) == ["SELECT 1", "SELECT 2"]
+    assert list(inner.statements) == ["SELECT 2"]
+    assert outer.seconds > 0
+
+
+def create_books(app, number):
+    # Local application imports
+    from app.api.book import Book
+
+    with app.app_context():
+        return [Book.create(title=f"book {i}").id for i in range(number)]
+
+
+def test_api_query_count(app, db, assert_num_queries):
+    book_ids = create_books(app, 3)
+    client = app.test_client()
+
+    with assert_num_queries(1):
+        assert client.get(f"/api/book/{book_ids[0]}").status_code == 200
+
+    # Total count, page count and the page itself, whatever the page size
+    with assert_num_queries(3):
+        assert client.get("/api/book?pageIndex=1&itemsPerPage=3").status_code == 200
+    create_books(app, 5)
+    with assert_num_queries(3):
+        assert client.get("/api/book?pageIndex=1&itemsPerPage=8").status_code == 200
+
+    # Writes return the row, serializing it after the commit takes no SELECT
+    with assert_num_queries(1) as stats:
+        response = client.post("/api/book", json=dict(title="new"))
+    assert response.get_json()["data"]["title"] == "new"
+    assert "RETURNING" in next(iter(stats.statements))
+    with assert_num_queries(1) as stats:
+        response = client.put(f"/api/book/{book_ids[0]}", json=dict(title="renamed"))
+    assert response.get_json()["data"] == dict(id=book_ids[0], title="renamed")
+    assert "RETURNING" in next(iter(stats.statements))
+    with assert_num_queries(1):
+        assert client.put("/api/book/0", json=dict(title="x")).status_code == 404
+
+    # The requests shared the app context (and session) of the db fixture
+    db.session.remove()
+
+
+def test_debug_headers_and_budget(app, db, caplog):
+    book_id = create_books(app, 1)[0]
+    app.config["QUERY_DEBUG_HEADERS"] = True
+    client = app.test_client()
+
+    response = client.get(f"/api/book/{book_id}")
+    assert response.headers["X-DB-Query-Count"] == "1"
+    assert float(response.headers["X-DB-Query-Time-Ms"]) > 0
+    assert response.headers["X-DB-Duplicate-Queries"] == "0"
+
+    app.config["QUERY_BUDGET_COUNT"] = 0
+    app.config["QUERY_DEBUG_HEADERS"] = False
+    with caplog.at_level(logging.WARNING):
+        response = client.get(f"/api/book/{book_id}")
+    assert "X-DB-Query-Count" not in response.headers
+    assert f"GET /api/book/{book_id}: 1 queries" in caplog.text
+    db.session.remove()
+
+
+def test_n_plus_one_detection(app):
+    app.config["QUERY_BUDGET_DUPLICATES"] = 1
+    stats = QueryStats()
+    for _ in range(3):
+        stats.record("SELECT * FROM author WHERE id = %(id)s", 0)
+
+    with app.test_request_context("/api/book"):
+        violations = app.extensions["query_counter"].check_budget(stats)
+    assert violations == [
+        "possible N+1, executed 3 times: SELECT * FROM author WHERE id = %(id)s"
+    ]
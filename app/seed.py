@@ -0,0 +1,142 @@
+"""Parallel seeding of the models of the registered APIs.
+
+Models opt in with a ``fake_row(fake)`` classmethod returning the column
+values of one row. Rows are generated in chunks across a process pool, every
+worker loads its chunks over its own connection with ``COPY FROM STDIN`` on
+PostgreSQL or batched multi-row INSERTs elsewhere.
+"""
+# Standard library imports
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Optional
+
+# Third party imports
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+# Local application imports
+from app.api import APIS, load_api
+from app.bulk import get_load_method
+
+_engines: Dict[str, Engine] = {}
+
+
+def get_seedable_models() -> list:
+    """Models of the registered APIs that define ``fake_row``."""
+    models = []
+    for path in APIS:
+        model = getattr(load_api(path), "model", None)
+        if model is not None and hasattr(model, "fake_row"):
+            models.append(model)
+    return models
+
+
+def model_path(model) -> str:
+    return f"{model.__module__}:{model.__name__}"
+
+
+def generate_rows(model, fake, count: int, rng: random.Random, pool_size: int):
+    """``count`` rows of fake column values.
+
+    Faker is slow (tens of microseconds per sentence), with a ``pool_size``
+    only that many rows are generated by Faker and every column of a row is
+    drawn from the pool independently, which keeps the values realistic at a
+    fraction of the cost. A ``pool_size`` of 0 calls Faker for every row.
+    """
+    if not pool_size or pool_size >= count:
+        return [model.fake_row(fake) for _ in range(count)]
+    pool = [model.fake_row(fake) for _ in range(pool_size)]
+    columns = {key: [row[key] for row in pool] for key in pool[0]}
+    return [
+        {key: rng.choice(values) for key, values in columns.items()}
+        for _ in range(count)
+    ]
+
+
+def _get_engine(database_uri: str) -> Engine:
+    # One connection at a time per worker process
+    engine = _engines.get(database_uri)
+    if engine is None:
+        engine = _engines[database_uri] = create_engine(
+            database_uri, poolclass=NullPool
+        )
+    return engine
+
+
+def seed_chunk(
+    path: str, database_uri: str, method: str, count: int, seed: int, pool_size: int
+) -> int:
+    """Generate and load ``count`` rows, runs in the worker processes."""
+    # Third party imports
+    from faker import Faker
+
+    model = load_api(path)
+    fake = Faker()
+    fake.seed_instance(seed)
+    rows = generate_rows(model, fake, count, random.Random(seed), pool_size)
+
+    engine = _get_engine(database_uri)
+    load = get_load_method(engine, method)
+    with engine.begin() as connection:
+        load(connection, model.__table__, rows)
+    return count
+
+
+def seed_model(
+    model,
+    count: int,
+    database_uri: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 10000,
+    method: str = "auto",
+    seed: Optional[int] = None,
+    pool_size: int = 1000,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """Insert ``count`` fake rows of ``model``, in parallel with ``workers``.
+
+    Every chunk commits on its own, an interrupted run keeps the chunks that
+    completed. A ``seed`` makes the generated values reproducible.
+    """
+    assert count >= 0 and chunk_size > 0
+    workers = workers or os.cpu_count() or 1
+    seed = random.randrange(2 ** 32) if seed is None else seed
+    path = model_path(model)
+    chunks = [
+        (path, database_uri, method, min(chunk_size, count - start), seed + start)
+        for start in range(0, count, chunk_size)
+    ]
+
+    start_time = time.perf_counter()
+    done = 0
+    if workers == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            done += seed_chunk(*chunk, pool_size)
+            if progress is not None:
+                progress(done, count)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(seed_chunk, *chunk, pool_size) for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                done += future.result()
+                if progress is not None:
+                    progress(done, count)
+
+    engine = _get_engine(database_uri)
+    if done and engine.dialect.name == "postgresql":
+        # Fresh statistics for the query planner
+        with engine.connect() as connection:
+            table = engine.dialect.identifier_preparer.format_table(model.__table__)
+            connection.execute(f"ANALYZE {table}")
+    seconds = time.perf_counter() - start_time
+    return dict(
+        model=model.__name__,
+        rows=done,
+        seconds=round(seconds, 3),
+        rows_per_second=round(done / seconds) if seconds else 0,
+    )
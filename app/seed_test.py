@@ -0,0 +1,65 @@
+# Standard library imports
+import random
+
+# Third party imports
+from faker import Faker
+from sqlalchemy import create_engine
+
+# Local application imports
+from app.api.book import Book
+from app.seed import generate_rows, get_seedable_models, seed_model
+
+
+def test_get_seedable_models():
+    assert get_seedable_models() == [Book]
+
+
+def test_generate_rows():
+    fake = Faker()
+    fake.seed_instance(1)
+    rows = generate_rows(Book, fake, 100, random.Random(1), pool_size=10)
+    assert len(rows) == 100
+    assert all(set(row) == {"title"} for row in rows)
+    assert len({row["title"] for row in rows}) <= 10
+
+    # Reproducible with the same seeds, Faker for every row without a pool
+    def fake_rows(pool_size):
+        fake.seed_instance(2)
+        return generate_rows(Book, fake, 20, random.Random(2), pool_size)
+
+    assert fake_rows(5) == fake_rows(5)
+    assert len({row["title"] for row in fake_rows(0)}) > 5
+
+
+def test_seed_model_insert(tmpdir):
+    database_uri = f"sqlite:///{tmpdir.join('seed.db')}"
+    engine = create_engine(database_uri)
+    Book.__table__.create(engine)
+    progress = []
+
+    result = seed_model(
+        Book,
+        250,
+        database_uri,
+        workers=2,
+        chunk_size=100,
+        seed=1,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+    assert result["model"] == "Book" and result["rows"] == 250
+    assert sorted(progress)[-1] == (250, 250) and len(progress) == 3
+    assert engine.execute("SELECT count(*) FROM book").scalar() == 250
+    engine.dispose()
+
+
+def test_seed_model_copy(app, db):
+    # Forked workers must not share the connections of the app
+    db.session.remove()
+    db.engine.dispose()
+    database_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    result = seed_model(Book, 2500, database_uri, workers=2, chunk_size=1000, seed=1)
+    assert result["rows"] == 2500
+    assert Book.query.count() == 2500
+    assert Book.query.filter(Book.title.is_(None)).count() == 0
+    db.session.remove()
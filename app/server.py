@@ -0,0 +1,329 @@
+# Standard library imports
+import gc
+import logging
+import os
+import random
+import resource
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+# Third party imports
+from flask import Flask
+from werkzeug.serving import BaseWSGIServer
+
+# Local application imports
+from app.capture import recorder as traffic_recorder
+from app.metrics import clear_multiprocess_dir
+
+logger = logging.getLogger(__name__)
+
+WORKER_CLASSES = {
+    "sync": "Worker",
+    "gevent": "GeventWorker",
+    "eventlet": "EventletWorker",
+}
+
+
+def dispose_engines(app: Flask):
+    """Drop pooled connections so that no socket is shared between processes."""
+    # Third party imports
+    from flask_sqlalchemy import get_state
+
+    for connector in get_state(app).connectors.values():
+        engine = connector._engine
+        if engine is not None:
+            engine.dispose()
+
+
+def get_memory_mb() -> float:
+    """Resident set size of the current process in megabytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        # Peak instead of current usage (in kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class WorkerWSGIServer(BaseWSGIServer):
+    multiprocess = True
+    handled_requests = 0
+
+    def finish_request(self, request, client_address):
+        super().finish_request(request, client_address)
+        self.handled_requests += 1
+
+
+class Worker:
+    """Serves requests from the listening socket shared with the master.
+
+    The worker stops accepting new connections after ``max_requests`` requests,
+    when its memory exceeds ``max_memory_mb`` or on SIGTERM, finishing the
+    request it is handling so that no connection is dropped.
+    """
+
+    timeout = 1.0
+
+    def __init__(
+        self,
+        app: Flask,
+        listener: socket.socket,
+        max_requests: int = 0,
+        max_memory_mb: int = 0,
+        worker_connections: int = 1,
+        graceful_timeout: int = 30,
+    ):
+        self.app = app
+        self.listener = listener
+        self.max_requests = max_requests
+        self.max_memory_mb = max_memory_mb
+        self.worker_connections = worker_connections
+        self.graceful_timeout = graceful_timeout
+        self.alive = True
+        self.ppid = os.getppid()
+
+    def _stop(self, signum, frame):
+        self.alive = False
+
+    def _should_recycle(self, handled_requests: int) -> bool:
+        if os.getppid() != self.ppid:
+            logger.info(f"Worker {os.getpid()} lost its master")
+            return True
+        if self.max_requests and handled_requests >= self.max_requests:
+            logger.info(f"Worker {os.getpid()} reached {self.max_requests} requests")
+            return True
+        if self.max_memory_mb and get_memory_mb() > self.max_memory_mb:
+            logger.info(f"Worker {os.getpid()} exceeded {self.max_memory_mb} MB")
+            return True
+        return False
+
+    def init_process(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_DFL)
+        signal.signal(signal.SIGQUIT, signal.SIG_DFL)
+        dispose_engines(self.app)
+
+    def warm_up(self):
+        """Fill the connection pools before accepting requests."""
+        health = self.app.extensions.get("health")
+        if health is not None:
+            health.warm_up(self.app)
+
+    def run(self):
+        self.init_process()
+        self.warm_up()
+        host, port = self.listener.getsockname()[:2]
+        server = WorkerWSGIServer(host, port, self.app, fd=self.listener.fileno())
+        server.timeout = self.timeout
+        while self.alive and not self._should_recycle(server.handled_requests):
+            server.handle_request()
+
+
+def get_worker_class(name: str) -> type:
+    assert name in WORKER_CLASSES, f"Unknown worker class: {name}"
+    if name == "sync":
+        return Worker
+
+    # Local application imports
+    from app import green
+
+    return getattr(green, WORKER_CLASSES[name])
+
+
+class PreforkServer:
+    """Pre-forking HTTP server for production.
+
+    The application is created once in the master and the heap is frozen
+    (``gc.freeze``) before forking, so the workers share its pages
+    copy-on-write. Signals sent to the master:
+
+    - SIGHUP: graceful reload, new workers are started from a freshly created
+      application before the old ones finish their requests and exit.
+    - SIGTERM, SIGINT: graceful shutdown within ``graceful_timeout`` seconds.
+
+    ``worker_class`` selects sync workers (one request at a time) or gevent /
+    eventlet workers serving up to ``worker_connections`` requests each.
+    """
+
+    poll_interval = 0.5
+
+    def __init__(
+        self,
+        app_factory: Callable[[], Flask],
+        host: str = "0.0.0.0",
+        port: int = 5050,
+        workers: int = 4,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        max_memory_mb: int = 0,
+        graceful_timeout: int = 30,
+        backlog: int = 2048,
+        worker_class: str = "sync",
+        worker_connections: int = 1000,
+    ):
+        assert callable(app_factory)
+        assert worker_class in WORKER_CLASSES
+        assert isinstance(workers, int) and workers > 0
+        self.app_factory = app_factory
+        self.host = host
+        self.port = int(port)
+        self.num_workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_memory_mb = max_memory_mb
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.worker_class = worker_class
+        self.worker_connections = worker_connections
+        self.app: Optional[Flask] = None
+        self.listener: Optional[socket.socket] = None
+        self.workers: Dict[int, int] = {}
+        self.generation = 0
+        self.alive = True
+        self.reload_requested = False
+
+    @classmethod
+    def from_config(cls, app_factory: Callable[[], Flask], config, **kwargs):
+        options = dict(
+            host=config["HOST"],
+            port=config["PORT"],
+            workers=config["SERVER_WORKERS"],
+            max_requests=config["SERVER_MAX_REQUESTS"],
+            max_requests_jitter=config["SERVER_MAX_REQUESTS_JITTER"],
+            max_memory_mb=config["SERVER_MAX_MEMORY_MB"],
+            graceful_timeout=config["SERVER_GRACEFUL_TIMEOUT"],
+            backlog=config["SERVER_BACKLOG"],
+            worker_class=config["SERVER_WORKER_CLASS"],
+            worker_connections=config["SERVER_WORKER_CONNECTIONS"],
+        )
+        options.update({k: v for k, v in kwargs.items() if v is not None})
+        return cls(app_factory, **options)
+
+    def bind(self) -> socket.socket:
+        if self.listener is None:
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((self.host, self.port))
+            listener.listen(self.backlog)
+            # Idle workers woken for the same connection must not block in accept
+            listener.setblocking(False)
+            self.listener = listener
+            self.port = listener.getsockname()[1]
+        return self.listener
+
+    def load_app(self) -> Flask:
+        app = self.app_factory()
+        dispose_engines(app)
+        gc.collect()
+        # Python 3.7+, missing from the typeshed stubs of the pinned mypy
+        gc.freeze()  # type: ignore[attr-defined]
+        return app
+
+    def _worker_max_requests(self) -> int:
+        if not self.max_requests:
+            return 0
+        return self.max_requests + random.randint(0, self.max_requests_jitter)
+
+    def spawn_worker(self):
+        assert self.app is not None and self.listener is not None
+        pid = os.fork()
+        if pid != 0:
+            self.workers[pid] = self.generation
+            return
+
+        # Worker process
+        exit_code = 0
+        try:
+            worker_class = get_worker_class(self.worker_class)
+            worker_class(
+                self.app,
+                self.listener,
+                max_requests=self._worker_max_requests(),
+                max_memory_mb=self.max_memory_mb,
+                worker_connections=self.worker_connections,
+                graceful_timeout=self.graceful_timeout,
+            ).run()
+        except Exception:
+            logger.exception(f"Worker {os.getpid()} crashed")
+            exit_code = 1
+        finally:
+            # os._exit skips the atexit handlers
+            traffic_recorder.flush()
+            os._exit(exit_code)
+
+    def spawn_workers(self):
+        current = [p for p, gen in self.workers.items() if gen == self.generation]
+        for _ in range(self.num_workers - len(current)):
+            self.spawn_worker()
+
+    def stop_workers(self, generation: Optional[int] = None, sig=signal.SIGTERM):
+        for pid, worker_generation in list(self.workers.items()):
+            if generation is None or worker_generation == generation:
+                try:
+                    os.kill(pid, sig)
+                except ProcessLookupError:
+                    self.workers.pop(pid, None)
+
+    def reap_workers(self):
+        while self.workers:
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+
+    def reload(self):
+        self.reload_requested = False
+        logger.info("Reloading workers")
+        old_generation = self.generation
+        self.generation += 1
+        # Let the previous application be collected
+        gc.unfreeze()
+        self.app = self.load_app()
+        self.spawn_workers()
+        self.stop_workers(generation=old_generation)
+
+    def _handle_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _handle_stop(self, signum, frame):
+        self.alive = False
+
+    def shutdown(self):
+        self.stop_workers()
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(self.poll_interval / 5)
+        self.stop_workers(sig=signal.SIGKILL)
+        self.reap_workers()
+        if self.listener is not None:
+            self.listener.close()
+
+    def run(self):
+        self.bind()
+        self.app = self.load_app()
+        clear_multiprocess_dir()
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        logger.info(
+            f"Serving on {self.host}:{self.port} with {self.num_workers} workers"
+        )
+
+        try:
+            while self.alive:
+                if self.reload_requested:
+                    self.reload()
+                self.reap_workers()
+                self.spawn_workers()
+                time.sleep(self.poll_interval)
+        finally:
+            self.shutdown()
@@ -0,0 +1,106 @@
+# Standard library imports
+import os
+import signal
+import time
+from urllib.request import urlopen
+
+# Third party imports
+import pytest
+from flask import Flask
+
+# Local application imports
+from app.config import TestConfig
+from app.server import PreforkServer, Worker, get_memory_mb
+
+
+def create_dummy_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    @app.route("/")
+    def pid():
+        return str(os.getpid())
+
+    # Local application imports
+    from app.extensions import db
+
+    db.init_app(app)
+    return app
+
+
+def test_get_memory_mb():
+    assert get_memory_mb() > 0
+
+
+def test_from_config():
+    config = {k: getattr(TestConfig, k) for k in dir(TestConfig)}
+    server = PreforkServer.from_config(create_dummy_app, config, workers=2)
+    assert server.num_workers == 2
+    assert server.port == int(TestConfig.PORT)
+    assert server.max_requests == TestConfig.SERVER_MAX_REQUESTS
+
+    with pytest.raises(AssertionError):
+        PreforkServer(create_dummy_app, workers=0)
+
+
+def test_worker_max_requests():
+    server = PreforkServer(create_dummy_app, max_requests=0, max_requests_jitter=5)
+    assert server._worker_max_requests() == 0
+
+    server = PreforkServer(create_dummy_app, max_requests=10, max_requests_jitter=5)
+    assert all(10 <= server._worker_max_requests() <= 15 for _ in range(10))
+
+
+def test_worker_should_recycle(monkeypatch):
+    worker = Worker(create_dummy_app(), None, max_requests=2, max_memory_mb=100)
+
+    monkeypatch.setattr("app.server.get_memory_mb", lambda: 50)
+    assert worker._should_recycle(0) is False
+    assert worker._should_recycle(2) is True
+
+    monkeypatch.setattr("app.server.get_memory_mb", lambda: 150)
+    assert worker._should_recycle(0) is True
+
+    monkeypatch.setattr("os.getppid", lambda: -1)
+    assert worker._should_recycle(0) is True
+
+
+def _get(port):
+    with urlopen(f"http://127.0.0.1:{port}/", timeout=10) as response:
+        return int(response.read())
+
+
+def test_prefork_server():
+    server = PreforkServer(create_dummy_app, host="127.0.0.1", port=0, workers=2)
+    server.max_requests = 2
+    server.poll_interval = 0.05
+    port = server.bind().getsockname()[1]
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            server.run()
+        finally:
+            os._exit(0)
+
+    try:
+        # Workers are recycled after two requests each
+        worker_pids = {_get(port) for _ in range(8)}
+        assert len(worker_pids) > 2
+        assert pid not in worker_pids
+
+        # Graceful reload keeps serving
+        os.kill(pid, signal.SIGHUP)
+        for _ in range(8):
+            assert _get(port) not in worker_pids
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                break
+            time.sleep(0.05)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            pytest.fail("Server did not shut down")
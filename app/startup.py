@@ -0,0 +1,121 @@
+# Standard library imports
+import importlib.abc
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+
+class _TimingLoader:
+    """Wraps a module loader to measure the time spent executing the module."""
+
+    def __init__(self, loader, profiler: "StartupProfiler", name: str):
+        self._loader = loader
+        self._profiler = profiler
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler.measure_import(self._name):
+            self._loader.exec_module(module)
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if isinstance(finder, _TimingFinder):
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            spec = find_spec and find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimingLoader(spec.loader, self._profiler, fullname)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """Import-time and create_app phase breakdown, enabled by APP_STARTUP_PROFILE.
+
+    Only modules imported after ``app.startup`` are measured, Flask itself is
+    imported before; use ``python -X importtime`` for the complete tree.
+    """
+
+    def __init__(self, enabled: bool = False, top: int = 25):
+        self.enabled = enabled
+        self.top = top
+        self.started_at = time.perf_counter()
+        self.imports: Dict[str, Tuple[float, float]] = {}
+        self.phases: List[Tuple[str, float]] = []
+        self._stack: List[float] = []
+        self._finder: Optional[_TimingFinder] = None
+        if enabled:
+            self.start()
+
+    def start(self):
+        if self._finder is None:
+            self._finder = _TimingFinder(self)
+            sys.meta_path.insert(0, self._finder)
+
+    def stop(self):
+        if self._finder is not None:
+            sys.meta_path.remove(self._finder)
+            self._finder = None
+
+    @contextmanager
+    def measure_import(self, name: str):
+        # Self time excludes the nested imports, like -X importtime
+        self._stack.append(0.0)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - start_time
+            nested = self._stack.pop()
+            self.imports[name] = (total - nested, total)
+            if self._stack:
+                self._stack[-1] += total
+
+    @contextmanager
+    def phase(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.phases.append((name, time.perf_counter() - start_time))
+
+    def report(self) -> List[str]:
+        lines = [f"Startup profile ({self.elapsed_ms():.1f} ms since app.startup)"]
+        lines.append("Phases (ms):")
+        for name, duration in self.phases:
+            lines.append(f"  {duration * 1000:8.1f}  {name}")
+        lines.append(f"Slowest imports, self / cumulative (ms), top {self.top}:")
+        imports = sorted(self.imports.items(), key=lambda i: i[1][0], reverse=True)
+        for name, (self_time, total) in imports[: self.top]:
+            lines.append(f"  {self_time * 1000:8.1f} {total * 1000:8.1f}  {name}")
+        return lines
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def print_report(self):
+        if self.enabled:
+            print("\n".join(self.report()), file=sys.stderr)
+
+
+def _is_enabled(value: Optional[str]) -> bool:
+    return value is not None and value.lower() not in ("", "0", "false")
+
+
+profiler = StartupProfiler(enabled=_is_enabled(os.environ.get("APP_STARTUP_PROFILE")))
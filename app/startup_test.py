@@ -0,0 +1,55 @@
+# Standard library imports
+import sys
+
+# Third party imports
+import pytest
+
+# Local application imports
+from app.startup import StartupProfiler, _is_enabled
+
+
+def test_is_enabled():
+    assert _is_enabled("1") is True
+    assert _is_enabled("true") is True
+    assert _is_enabled(None) is False
+    assert _is_enabled("") is False
+    assert _is_enabled("0") is False
+    assert _is_enabled("False") is False
+
+
+def test_startup_profiler_imports(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    profiler = StartupProfiler(enabled=True)
+    try:
+        # Standard library imports
+        import colorsys  # noqa: F401
+    finally:
+        profiler.stop()
+
+    assert "colorsys" in profiler.imports
+    self_time, total = profiler.imports["colorsys"]
+    assert 0 <= self_time <= total
+    assert profiler._finder is None
+
+
+def test_startup_profiler_phases(capsys):
+    profiler = StartupProfiler()
+    with profiler.phase("disabled"):
+        pass
+    assert profiler.phases == []
+    assert profiler._finder is None
+    profiler.print_report()
+    assert capsys.readouterr().err == ""
+
+    profiler.enabled = True
+    with profiler.phase("register_apis"):
+        pass
+    with pytest.raises(ValueError):
+        with profiler.phase("failing"):
+            raise ValueError()
+    assert [name for name, _ in profiler.phases] == ["register_apis", "failing"]
+
+    profiler.print_report()
+    report = capsys.readouterr().err
+    assert "register_apis" in report
+    assert "Slowest imports" in report
@@ -2,14 +2,13 @@
 from datetime import datetime as dt
 
 # Third party imports
-import colors
 from flask import Flask, current_app
 from flask.helpers import get_debug_flag
-from flask_babel import gettext
 from flask_env import MetaFlaskEnv
 
 # Local application imports
 from app.config import DevConfig, ProdConfig
+from app.i18n import get_catalog
 
 
 def get_config() -> MetaFlaskEnv:
@@ -26,7 +25,10 @@ def camelcase(s: str) -> str:
 
 def localize_text(key: str) -> str:
     assert isinstance(key, str) and len(key)
-    return gettext(key)
+    catalog = get_catalog()
+    if catalog is None:
+        return key
+    return catalog.gettext(key)
 
 
 def print_routes(app: Flask):
@@ -46,6 +48,9 @@ def print_routes(app: Flask):
 
     endpoint_rules.sort(key=lambda t: t[1])
 
+    # Third party imports
+    import colors
+
     for rule in endpoint_rules:
         endpoint = colors.color(f"{rule[1]}", fg="green")
         endpoint_module = colors.color(f"{rule[0]}", fg="gray")
@@ -59,6 +64,9 @@ def print_config(app: Flask, config: MetaFlaskEnv):
 
     app.logger.debug("Config:")
 
+    # Third party imports
+    import colors
+
     with app.app_context():
         current_app.logger.info(colors.color(f"Loaded '{config.__name__}'", fg="green"))
 
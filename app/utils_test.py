@@ -52,11 +52,13 @@ def test_camelcase():
         camelcase(None)
 
 
-def test_localize_text(monkeypatch):
-    translation = "translation"
-    monkeypatch.setattr("flask_babel.gettext", lambda: translation)
+def test_localize_text(app):
+    # Without an app context the key is returned
+    assert localize_text("error_not_found") == "error_not_found"
 
-    assert localize_text(translation) == translation
+    with app.test_request_context(headers={"Accept-Language": "nl"}):
+        assert localize_text("error_not_found") == "Deze bron kan niet gevonden worden."
+        assert localize_text("translation") == "translation"
 
     # Test no-string input
     with pytest.raises(AssertionError):
@@ -0,0 +1,6 @@
+# Local application imports
+from app import create_app
+from app.asgi import ASGIAdapter
+
+# Serve with any ASGI server, e.g. `uvicorn asgi:application --workers 4`
+application = ASGIAdapter(create_app())
@@ -0,0 +1,114 @@
+"""Compare the WSGI and ASGI serving paths in-process.
+
+The WSGI path runs the requests on a fixed number of sync workers, the ASGI
+path keeps up to ``--concurrency`` requests in flight on one event loop.
+``--latency-ms`` adds a sleep to every SQL statement to emulate a remote,
+I/O bound database.
+
+    python -m benchmarks.asgi_vs_wsgi --requests 2000 --concurrency 200
+"""
+# Standard library imports
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+# Third party imports
+from sqlalchemy import event
+
+# Local application imports
+from app import create_app
+from app.asgi import ASGIAdapter
+
+
+def summarize(name: str, durations: List[float], elapsed: float) -> dict:
+    durations = sorted(durations)
+    return dict(
+        name=name,
+        requests=len(durations),
+        requests_per_second=round(len(durations) / elapsed, 1),
+        p50_ms=round(statistics.median(durations) * 1000, 2),
+        p99_ms=round(durations[int(len(durations) * 0.99) - 1] * 1000, 2),
+    )
+
+
+def run_wsgi(app, path: str, requests: int, workers: int) -> dict:
+    def request(_):
+        start_time = time.perf_counter()
+        response = app.test_client().get(path)
+        assert response.status_code == 200, response.data
+        return time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        durations = list(executor.map(request, range(requests)))
+    return summarize("wsgi", durations, time.perf_counter() - start_time)
+
+
+def run_asgi(app, path: str, requests: int, concurrency: int) -> dict:
+    adapter = ASGIAdapter(app)
+    scope = dict(type="http", method="GET", path=path, query_string=b"", headers=[])
+
+    async def request(semaphore):
+        async with semaphore:
+            messages = []
+
+            async def receive():
+                return dict(type="http.request", body=b"", more_body=False)
+
+            async def send(message):
+                messages.append(message)
+
+            start_time = time.perf_counter()
+            await adapter(scope, receive, send)
+            assert messages[0]["status"] == 200, messages
+            return time.perf_counter() - start_time
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*[request(semaphore) for _ in range(requests)])
+
+    start_time = time.perf_counter()
+    durations = asyncio.get_event_loop().run_until_complete(main())
+    result = summarize("asgi", durations, time.perf_counter() - start_time)
+    adapter.executor.shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--wsgi-workers", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    app = create_app()
+
+    # Local application imports
+    from app.api.book import Book
+    from app.extensions import db
+
+    with app.app_context():
+        db.create_all()
+        book = Book.find_or_create(title="benchmark")
+        path = f"/api/book/{book.id}"
+
+        if args.latency_ms:
+
+            @event.listens_for(db.engine, "before_cursor_execute")
+            def _sleep(*_args):
+                time.sleep(args.latency_ms / 1000)
+
+    results = [
+        run_wsgi(app, path, args.requests, args.wsgi_workers),
+        run_asgi(app, path, args.requests, args.concurrency),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Concurrency scaling of one sync worker versus one gevent / eventlet worker.
+
+Every SQL statement is preceded by ``pg_sleep(--latency-ms)`` on the same
+connection to emulate a slow database, so a worker only scales with the
+concurrency when psycopg2's waits yield to other greenlets. Requires Postgres
+(``SQLALCHEMY_DATABASE_URI``).
+
+    python -m benchmarks.green_concurrency --concurrency 1 10 50 100
+"""
+# Standard library imports
+import argparse
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+# Third party imports
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Local application imports
+from app import create_app
+from app.server import PreforkServer
+
+
+def create_app_factory(latency_ms: float):
+    def _create_app():
+        app = create_app()
+
+        @event.listens_for(Engine, "before_cursor_execute")
+        def _sleep(conn, cursor, statement, parameters, context, executemany):
+            cursor.execute("SELECT pg_sleep(%s)", (latency_ms / 1000,))
+
+        return app
+
+    return _create_app
+
+
+def seed_book() -> int:
+    # Local application imports
+    from app.api.book import Book
+    from app.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        return Book.find_or_create(title="benchmark").id
+
+
+def run(worker_class: str, args, path: str) -> list:
+    server = PreforkServer(
+        create_app_factory(args.latency_ms),
+        host="127.0.0.1",
+        port=0,
+        workers=1,
+        worker_class=worker_class,
+    )
+    port = server.bind().getsockname()[1]
+    url = f"http://127.0.0.1:{port}{path}"
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            server.run()
+        finally:
+            os._exit(0)
+
+    def get(_):
+        with urlopen(url, timeout=60) as response:
+            assert response.status == 200
+            response.read()
+
+    results = []
+    try:
+        time.sleep(1)
+        get(None)
+        for concurrency in args.concurrency:
+            requests = max(args.requests, concurrency)
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(get, range(requests)))
+            elapsed = time.perf_counter() - start_time
+            results.append(
+                dict(
+                    worker_class=worker_class,
+                    concurrency=concurrency,
+                    requests_per_second=round(requests / elapsed, 1),
+                )
+            )
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument(
+        "--worker-class", nargs="+", default=["sync", "gevent", "eventlet"]
+    )
+    args = parser.parse_args()
+
+    path = f"/api/book/{seed_book()}"
+    results = []
+    for worker_class in args.worker_class:
+        results += run(worker_class, args, path)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Micro and macro benchmarks of the request pipeline.
+
+Micro benchmarks time the building blocks of a response (pagination maths,
+schemas, the JSON representation, camelcase and localization), macro
+benchmarks drive ``BookAPI`` through the Flask test client against a seeded
+in-memory SQLite database or, with ``--database-uri``, a local Postgres.
+
+    python -m benchmarks.suite run --output baseline.json
+    python -m benchmarks.suite run --output current.json
+    python -m benchmarks.suite compare baseline.json current.json --threshold 10
+
+``compare`` exits with status 1 when a benchmark got slower than the
+threshold (in percent), so it can gate CI.
+"""
+# Standard library imports
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime as dt
+from typing import Callable, Dict, List, NamedTuple
+
+# Third party imports
+from sqlalchemy.engine.url import make_url
+
+# Local application imports
+from app import create_app
+from app.config import TestConfig
+
+Benchmark = NamedTuple("Benchmark", [("name", str), ("kind", str), ("setup", Callable)])
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(kind: str):
+    """Register ``setup(context)``, which returns the callable to time."""
+    assert kind in ("micro", "macro")
+
+    def _register(setup: Callable):
+        BENCHMARKS.append(Benchmark(setup.__name__, kind, setup))
+        return setup
+
+    return _register
+
+
+class Context:
+    def __init__(self, database_uri: str, books: int):
+        # Local application imports
+        from app.api.book import Book
+        from app.extensions import db
+
+        class BenchmarkConfig(TestConfig):
+            SQLALCHEMY_DATABASE_URI = database_uri
+
+        self.app = create_app(BenchmarkConfig)
+        with self.app.app_context():
+            db.create_all()
+            # Top up, existing rows are kept
+            existing = db.session.query(Book).count()
+            db.session.add_all(Book(title=f"Book {i}") for i in range(existing, books))
+            db.session.commit()
+            self.book_id = db.session.query(Book.id).order_by(Book.id).first()[0]
+            db.session.remove()
+        self.client = self.app.test_client()
+        self._contexts: list = []
+
+    def push_request_context(self, **kwargs):
+        request_context = self.app.test_request_context(**kwargs)
+        request_context.push()
+        self._contexts.append(request_context)
+
+    def pop_contexts(self):
+        # The requests of the macro benchmarks must push their own contexts
+        while self._contexts:
+            self._contexts.pop().pop()
+
+
+# Micro benchmarks
+
+
+@benchmark("micro")
+def pagination_params(context: Context):
+    # Local application imports
+    from app.api.response import APIResponse
+
+    return lambda: APIResponse._get_pagination_params(3, None, 10, 1000)
+
+
+@benchmark("micro")
+def camelcase(context: Context):
+    # Local application imports
+    from app.utils import camelcase
+
+    return lambda: camelcase("current_item_count")
+
+
+@benchmark("micro")
+def localize_text(context: Context):
+    # Local application imports
+    from app.utils import localize_text
+
+    context.push_request_context(headers={"Accept-Language": "nl"})
+    return lambda: localize_text("error_not_found")
+
+
+@benchmark("micro")
+def book_schema_dump(context: Context):
+    # Local application imports
+    from app.api.book import Book, BookSchema
+
+    book = Book(id=1, title="Book")
+    return lambda: BookSchema().dump(book)
+
+
+@benchmark("micro")
+def book_schema_dump_many(context: Context):
+    # Local application imports
+    from app.api.book import Book, BookSchema
+
+    books = [Book(id=i, title=f"Book {i}") for i in range(100)]
+    return lambda: BookSchema(many=True).dump(books)
+
+
+@benchmark("micro")
+def single_envelope_dump(context: Context):
+    # Local application imports
+    from app.api.schema import APISingleResponseSchema
+
+    context.push_request_context()
+    response = dict(api_version="1.0", id="1", params={}, data=dict(id=1, title="a"))
+    return lambda: APISingleResponseSchema().dump(response)
+
+
+@benchmark("micro")
+def paginated_envelope_dump(context: Context):
+    # Local application imports
+    from app.api.schema import APIPaginatedResponseSchema
+
+    context.push_request_context()
+    items = [dict(id=i, title=f"Book {i}") for i in range(10)]
+    data = dict(
+        items_per_page=10,
+        current_item_count=10,
+        page_index=1,
+        start_index=1,
+        total_items=100,
+        total_pages=10,
+        items=items,
+    )
+    response = dict(api_version="1.0", id="1", params={}, data=data)
+    return lambda: APIPaginatedResponseSchema().dump(response)
+
+
+@benchmark("micro")
+def output_json(context: Context):
+    # Local application imports
+    from app.api.representation import output_json
+
+    context.push_request_context()
+    items = [dict(id=i, title=f"Book {i}") for i in range(10)]
+    data = dict(apiVersion="1.0", id="1", params={}, data=dict(items=items))
+    return lambda: output_json(data, 200)
+
+
+# Macro benchmarks
+
+
+def _get(context: Context, path: str):
+    def _request():
+        response = context.client.get(path)
+        assert response.status_code == 200, response.data
+
+    return _request
+
+
+@benchmark("macro")
+def get_book(context: Context):
+    return _get(context, f"/api/book/{context.book_id}")
+
+
+@benchmark("macro")
+def index_books(context: Context):
+    return _get(context, "/api/book?pageIndex=2&itemsPerPage=10")
+
+
+@benchmark("macro")
+def put_book(context: Context):
+    path = f"/api/book/{context.book_id}"
+
+    def _request():
+        response = context.client.put(path, json=dict(title="Book"))
+        assert response.status_code == 200, response.data
+
+    return _request
+
+
+@benchmark("macro")
+def post_and_delete_book(context: Context):
+    def _request():
+        response = context.client.post("/api/book", json=dict(title="New book"))
+        assert response.status_code == 200, response.data
+        book_id = response.json["data"]["id"]
+        response = context.client.delete(f"/api/book/{book_id}")
+        assert response.status_code == 200, response.data
+
+    return _request
+
+
+def measure(function: Callable, repeat: int, min_time: float) -> dict:
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time / 10:
+        number *= 2
+    timings = [timer.timeit(number) / number * 1e6 for _ in range(repeat)]
+    return dict(
+        number=number,
+        repeat=repeat,
+        min_us=round(min(timings), 3),
+        median_us=round(statistics.median(timings), 3),
+        stdev_us=round(statistics.stdev(timings), 3) if repeat > 1 else 0,
+    )
+
+
+def git_revision() -> str:
+    try:
+        output = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return output.decode().strip()
+
+
+def run(args) -> dict:
+    context = Context(args.database_uri, args.books)
+    results: Dict[str, dict] = {}
+    for bench in BENCHMARKS:
+        if args.kind and bench.kind != args.kind:
+            continue
+        if args.filter and args.filter not in bench.name:
+            continue
+        function = bench.setup(context)
+        try:
+            result = measure(function, args.repeat, args.min_time)
+        finally:
+            context.pop_contexts()
+        result = dict(kind=bench.kind, **result)
+        results[bench.name] = result
+        print(f"{bench.name:<28} {result['median_us']:>12.2f} us", file=sys.stderr)
+
+    return dict(
+        meta=dict(
+            date=dt.now().isoformat(timespec="seconds"),
+            revision=git_revision(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            database=make_url(args.database_uri).drivername,
+            books=args.books,
+        ),
+        results=results,
+    )
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print the change of every benchmark, returns the regressed ones.
+
+    The fastest repetitions are compared, they are the least disturbed by
+    the rest of the machine.
+    """
+    regressions = []
+    print(f"{'benchmark':<28} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            print(f"{name:<28} {'-':>12} {result['min_us']:>12.2f}      new")
+            continue
+        change = (result["min_us"] / baseline_result["min_us"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<28} {baseline_result['min_us']:>12.2f} "
+            f"{result['min_us']:>12.2f} {change:>+7.1f}%{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", help="write the results to this file")
+    run_parser.add_argument("--database-uri", default="sqlite://")
+    run_parser.add_argument("--books", type=int, default=100)
+    run_parser.add_argument("--kind", choices=["micro", "macro"])
+    run_parser.add_argument("--filter", help="only names containing this")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds per repetition"
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="compare results with a baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=10, help="allowed slowdown in percent"
+    )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args)
+        output = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as output_file:
+                output_file.write(output + "\n")
+        else:
+            print(output)
+        return
+
+    with open(args.baseline) as baseline_file, open(args.current) as current_file:
+        regressions = compare(
+            json.load(baseline_file), json.load(current_file), args.threshold
+        )
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,27 @@
+# Standard library imports
+import json
+
 # Third party imports
 from flask_migrate import Migrate, MigrateCommand
 
 # Local application imports
 from app import create_app
+from app.capture import read_capture
 from app.extensions import db
+from app.profiling import create_profile_token
+from app.server import PreforkServer
 from manager import Manager
 from manager.database import manager as database_manager
+from manager.load import (
+    DEFAULT_MIX,
+    HTTPTransport,
+    LoadGenerator,
+    WSGITransport,
+    format_table,
+    parse_mix,
+)
+from manager.replay import Replayer
+from manager.replay import format_table as format_replay_table
 
 app = create_app()
 manager = Manager(app)
@@ -20,6 +36,89 @@ def run():
     app.run()
 
 
+@manager.option("-w", "--workers", dest="workers", type=int, default=None)
+@manager.option(
+    "-k",
+    "--worker-class",
+    dest="worker_class",
+    choices=["sync", "gevent", "eventlet"],
+    default=None,
+)
+@manager.option("--max-requests", dest="max_requests", type=int, default=None)
+@manager.option("--max-memory-mb", dest="max_memory_mb", type=int, default=None)
+def serve(workers=None, worker_class=None, max_requests=None, max_memory_mb=None):
+    """ Run the pre-fork production server, SIGHUP reloads gracefully. """
+    server = PreforkServer.from_config(
+        create_app,
+        app.config,
+        workers=workers,
+        worker_class=worker_class,
+        max_requests=max_requests,
+        max_memory_mb=max_memory_mb,
+    )
+    server.run()
+
+
+@manager.command
+def profile_token():
+    """ Print a PROFILE_HEADER value that profiles the requests sending it. """
+    print(create_profile_token(app))
+
+
+@manager.option("-u", "--url", dest="url", default=None)
+@manager.option("-c", "--concurrency", dest="concurrency", type=int, default=10)
+@manager.option("-r", "--rate", dest="rate", type=float, default=None)
+@manager.option("-d", "--duration", dest="duration", type=float, default=None)
+@manager.option("-n", "--requests", dest="requests", type=int, default=None)
+@manager.option("-m", "--mix", dest="mix", default=DEFAULT_MIX)
+@manager.option("-o", "--output", dest="output", default=None)
+def load(
+    url=None,
+    concurrency=10,
+    rate=None,
+    duration=None,
+    requests=None,
+    mix=DEFAULT_MIX,
+    output=None,
+):
+    """ Load test a running instance (--url) or the in-process app. """
+    transport = HTTPTransport(url) if url else WSGITransport(app)
+    generator = LoadGenerator(
+        transport,
+        parse_mix(mix),
+        concurrency=concurrency,
+        rate=rate,
+        duration=duration,
+        requests=requests,
+    )
+    generator.prepare()
+    try:
+        summary = generator.run()
+    finally:
+        generator.cleanup()
+    print(format_table(summary))
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(summary, output_file, indent=2)
+
+
+@manager.option("-f", "--file", dest="capture_file", default=None)
+@manager.option("-u", "--url", dest="url", default=None)
+@manager.option("-s", "--speed", dest="speed", type=float, default=1.0)
+@manager.option("-c", "--concurrency", dest="concurrency", type=int, default=10)
+@manager.option("-o", "--output", dest="output", default=None)
+def replay(capture_file=None, url=None, speed=1.0, concurrency=10, output=None):
+    """ Replay captured traffic (CAPTURE_FILE), compare latency per route. """
+    entries = read_capture(capture_file or app.config["CAPTURE_FILE"])
+    transport = HTTPTransport(url) if url else WSGITransport(app)
+    replayer = Replayer(transport, entries, speed=speed, concurrency=concurrency)
+    summary = replayer.run()
+    print(format_replay_table(summary))
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(summary, output_file, indent=2)
+
+
 @manager.shell
 def make_shell_context():
     """ Configure shell setup. """
@@ -0,0 +1,2 @@
+# Local application imports
+from app.conftest import app, db  # noqa: F401
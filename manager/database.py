@@ -1,6 +1,10 @@
+# Standard library imports
+import sys
+import time
+from contextlib import contextmanager
+
 # Third party imports
-from faker import Faker
-from flask_script import Manager, prompt_bool
+from flask_script import Command, Manager, Option, prompt_bool
 
 # Local application imports
 from app.extensions import db
@@ -15,15 +19,175 @@ def drop():
         db.drop_all()
 
 
-@manager.command
-def seed():
-    fake = Faker()
+def _print_progress(model_name: str):
+    start_time = time.perf_counter()
+
+    def _progress(done: int, total: int):
+        elapsed = time.perf_counter() - start_time
+        rate = done / elapsed if elapsed else 0
+        eta = (total - done) / rate if rate else 0
+        print(
+            f"\r{model_name}: {done}/{total} rows ({done / total:.0%}), "
+            f"{rate:,.0f} rows/s, ETA {eta:.0f} s ",
+            end="" if done < total else "\n",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    return _progress
+
+
+def _seed(count=1000, workers=None, model=None, chunk_size=10000, method="auto"):
+    # Third party imports
+    from flask import current_app
+
+    # Local application imports
+    from app.seed import get_seedable_models, seed_model
+    from app.server import dispose_engines
+
+    models = [
+        seedable
+        for seedable in get_seedable_models()
+        if model is None or seedable.__name__.lower() == model.lower()
+    ]
+    assert models, f"No seedable model named {model}"
+    # The workers open their own connections
+    dispose_engines(current_app)
+    database_uri = str(db.engine.url)
+    for seedable in models:
+        result = seed_model(
+            seedable,
+            count,
+            database_uri,
+            workers=workers,
+            chunk_size=chunk_size,
+            method=method,
+            progress=_print_progress(seedable.__name__),
+        )
+        print(
+            f"Seeded {result['rows']} {result['model']} rows in "
+            f"{result['seconds']} s ({result['rows_per_second']:,} rows/s)"
+        )
+
+
+@manager.option("-n", "--count", dest="count", type=int, default=1000)
+@manager.option("-w", "--workers", dest="workers", type=int, default=None)
+@manager.option("-m", "--model", dest="model", default=None)
+@manager.option("--chunk-size", dest="chunk_size", type=int, default=10000)
+@manager.option(
+    "--method", dest="method", choices=["auto", "copy", "insert"], default="auto"
+)
+def seed(count=1000, workers=None, model=None, chunk_size=10000, method="auto"):
+    """Seeds the models of the registered APIs with fake rows"""
+    _seed(count, workers, model, chunk_size, method)
+
+
+@contextmanager
+def _open(path: str, mode: str):
+    if path == "-":
+        yield sys.stdout if "w" in mode else sys.stdin
+        return
+    # The csv module handles the line endings
+    with open(path, mode, newline="", encoding="utf-8") as file:
+        yield file
+
+
+def _print_count(model_name: str):
+    def _progress(done: int):
+        print(f"\r{model_name}: {done} rows ", end="", file=sys.stderr, flush=True)
 
+    return _progress
+
+
+class Export(Command):
+    """Exports the rows of a registered model to a CSV or NDJSON file"""
+
+    option_list = (
+        Option("model"),
+        Option("path", help="file to write, - for stdout"),
+        Option("-f", "--format", dest="file_format", choices=["csv", "ndjson"]),
+        Option("--batch-size", dest="batch_size", type=int, default=10000),
+    )
+
+    def run(self, model, path, file_format=None, batch_size=10000):
+        # Local application imports
+        from app.bulk import export_model, get_api, get_format
+
+        api = get_api(model)
+        file_format = get_format(path, file_format)
+        with _open(path, "w") as output:
+            count = export_model(
+                db.engine,
+                api.model,
+                output,
+                file_format,
+                batch_size=batch_size,
+                progress=_print_count(api.model.__name__),
+            )
+        print(f"\nExported {count} {api.model.__name__} rows", file=sys.stderr)
+
+
+class Import(Command):
+    """Imports a CSV or NDJSON file into a registered model"""
+
+    option_list = (
+        Option("model"),
+        Option("path", help="file to read, - for stdin"),
+        Option("-f", "--format", dest="file_format", choices=["csv", "ndjson"]),
+        Option("--batch-size", dest="batch_size", type=int, default=10000),
+        Option(
+            "--validate",
+            dest="validate",
+            action="store_true",
+            help="validate the rows with the schema of the API",
+        ),
+        Option(
+            "--method",
+            dest="method",
+            choices=["auto", "copy", "insert"],
+            default="auto",
+        ),
+    )
+
+    def run(
+        self,
+        model,
+        path,
+        file_format=None,
+        batch_size=10000,
+        validate=False,
+        method="auto",
+    ):
+        # Local application imports
+        from app.bulk import get_api, get_format, import_model
+
+        api = get_api(model)
+        file_format = get_format(path, file_format)
+        with _open(path, "r") as source:
+            count = import_model(
+                db.engine,
+                api.model,
+                source,
+                file_format,
+                schema=api.schema() if validate else None,
+                batch_size=batch_size,
+                method=method,
+                progress=_print_count(api.model.__name__),
+            )
+        print(f"\nImported {count} {api.model.__name__} rows", file=sys.stderr)
+
+
+manager.add_command("export", Export())
+manager.add_command("import", Import())
+
+
+@manager.command
+def purge_idempotency_keys():
+    """Deletes the expired idempotency keys"""
     # Local application imports
-    from app.api.recipe import Recipe
+    from app.api.idempotency import purge_expired
 
-    for _ in range(5):
-        Recipe.seed(fake)
+    print(f"Deleted {purge_expired()} expired idempotency keys")
 
 
 @manager.command
@@ -32,7 +196,7 @@ def create(seed=False):
     db.create_all()
 
     if seed is True:
-        seed()
+        _seed()
 
 
 @manager.command
@@ -0,0 +1,341 @@
+"""HTTP load generator for the book API.
+
+Drives a running instance (``--url``) or the in-process WSGI app with a mix of
+``GET /api/book/<id>``, paginated index, POST, PUT and DELETE requests from
+concurrent workers, optionally at a fixed rate, and reports throughput, error
+rates and latency percentiles.
+"""
+# Standard library imports
+import http.client
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Third party imports
+from flask import Flask
+
+OPERATIONS = ("get", "index", "post", "put", "delete")
+DEFAULT_MIX = "get=60,index=20,post=10,put=5,delete=5"
+PERCENTILES = (50, 95, 99, 99.9)
+# Seconds a run lasts when neither a duration nor a number of requests is set
+DEFAULT_DURATION = 10
+API_PATH = "/api/book"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """``"get=60,index=20"`` into the share of every operation."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        assert name in OPERATIONS, f"Unknown operation {name}, use {OPERATIONS}"
+        weights[name] = float(weight or 1)
+    total = sum(weights.values())
+    assert total > 0, "The mix must contain at least one operation"
+    return {name: weight / total for name, weight in weights.items()}
+
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class HTTPTransport:
+    """One keep-alive connection per worker thread to a running instance."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        parts = urlsplit(url)
+        assert parts.scheme in ("http", "https"), f"Unsupported URL {url}"
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            if self.scheme == "https":
+                connection = http.client.HTTPSConnection(
+                    self.netloc, timeout=self.timeout
+                )
+            else:
+                connection = http.client.HTTPConnection(
+                    self.netloc, timeout=self.timeout
+                )
+            self._local.connection = connection
+        return connection
+
+    def request(self, method: str, path: str, body=None) -> Tuple[int, Optional[dict]]:
+        connection = self._connection()
+        headers = {"Accept": "application/json"}
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            connection.request(method, self.prefix + path, body=data, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            connection.close()
+            self._local.connection = None
+            raise
+        return response.status, json.loads(content) if content else None
+
+
+class WSGITransport:
+    """Calls the in-process app through one test client per worker thread."""
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body=None) -> Tuple[int, Optional[dict]]:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float, status):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+            self.statuses[operation][status] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        operations = {}
+        all_latencies: List[float] = []
+        all_statuses: Counter = Counter()
+        for operation in OPERATIONS:
+            if operation not in self.latencies:
+                continue
+            latencies = self.latencies[operation]
+            all_latencies.extend(latencies)
+            all_statuses.update(self.statuses[operation])
+            operations[operation] = self._summarize(
+                latencies, self.statuses[operation], elapsed
+            )
+        return dict(
+            elapsed_s=round(elapsed, 3),
+            total=self._summarize(all_latencies, all_statuses, elapsed),
+            operations=operations,
+        )
+
+    @staticmethod
+    def _summarize(latencies: List[float], statuses: Counter, elapsed: float) -> dict:
+        latencies = sorted(latencies)
+        count = len(latencies)
+        errors = sum(
+            n for status, n in statuses.items() if status == "error" or status >= 400
+        )
+        summary = dict(
+            requests=count,
+            errors=errors,
+            error_rate=round(errors / count, 4) if count else 0,
+            throughput_rps=round(count / elapsed, 2) if elapsed else 0,
+            mean_ms=round(sum(latencies) / count * 1000, 3) if count else 0,
+            max_ms=round(latencies[-1] * 1000, 3) if count else 0,
+            statuses={
+                str(status): n for status, n in sorted(statuses.items(), key=str)
+            },
+        )
+        for percent in PERCENTILES:
+            key = f"p{str(percent).replace('.', '')}_ms"
+            summary[key] = round(percentile(latencies, percent) * 1000, 3)
+        return summary
+
+
+class LoadGenerator:
+    """Sends the requests of ``concurrency`` worker threads.
+
+    Without a ``rate`` every worker sends its next request as soon as the
+    previous one completed. With a ``rate`` (requests per second, over all
+    workers) the requests are scheduled at fixed intervals and latency is
+    measured from the scheduled time, so a stalled server is not hidden by
+    the workers waiting on it (coordinated omission).
+
+    GET and PUT target the books that existed before the run, DELETE only
+    removes books created for it by :meth:`prepare` or by the POST requests
+    of the run. A DELETE with no such book left is skipped, not sent.
+    """
+
+    def __init__(
+        self,
+        transport,
+        mix: Dict[str, float],
+        concurrency: int = 10,
+        rate: Optional[float] = None,
+        duration: Optional[float] = None,
+        requests: Optional[int] = None,
+        seed_books: int = 10,
+    ):
+        assert concurrency > 0, "concurrency must be positive"
+        # A number of requests alone runs until they are all sent, with both
+        # the run stops at whichever comes first
+        if duration is None and requests is None:
+            duration = DEFAULT_DURATION
+        assert duration or requests, "Set a duration or a number of requests"
+        self.transport = transport
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.requests = requests
+        self.seed_books = seed_books
+        self.book_ids: List[int] = []
+        self.created_ids: List[int] = []
+        self.skipped = 0
+        self.results = Results()
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._start_time = 0.0
+
+    def prepare(self):
+        """Collect the ids of existing books, creating some when there are none."""
+        status, body = self.transport.request(
+            "GET", f"{API_PATH}?pageIndex=1&itemsPerPage=100"
+        )
+        assert status == 200, f"Listing the books failed with status {status}"
+        self.book_ids = [item["id"] for item in body["data"]["items"]]
+        if not self.book_ids:
+            for index in range(self.seed_books):
+                book_id = self._create(f"Load test book {index}")
+                if book_id is not None:
+                    self.book_ids.append(book_id)
+        assert self.book_ids, "No book to request"
+        if "delete" in self.operations:
+            # Created before the run, so the first deletes are not skipped
+            for _ in range(self.concurrency):
+                book_id = self._create("Load test book")
+                if book_id is not None:
+                    self.created_ids.append(book_id)
+
+    def _create(self, title: str) -> Optional[int]:
+        status, body = self.transport.request("POST", API_PATH, dict(title=title))
+        if status != 200 or not body:
+            return None
+        return body["data"]["id"]
+
+    def _next_slot(self) -> Optional[float]:
+        """Scheduled start of the next request, None once the run is over."""
+        with self._lock:
+            if self.requests is not None and self._sent >= self.requests:
+                return None
+            index = self._sent
+            self._sent += 1
+        now = time.perf_counter()
+        if self.duration and now - self._start_time >= self.duration:
+            return None
+        if self.rate:
+            return self._start_time + index / self.rate
+        return now
+
+    def _request(self, operation: str) -> Optional[Tuple[str, str, Optional[dict]]]:
+        if operation == "get":
+            return "GET", f"{API_PATH}/{random.choice(self.book_ids)}", None
+        if operation == "index":
+            page_index = random.randint(1, max(len(self.book_ids) // 10, 1))
+            return "GET", f"{API_PATH}?pageIndex={page_index}&itemsPerPage=10", None
+        if operation == "post":
+            return "POST", API_PATH, dict(title="Load test book")
+        if operation == "put":
+            book_id = random.choice(self.book_ids)
+            return "PUT", f"{API_PATH}/{book_id}", dict(title="Load test book")
+        with self._lock:
+            created_id = self.created_ids.pop() if self.created_ids else None
+        if created_id is None:
+            return None
+        return "DELETE", f"{API_PATH}/{created_id}", None
+
+    def _work(self):
+        while True:
+            scheduled = self._next_slot()
+            if scheduled is None:
+                return
+            operation = random.choices(self.operations, self.weights)[0]
+            request = self._request(operation)
+            if request is None:
+                with self._lock:
+                    self.skipped += 1
+                continue
+            method, path, body = request
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            start_time = scheduled if self.rate else time.perf_counter()
+            try:
+                status, response_body = self.transport.request(method, path, body)
+            except Exception:
+                status, response_body = "error", None
+            self.results.record(operation, time.perf_counter() - start_time, status)
+            if operation == "post" and status == 200 and response_body:
+                with self._lock:
+                    self.created_ids.append(response_body["data"]["id"])
+
+    def run(self) -> dict:
+        self._start_time = time.perf_counter()
+        workers = [
+            threading.Thread(target=self._work, name=f"load-{index}", daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - self._start_time
+        summary = self.results.summary(elapsed)
+        summary["skipped"] = self.skipped
+        summary["config"] = dict(
+            concurrency=self.concurrency,
+            rate=self.rate,
+            duration=self.duration,
+            requests=self.requests,
+            mix=dict(zip(self.operations, self.weights)),
+        )
+        return summary
+
+    def cleanup(self):
+        """Delete the books created by the run and not deleted by it."""
+        while self.created_ids:
+            self.transport.request("DELETE", f"{API_PATH}/{self.created_ids.pop()}")
+
+
+def format_table(summary: dict) -> str:
+    columns = ["requests", "errors", "error_rate", "throughput_rps"]
+    columns += [f"p{str(percent).replace('.', '')}_ms" for percent in PERCENTILES]
+    columns.append("max_ms")
+    rows = [["operation"] + columns]
+    for operation, result in summary["operations"].items():
+        rows.append([operation] + [str(result[column]) for column in columns])
+    rows.append(["total"] + [str(summary["total"][column]) for column in columns])
+    widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+    lines = [
+        "  ".join(
+            cell.ljust(width) if index == 0 else cell.rjust(width)
+            for index, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    ]
+    lines.append(
+        f"{summary['total']['requests']} requests in {summary['elapsed_s']} s, "
+        f"{summary['skipped']} deletes skipped"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,137 @@
+# Standard library imports
+import json
+
+# Third party imports
+import pytest
+
+# Local application imports
+from app.api.book import Book
+
+# Local folder imports
+from .load import (
+    DEFAULT_DURATION,
+    LoadGenerator,
+    WSGITransport,
+    format_table,
+    parse_mix,
+    percentile,
+)
+
+
+class FailingTransport:
+    """Raises on every request but the listing of the books."""
+
+    def request(self, method, path, body=None):
+        if method == "GET" and "?" in path:
+            return 200, dict(data=dict(items=[dict(id=1)]))
+        raise ConnectionError
+
+
+def test_parse_mix():
+    assert parse_mix("get=3,post=1") == dict(get=0.75, post=0.25)
+    with pytest.raises(AssertionError):
+        parse_mix("get=1,patch=1")
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99.9) == 100
+    assert percentile([], 50) == 0
+
+
+@pytest.mark.parametrize(
+    "duration,requests,expected",
+    [
+        (None, None, (DEFAULT_DURATION, None)),
+        (None, 5, (None, 5)),
+        (3, None, (3, None)),
+        (3, 5, (3, 5)),
+    ],
+)
+def test_load_generator_defaults(duration, requests, expected):
+    generator = LoadGenerator(
+        FailingTransport(), dict(get=1), duration=duration, requests=requests
+    )
+    assert (generator.duration, generator.requests) == expected
+
+
+def test_load_generator(app, db):
+    generator = LoadGenerator(
+        WSGITransport(app),
+        parse_mix("get=4,index=2,post=2,put=1,delete=1"),
+        concurrency=2,
+        requests=40,
+        seed_books=5,
+    )
+    generator.prepare()
+    assert len(generator.book_ids) == 5
+    # Books to delete, one per worker
+    assert len(generator.created_ids) == 2
+    try:
+        summary = generator.run()
+    finally:
+        generator.cleanup()
+    # Only the seeded books are left
+    assert db.session.query(Book).count() == 5
+
+    # Deletes with no created book left are skipped
+    sent = 40 - summary["skipped"]
+    assert summary["total"]["requests"] == sent
+    assert summary["total"]["errors"] == 0
+    assert summary["total"]["statuses"] == {"200": sent}
+    assert sum(result["requests"] for result in summary["operations"].values()) == sent
+    assert summary["config"]["requests"] == 40
+    assert summary["config"]["duration"] is None
+    assert json.loads(json.dumps(summary)) == summary
+
+    table = format_table(summary).splitlines()
+    assert table[0].split()[:3] == ["operation", "requests", "errors"]
+    assert table[-2].split()[:3] == ["total", str(sent), "0"]
+    assert table[-1].startswith(f"{sent} requests in ")
+    assert table[-1].endswith(f", {summary['skipped']} deletes skipped")
+    assert {line.split()[0] for line in table[1:-2]} == set(summary["operations"])
+    db.session.remove()
+
+
+def test_load_generator_errors():
+    generator = LoadGenerator(
+        FailingTransport(), dict(get=1, put=1), concurrency=2, requests=10
+    )
+    generator.prepare()
+    summary = generator.run()
+
+    assert summary["total"]["requests"] == 10
+    assert summary["total"]["errors"] == 10
+    assert summary["total"]["error_rate"] == 1
+    assert summary["total"]["statuses"] == {"error": 10}
+    assert format_table(summary).splitlines()[-2].split()[:4] == [
+        "total",
+        "10",
+        "10",
+        "1.0",
+    ]
+
+
+def test_load_generator_skips_deletes():
+    class Transport:
+        def __init__(self):
+            self.sent = []
+
+        def request(self, method, path, body=None):
+            self.sent.append((method, path))
+            if method == "GET":
+                return 200, dict(data=dict(items=[dict(id=1)]))
+            # Creating the books to delete fails
+            return 500, None
+
+    transport = Transport()
+    generator = LoadGenerator(transport, dict(delete=1), concurrency=2, requests=5)
+    generator.prepare()
+    assert generator.created_ids == []
+    summary = generator.run()
+
+    assert summary["skipped"] == 5
+    assert summary["total"]["requests"] == 0
+    assert summary["operations"] == {}
+    assert all(method != "DELETE" for method, _ in transport.sent)
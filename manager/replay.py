@@ -0,0 +1,127 @@
+"""Replays traffic captured with ``CAPTURE_ENABLED`` (see ``app.capture``).
+
+The requests are sent in the order they were captured, at the original pace
+divided by ``speed`` (0 sends them as fast as the workers allow), against a
+running instance or the in-process app. The latency of every route is
+reported next to the server side duration recorded at capture time. They
+are not compared, the replay latency also includes the scheduling, the
+queueing of the workers and, over HTTP, the network. Replay against a copy
+of the database taken before the capture, so that the ids in the paths exist.
+"""
+# Standard library imports
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlencode
+
+# Local folder imports
+from .load import percentile
+
+
+def entry_path(entry: dict) -> str:
+    args = entry.get("a")
+    return f"{entry['p']}?{urlencode(args, doseq=True)}" if args else entry["p"]
+
+
+def is_replayable(entry: dict) -> bool:
+    # Only the hash of large or non JSON bodies is captured
+    return "hash" not in entry.get("b", {})
+
+
+class Replayer:
+    def __init__(self, transport, entries: List[dict], speed=1.0, concurrency=10):
+        assert speed >= 0, "speed must not be negative"
+        self.transport = transport
+        self.entries = entries
+        self.speed = speed
+        self.concurrency = concurrency
+        self.original: Dict[str, List[float]] = defaultdict(list)
+        self.replayed: Dict[str, List[float]] = defaultdict(list)
+        self.mismatches: Counter = Counter()
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def route(entry: dict) -> str:
+        return f"{entry['m']} {entry.get('r') or entry['p']}"
+
+    def _send(self, entry: dict, scheduled: float):
+        start_time = scheduled if self.speed else time.perf_counter()
+        body = entry.get("b", {}).get("json")
+        try:
+            status, _ = self.transport.request(entry["m"], entry_path(entry), body)
+        except Exception:
+            status = "error"
+        seconds = time.perf_counter() - start_time
+        route = self.route(entry)
+        with self._lock:
+            self.original[route].append(entry["d"] / 1000)
+            self.replayed[route].append(seconds)
+            if status != entry["s"]:
+                self.mismatches[route] += 1
+
+    def run(self) -> dict:
+        start_time = time.perf_counter()
+        first = self.entries[0]["t"] if self.entries else 0
+        with ThreadPoolExecutor(self.concurrency) as executor:
+            for entry in self.entries:
+                if not is_replayable(entry):
+                    self.skipped += 1
+                    continue
+                scheduled = time.perf_counter()
+                if self.speed:
+                    scheduled = start_time + (entry["t"] - first) / self.speed
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                executor.submit(self._send, entry, scheduled)
+        return self.summary(time.perf_counter() - start_time)
+
+    def summary(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.replayed):
+            original = sorted(self.original[route])
+            replayed = sorted(self.replayed[route])
+            result = dict(
+                requests=len(replayed), status_mismatches=self.mismatches[route]
+            )
+            for percent in (50, 95, 99):
+                before = percentile(original, percent) * 1000
+                after = percentile(replayed, percent) * 1000
+                result[f"original_p{percent}_ms"] = round(before, 3)
+                result[f"replay_p{percent}_ms"] = round(after, 3)
+            routes[route] = result
+        return dict(
+            elapsed_s=round(elapsed, 3),
+            speed=self.speed,
+            requests=sum(len(latencies) for latencies in self.replayed.values()),
+            skipped=self.skipped,
+            routes=routes,
+        )
+
+
+def format_table(summary: dict) -> str:
+    columns = ["requests", "status_mismatches"]
+    for percent in (50, 95, 99):
+        columns += [f"original_p{percent}_ms", f"replay_p{percent}_ms"]
+    headers = ["route", "requests", "mismatches"]
+    for percent in (50, 95, 99):
+        headers += [f"p{percent} server", f"p{percent} replay"]
+    rows = [headers]
+    for route, result in summary["routes"].items():
+        rows.append([route] + [str(result[column]) for column in columns])
+    widths = [max(len(row[index]) for row in rows) for index in range(len(headers))]
+    lines = [
+        "  ".join(
+            cell.ljust(width) if index == 0 else cell.rjust(width)
+            for index, (cell, width) in enumerate(zip(row, widths))
+        )
+        for row in rows
+    ]
+    lines.append(
+        f"{summary['requests']} requests replayed in {summary['elapsed_s']} s "
+        f"at speed {summary['speed']}, {summary['skipped']} skipped"
+    )
+    return "\n".join(lines)
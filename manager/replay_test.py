@@ -0,0 +1,107 @@
+# Standard library imports
+import json
+import threading
+import time
+
+# Local application imports
+from app.api.book import Book
+
+# Local folder imports
+from .load import WSGITransport
+from .replay import Replayer, entry_path, format_table, is_replayable
+
+
+class RecordingTransport:
+    """Answers every request with a 200 and records when it was sent."""
+
+    def __init__(self):
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def request(self, method, path, body=None):
+        with self._lock:
+            self.sent.append((time.perf_counter(), method, path, body))
+        return 200, None
+
+
+def make_entry(t, method, path, status=200, rule=None, **kwargs):
+    return dict(t=t, m=method, p=path, r=rule, s=status, d=1.0, **kwargs)
+
+
+def test_entry_path():
+    assert entry_path(make_entry(0, "GET", "/api/book")) == "/api/book"
+    entry = make_entry(0, "GET", "/api/book", a=dict(pageIndex=["2"]))
+    assert entry_path(entry) == "/api/book?pageIndex=2"
+    assert is_replayable(make_entry(0, "POST", "/api/book", b=dict(json={})))
+    entry = make_entry(0, "POST", "/api/book", b=dict(hash="abc", size=10))
+    assert not is_replayable(entry)
+
+
+def test_replay(app, db):
+    book = Book(title="foo")
+    db.session.add(book)
+    db.session.commit()
+    book_id = book.id
+    rule = "/api/book/<int:id>"
+    entries = [
+        make_entry(0.0, "GET", f"/api/book/{book_id}", rule=rule),
+        # Missing from the database replayed against
+        make_entry(0.1, "GET", f"/api/book/{book_id + 1}", rule=rule),
+        make_entry(0.2, "POST", "/api/book", b=dict(json=dict(title="bar"))),
+        # Only the hash of the body was captured
+        make_entry(0.3, "POST", "/api/book", b=dict(hash="abc", size=10)),
+    ]
+    replayer = Replayer(WSGITransport(app), entries, speed=0, concurrency=2)
+    summary = replayer.run()
+
+    assert summary["requests"] == 3
+    assert summary["skipped"] == 1
+    routes = summary["routes"]
+    assert set(routes) == {f"GET {rule}", "POST /api/book"}
+    assert routes[f"GET {rule}"]["requests"] == 2
+    assert routes[f"GET {rule}"]["status_mismatches"] == 1
+    assert routes["POST /api/book"]["status_mismatches"] == 0
+    assert routes["POST /api/book"]["original_p50_ms"] == 1.0
+    assert db.session.query(Book).filter_by(title="bar").count() == 1
+    assert json.loads(json.dumps(summary)) == summary
+
+    table = format_table(summary).splitlines()
+    assert table[0].split()[:4] == ["route", "requests", "mismatches", "p50"]
+    assert "delta" not in table[0]
+    assert table[1].split()[:4] == ["GET", rule, "2", "1"]
+    assert table[-1] == (
+        f"3 requests replayed in {summary['elapsed_s']} s at speed 0, 1 skipped"
+    )
+    db.session.remove()
+
+
+def test_replay_pace():
+    entries = [make_entry(t, "GET", "/api/book") for t in (10.0, 10.1, 10.2)]
+    transport = RecordingTransport()
+    start_time = time.perf_counter()
+    summary = Replayer(transport, entries, speed=2).run()
+    # The original 0.2 s between the first and last request, twice as fast
+    assert time.perf_counter() - start_time >= 0.1
+    sent = sorted(transport.sent)
+    assert sent[-1][0] - sent[0][0] >= 0.09
+    assert summary["requests"] == 3
+    assert summary["routes"]["GET /api/book"]["status_mismatches"] == 0
+
+    # As fast as the workers allow
+    transport = RecordingTransport()
+    start_time = time.perf_counter()
+    summary = Replayer(transport, entries, speed=0).run()
+    assert time.perf_counter() - start_time < 0.1
+    assert len(transport.sent) == 3
+    assert summary["speed"] == 0
+
+
+def test_replay_errors():
+    class FailingTransport:
+        def request(self, method, path, body=None):
+            raise ConnectionError
+
+    entries = [make_entry(0.0, "GET", "/api/book")]
+    summary = Replayer(FailingTransport(), entries, speed=0).run()
+    assert summary["routes"]["GET /api/book"]["status_mismatches"] == 1
+    assert Replayer(FailingTransport(), [], speed=0).run()["requests"] == 0
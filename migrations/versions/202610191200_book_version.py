@@ -0,0 +1,24 @@
+"""Add the version of the book rows
+
+Revision ID: 3b8e5d0a7c21
+Revises: fc15cf1faa71
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e5d0a7c21'
+down_revision = 'fc15cf1faa71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('book', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    op.drop_column('book', 'version')